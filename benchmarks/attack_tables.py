@@ -0,0 +1,123 @@
+"""Microbenchmark of the precomputed attack tables against the previous ray walking piece functions.
+
+Run with ``python benchmarks/attack_tables.py``.
+"""
+import timeit
+from typing import Callable, Dict, List, Optional, Tuple
+
+from j_chess_lib.ai.board import BoardState
+from j_chess_lib.ai.board.utilities import get_next_position
+
+FENS = [
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+    "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+]
+
+
+# --- Previous implementation, kept here as the reference point of the benchmark ---
+
+def _add(t1: Tuple[int, int], t2: Tuple[int, int]) -> Tuple[int, int]:
+    return t1[0] + t2[0], t1[1] + t2[1]
+
+
+def _mul(t1: Tuple[int, int], mul: int) -> Tuple[int, int]:
+    return t1[0] * mul, t1[1] * mul
+
+
+def _straight(origin_position, board_state, white, directions, max_steps=8):
+    j = 1
+    moves = []
+    hits = []
+    start_pos = (ord(origin_position[0]), origin_position[1])
+    enemy: Callable[[str], bool] = str.islower if white else str.isupper
+    a, h = ord("a"), ord("h")
+    while j <= max_steps and len(directions) > 0:
+        for i, direction in reversed(list(enumerate(directions))):
+            new_pos_tmp = _add(start_pos, _mul(direction, j))
+            if not 1 <= new_pos_tmp[1] <= 8 or not a <= new_pos_tmp[0] <= h:
+                del directions[i]
+                continue
+            new_pos = (chr(new_pos_tmp[0]), new_pos_tmp[1])
+            if new_pos in board_state:
+                if enemy(board_state[new_pos]):
+                    hits.append(new_pos)
+                del directions[i]
+                continue
+            moves.append(new_pos)
+        j += 1
+    return [(x, False) for x in moves] + [(x, True) for x in hits]
+
+
+def _knight(origin_position, board_state, white):
+    hops = [(2, 1), (-2, 1), (2, -1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2)]
+    enemy: Callable[[str], bool] = str.islower if white else str.isupper
+    start_pos = (ord(origin_position[0]), origin_position[1])
+    a, h = ord("a"), ord("h")
+    moves = [(chr(y[0]), y[1]) for y in (_add(x, start_pos) for x in hops) if a <= y[0] <= h and 1 <= y[1] <= 8]
+    return [(x, x in board_state) for x in moves if x not in board_state or enemy(board_state[x])]
+
+
+def _pawn(origin_position, board_state, white):
+    direction = -1 + 2 * white
+    home_row = 2 if white else 7
+    moves = [(origin_position[0], origin_position[1] + direction)]
+    if not 1 <= moves[0][1] <= 8:
+        return []
+    if origin_position[1] == home_row and moves[0] not in board_state:
+        moves.append((origin_position[0], origin_position[1] + direction * 2))
+    col = ord(origin_position[0])
+    hits = [(chr(col + x), origin_position[1] + direction) for x in (-1, 1) if ord("a") <= col + x <= ord("h")]
+    fun: Callable[[str], bool] = str.islower if white else str.isupper
+    return [(x, False) for x in moves if x not in board_state] + \
+           [(x, True) for x in hits if x in board_state and fun(board_state[x])]
+
+
+_ROOK = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+_BISHOP = [(1, 1), (-1, 1), (1, -1), (-1, -1)]
+_LEGACY = {
+    "p": lambda o, b: _pawn(o, b, False), "P": lambda o, b: _pawn(o, b, True),
+    "n": lambda o, b: _knight(o, b, False), "N": lambda o, b: _knight(o, b, True),
+    "r": lambda o, b: _straight(o, b, False, list(_ROOK)), "R": lambda o, b: _straight(o, b, True, list(_ROOK)),
+    "b": lambda o, b: _straight(o, b, False, list(_BISHOP)), "B": lambda o, b: _straight(o, b, True, list(_BISHOP)),
+    "q": lambda o, b: _straight(o, b, False, _ROOK + _BISHOP),
+    "Q": lambda o, b: _straight(o, b, True, _ROOK + _BISHOP),
+    "k": lambda o, b: _straight(o, b, False, _ROOK + _BISHOP, 1),
+    "K": lambda o, b: _straight(o, b, True, _ROOK + _BISHOP, 1),
+}
+
+
+def legacy_get_next_position(origin_position, board_state):
+    return _LEGACY[board_state[origin_position]](origin_position, board_state)
+
+
+# --- Benchmark ---
+
+def _all_pieces(boards: List[Dict[Tuple[str, int], Optional[str]]], fun) -> int:
+    n = 0
+    for board in boards:
+        for position in board:
+            n += len(fun(position, board))
+    return n
+
+
+def main(number: int = 2000):
+    views = [BoardState(fen=fen).get_board() for fen in FENS]
+    plain = [dict(x) for x in views]
+    pieces = sum(len(x) for x in plain)
+    assert _all_pieces(plain, legacy_get_next_position) == _all_pieces(views, get_next_position)
+
+    results = [
+        ("ray walking (previous)", timeit.timeit(lambda: _all_pieces(plain, legacy_get_next_position), number=number)),
+        ("tables, plain dict", timeit.timeit(lambda: _all_pieces(plain, get_next_position), number=number)),
+        ("tables, board view", timeit.timeit(lambda: _all_pieces(views, get_next_position), number=number)),
+    ]
+    base = results[0][1]
+    print(f"{number} x {pieces} piece lookups over {len(FENS)} positions")
+    for name, t in results:
+        print(f"  {name:24s} {t:8.3f}s  {number * pieces / t:12.0f} lookups/s  x{base / t:5.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Microbenchmark of the tiered MessageCodec.decode against parsing every frame with xsdata.
+
+The frames are bodies recorded from a server during a game, in the proportions they arrived in.
+
+Run with ``python benchmarks/message_decoding.py``.
+"""
+import timeit
+from typing import List, Tuple
+
+from xsdata.formats.dataclass.parsers import XmlParser
+
+from j_chess_lib.communication import JchessMessage, JchessMessageType
+from j_chess_lib.communication.connection.Connection import MessageCodec
+
+_HEAD = b'<?xml version="1.0" encoding="UTF-8"?>\n<JChessMessage messageType="%s" ' \
+        b'playerId="6f1c2b9e-3d4a-4f5b-8c7d-9e0a1b2c3d4e" schemaVersion="0.2.0">'
+_TAIL = b'</JChessMessage>'
+
+HEART_BEAT = _HEAD % b"HeartBeat" + b"<HeartBeat/>" + _TAIL
+AWAIT_MOVES = [
+    _HEAD % b"AwaitMove" + b"<AwaitMove><position>rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1</position>"
+    b"<timeControl><yourTimeInMs>60000</yourTimeInMs><enemyTimeInMs>60000</enemyTimeInMs></timeControl>"
+    b"</AwaitMove>" + _TAIL,
+    _HEAD % b"AwaitMove" + b"<AwaitMove><position>rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq e6 0 2"
+    b"</position><lastMove><from>e7</from><to>e5</to></lastMove><timeControl><yourTimeInMs>58231</yourTimeInMs>"
+    b"<enemyTimeInMs>59102</enemyTimeInMs></timeControl></AwaitMove>" + _TAIL,
+    _HEAD % b"AwaitMove" + b"<AwaitMove><position>r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3"
+    b"</position><lastMove><from>b8</from><to>c6</to></lastMove><timeControl><yourTimeInMs>55012</yourTimeInMs>"
+    b"<enemyTimeInMs>57950</enemyTimeInMs></timeControl></AwaitMove>" + _TAIL,
+    _HEAD % b"AwaitMove" + b"<AwaitMove><position>1Q6/8/8/8/8/2k5/8/1K6 w - - 0 61</position><lastMove><from>b7"
+    b"</from><to>b8</to><promotionUnit>q</promotionUnit></lastMove><timeControl><yourTimeInMs>12040</yourTimeInMs>"
+    b"<enemyTimeInMs>8311</enemyTimeInMs></timeControl></AwaitMove>" + _TAIL,
+]
+GAME_OVER = _HEAD % b"GameOver" + b'<GameOver><winner>RNJesus</winner><isDraw>false</isDraw><pgn>[Event "Casual"]' \
+    b"\n\n1. e4 e5 2. Nf3 Nc6 3. Bb5 a6 1-0</pgn></GameOver>" + _TAIL
+# Two heartbeats for every move request, one game over at the end
+FRAMES = [frame for await_move in AWAIT_MOVES for frame in (HEART_BEAT, HEART_BEAT, await_move)] + [GAME_OVER]
+
+
+def _check(codec: MessageCodec, parser: XmlParser):
+    for frame in FRAMES:
+        fast, full = codec.decode(data=frame), parser.from_bytes(frame, JchessMessage)
+        if full.message_type == JchessMessageType.HEART_BEAT:
+            assert fast.message_type == full.message_type
+        else:
+            assert fast == full, frame
+
+
+def main(number: int = 200):
+    codec, parser = MessageCodec(), XmlParser()
+    _check(codec=codec, parser=parser)
+    groups: List[Tuple[str, List[bytes]]] = [
+        ("all frames", FRAMES), ("heartbeats", [HEART_BEAT]), ("await move", AWAIT_MOVES), ("game over", [GAME_OVER]),
+    ]
+    print(f"{number} x {len(FRAMES)} recorded frames")
+    for name, frames in groups:
+        full = timeit.timeit(lambda: [parser.from_bytes(x, JchessMessage) for x in frames], number=number)
+        tiered = timeit.timeit(lambda: [codec.decode(data=x) for x in frames], number=number)
+        count = number * len(frames)
+        print(f"  {name:12s} xsdata {full / count * 1e6:9.2f}us/frame  tiered {tiered / count * 1e6:9.2f}us/frame"
+              f"  x{full / tiered:7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Microbenchmark of rendering MOVE frames from the client templates against building and serializing the message.
+
+Run with ``python benchmarks/move_serialization.py``.
+"""
+import timeit
+from uuid import uuid4
+
+from j_chess_lib.communication import JchessMessage, JchessMessageType, MoveData
+from j_chess_lib.communication.connection.Connection import MessageCodec
+from j_chess_lib.communication.connection.templates import MessageTemplates
+from j_chess_lib.communication.schema import MoveMessage
+
+MOVES = [MoveData(from_value="e2", to="e4"), MoveData(from_value="g8", to="f6"),
+         MoveData(from_value="b7", to="a8", promotion_unit="q"), MoveData(from_value="e1", to="g1")]
+
+
+def _previous(codec: MessageCodec, player_id, move_data: MoveData) -> bytes:
+    # What Game and Connection.send did for every move before the templates
+    message = JchessMessage(player_id=str(player_id))
+    message.message_type = JchessMessageType.MOVE
+    message.move = MoveMessage(move=move_data)
+    return codec.encode(message=message)
+
+
+def main(number: int = 2000):
+    player_id = uuid4()
+    codec = MessageCodec()
+    templates = MessageTemplates(player_id=str(player_id), codec=codec)
+    assert [_previous(codec, player_id, x) for x in MOVES] == [templates.move(move_data=x) for x in MOVES]
+    results = [
+        ("message + serializer", timeit.timeit(lambda: [_previous(codec, player_id, x) for x in MOVES],
+                                               number=number)),
+        ("template", timeit.timeit(lambda: [templates.move(move_data=x) for x in MOVES], number=number)),
+    ]
+    base = results[0][1]
+    print(f"{number} x {len(MOVES)} MOVE bodies")
+    for name, t in results:
+        print(f"  {name:24s} {t:8.3f}s  {t / (number * len(MOVES)) * 1e6:10.2f}us/move  x{base / t:7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,23 @@
 """Top-level package for j-chess-lib."""
 import logging
+import os
 import sys
 
-logging.basicConfig(level=logging.INFO)
+from .log import default_formatter, start_queue_logging
 
-logger_handler = logging.StreamHandler(stream=sys.stderr)
-logger_formatter = logging.Formatter('{asctime} - {levelname:^8s} - {message}', "%Y-%m-%d %H:%M:%S", "{")
-logger_handler.setFormatter(fmt=logger_formatter)
-logging.getLogger().handlers = []
-logging.getLogger().addHandler(logger_handler)
+# J_CHESS_LOGGING selects how the package sets up logging on import: "stream" writes to stderr, "queue" does the
+# same from a background thread, "json" writes JSON lines from a background thread and "none" leaves logging alone
+_logging_mode = os.environ.get("J_CHESS_LOGGING", "stream").lower()
+if _logging_mode != "none":
+    logging.basicConfig(level=logging.INFO)
+
+    logger_handler = logging.StreamHandler(stream=sys.stderr)
+    logger_formatter = default_formatter()
+    logger_handler.setFormatter(fmt=logger_formatter)
+    logging.getLogger().handlers = []
+    logging.getLogger().addHandler(logger_handler)
+    if _logging_mode in ("queue", "json"):
+        start_queue_logging(json_lines=_logging_mode == "json")
 FORMAT = '{asctime} - {levelname:8s} - {message}s'
 
 logger = logging.getLogger("j_chess_lib")
@@ -19,4 +28,4 @@ __author__ = """RedRem95"""
 __version__ = '0.10.3'
 __schema_version__ = schema_version
 
-logger.info(f"Loading j-chess-lib v-{__version__} by {__author__}. Using schema-version v-{schema_version}")
+logger.info("Loading j-chess-lib v-%s by %s. Using schema-version v-%s", __version__, __author__, schema_version)
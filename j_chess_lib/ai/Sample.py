@@ -21,20 +21,20 @@ class SampleAI(StoreAI):
 
     def new_match(self, match_id: UUID, enemy: str, match_format: MatchFormatData):
         super().new_match(match_id, enemy, match_format)
-        _logger.info(f"{self} started a new match against {enemy}. Match is a {match_format.match_type_value}",
-                     extra={"AI": self})
+        _logger.info("%s started a new match against %s. Match is a %s", self, enemy,
+                     match_format.match_type_value, extra={"AI": self})
 
     def finalize_match(self, match_id: UUID, status: MatchStatusData, statistics: str):
         super().finalize_match(match_id, status, statistics)
         enemy, match_data = self.get_match(match_id=match_id)
-        _logger.info(f"{self} finished the match against {enemy}", extra={"AI": self})
-        _logger.info(f"{status.name_player1:10}: {status.score_player1}", extra={"AI": self})
-        _logger.info(f"{status.name_player2:10}: {status.score_player2}", extra={"AI": self})
+        _logger.info("%s finished the match against %s", self, enemy, extra={"AI": self})
+        _logger.info("%-10s: %s", status.name_player1, status.score_player1, extra={"AI": self})
+        _logger.info("%-10s: %s", status.name_player2, status.score_player2, extra={"AI": self})
 
     def new_game(self, game_id: UUID, match_id: UUID, white_player: str):
         super().new_game(game_id, match_id, white_player)
         enemy, match_data = self.get_match(match_id=match_id)
-        _logger.info(f"{self} started a new game against {enemy}. White is {white_player}", extra={"AI": self})
+        _logger.info("%s started a new game against %s. White is %s", self, enemy, white_player, extra={"AI": self})
         self._w_q = Queue()
         self._b_q = Queue()
         self._w_q.put(MoveData(from_value="f2", to="f3"))
@@ -45,12 +45,12 @@ class SampleAI(StoreAI):
     def finalize_game(self, game_id: UUID, match_id: UUID, winner: Optional[str], pgn: str):
         super().finalize_game(game_id, match_id, winner, pgn)
         enemy, match_data = self.get_match(match_id=match_id)
-        _logger.info(f"{self} finished the game against {enemy}. Winner is {winner}", extra={"AI": self})
+        _logger.info("%s finished the game against %s. Winner is %s", self, enemy, winner, extra={"AI": self})
 
     def get_move(self, game_id: UUID, match_id: UUID, game_state: GameState) -> MoveData:
         white_player = self.get_game(game_id=game_id, match_id=match_id)
         im_white = white_player == self.name
-        _logger.info(f"{self} is expected to move. I am {'white' if im_white else 'black'}", extra={"AI": self})
+        _logger.info("%s is expected to move. I am %s", self, "white" if im_white else "black", extra={"AI": self})
         _logger.info(game_state.board_state.fen, extra={"AI": self})
         move_data = (self._w_q if im_white else self._b_q).get()
         return move_data
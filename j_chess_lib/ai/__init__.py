@@ -1,8 +1,9 @@
 import os
 
 from .ai import AI, StoreAI, DumbAI, VerboseAI
+from .storage import RetentionPolicy
 
-__all__ = ["AI", "StoreAI", "DumbAI", "VerboseAI"]
+__all__ = ["AI", "StoreAI", "DumbAI", "VerboseAI", "RetentionPolicy"]
 
 if os.environ.get("IMPORT_SAMPLE_AIS", True):
     from .examples import *
@@ -1,10 +1,13 @@
 import logging
+import threading
 from abc import ABC, abstractmethod
-from typing import Optional, Tuple, Dict, Any, List
+from typing import Optional, Tuple, Any, List
 from uuid import UUID
 
 from j_chess_lib import logger as lib_logger
+from .board import BoardState
 from .container import GameState
+from .storage import BoundedStore, GameArchive, GameRecord, MatchRecord, RetentionPolicy
 from ..communication.schema import MatchStatusData, MatchFormatData, MoveData
 
 
@@ -40,6 +43,22 @@ class AI(ABC):
     def get_move(self, game_id: UUID, match_id: UUID, game_state: GameState) -> MoveData:
         pass
 
+    @property
+    def pondering(self) -> bool:
+        # Return True to think during the enemy's turn. After every move the game asks predict_reply for the expected
+        # answer and runs ponder on the position after it in a background thread. The next GameState tells with
+        # ponder_hit if the prediction was right
+        return False
+
+    # noinspection PyMethodMayBeStatic
+    def predict_reply(self, game_id: UUID, match_id: UUID, board_state: BoardState) -> Optional[MoveData]:
+        # board_state is the position after the own move, None disables pondering for this move
+        return None
+
+    def ponder(self, game_id: UUID, match_id: UUID, board_state: BoardState, stop: threading.Event):
+        # board_state is the position after the predicted reply. Return as soon as stop is set
+        pass
+
     # noinspection PyMethodMayBeStatic
     def metrics(self) -> List[Tuple[str, Any]]:
         return [("name", self.name)]
@@ -62,42 +81,68 @@ class DumbAI(AI, ABC):
 
 class StoreAI(AI, ABC):
 
-    def __init__(self, name: str = None):
+    def __init__(self, name: str = None, retention: Optional[RetentionPolicy] = None, archive: Optional[str] = None):
+        # Matches and games are kept by the retention policy, by default the 1024 most recently used of each.
+        # archive is a file finished games are appended to when they are dropped
         super().__init__(name)
-        self._match_storage: Dict[UUID, Tuple[str, MatchFormatData]] = {}
-        self._game_storage: Dict[Tuple[UUID, UUID], str] = {}
+        retention = RetentionPolicy() if retention is None else retention
+        self._archive = None if archive is None else GameArchive(archive)
+        self._match_storage: BoundedStore[UUID, MatchRecord] = BoundedStore(policy=retention)
+        self._game_storage: BoundedStore[Tuple[UUID, UUID], GameRecord] = BoundedStore(
+            policy=retention, on_evict=self._archive_game
+        )
         self._current_match: Optional[UUID] = None
         self._current_game: Optional[Tuple[UUID, UUID]] = None
 
-    def get_match(self, match_id: UUID) -> Optional[Tuple[str, MatchFormatData]]:
-        return self._match_storage.get(match_id, None)
+    @property
+    def archive(self) -> Optional[GameArchive]:
+        return self._archive
+
+    def _archive_game(self, key: Tuple[UUID, UUID], record: GameRecord):
+        if self._archive is not None and record.finished:
+            match_id, game_id = key
+            match = self._match_storage.get(match_id)
+            self._archive.write(match_id=match_id, game_id=game_id, record=record,
+                                enemy=None if match is None else match.enemy)
+
+    def get_match(self, match_id: UUID) -> Optional[MatchRecord]:
+        # Unpacks to (enemy, match format)
+        return self._match_storage.get(match_id)
 
     def get_game(self, game_id: UUID, match_id: UUID) -> Optional[str]:
-        return self._game_storage.get((match_id, game_id), None)
+        record = self._game_storage.get((match_id, game_id))
+        return None if record is None else record.white_player
 
     def new_match(self, match_id: UUID, enemy: str, match_format: MatchFormatData):
-        self._match_storage[match_id] = (enemy, match_format)
+        self._match_storage.put(match_id, MatchRecord(enemy=enemy, match_format=match_format))
         self._current_match = match_id
 
     def finalize_match(self, match_id: UUID, status: MatchStatusData, statistics: str):
-        pass
+        self._match_storage.finish(match_id)
 
     def new_game(self, game_id: UUID, match_id: UUID, white_player: str):
-        self._game_storage[(match_id, game_id)] = white_player
+        self._game_storage.put((match_id, game_id), GameRecord(white_player=white_player))
         self._current_game = (game_id, match_id)
 
     def finalize_game(self, game_id: UUID, match_id: UUID, winner: Optional[str], pgn: str):
-        pass
+        record = self._game_storage.get((match_id, game_id))
+        if record is not None:
+            record.finished = True
+            record.winner = winner
+            if self._archive is not None:
+                record.pgn = pgn
+        self._game_storage.finish((match_id, game_id))
 
     def metrics(self) -> List[Tuple[str, Any]]:
         metrics = super().metrics()
-        if self._current_match is not None:
+        if self._current_match is not None and self.get_match(match_id=self._current_match) is not None:
             enemy, match = self.get_match(match_id=self._current_match)
             match: MatchFormatData
             metrics.append(("In match", self._current_match))
             metrics.append(("   against", enemy))
             metrics.append(("   match type", f"{match.match_type_data}"))
-        if self._current_game is not None:
+        if self._current_game is not None and self.get_game(*self._current_game) is not None and \
+                self.get_match(match_id=self._current_game[1]) is not None:
             game_id, match_id = self._current_game
             enemy, match = self.get_match(match_id=match_id)
             white_player = self.get_game(game_id=game_id, match_id=match_id)
@@ -111,11 +156,12 @@ class StoreAI(AI, ABC):
 class VerboseAI(StoreAI, ABC):
 
     def __init__(
-        self, name: str = None, verbose: bool = True, logger: logging.Logger = None, level: int = logging.INFO
+        self, name: str = None, verbose: bool = True, logger: logging.Logger = None, level: int = logging.INFO,
+        retention: Optional[RetentionPolicy] = None, archive: Optional[str] = None
     ):
         if logger is None:
             logger = lib_logger
-        super().__init__(name=name)
+        super().__init__(name=name, retention=retention, archive=archive)
         self.verbose = verbose
         self._logger = logger
         self._level = level
@@ -144,7 +190,7 @@ class VerboseAI(StoreAI, ABC):
 
     def new_game(self, game_id: UUID, match_id: UUID, white_player: str):
         super().new_game(game_id=game_id, match_id=match_id, white_player=white_player)
-        enemy = self.get_match(match_id=match_id)[0]
+        enemy = self._enemy(match_id=match_id)
         white = white_player == self.name
         self._logger.log(
             level=self._level,
@@ -152,20 +198,35 @@ class VerboseAI(StoreAI, ABC):
         )
 
     def finalize_game(self, game_id: UUID, match_id: UUID, winner: Optional[str], pgn: str):
-        enemy = self.get_match(match_id=match_id)[0]
+        super().finalize_game(game_id=game_id, match_id=match_id, winner=winner, pgn=pgn)
+        if not self._logger.isEnabledFor(self._level):
+            return
+        enemy = self._enemy(match_id=match_id)
         result = 'winner' if winner == self.name else 'remis' if winner is None else 'loser'
-        pgn = "\n".join(f"│ {x}" for x in pgn.strip().split("\n"))
         self._logger.log(
-            level=self._level,
-            msg=f"{self.name} finished a game against {enemy} as {result} [{match_id}] [{game_id}]\n"
-                f"┌{'─' * 15}\n"
-                f"{pgn}\n"
-                f"└{'─' * 15}"
+            self._level, "%s finished a game against %s as %s [%s] [%s]\n%s",
+            self.name, enemy, result, match_id, game_id, _PGNBox(pgn=pgn)
         )
 
+    def _enemy(self, match_id: UUID) -> str:
+        # The match may already be evicted by the retention policy
+        match = self.get_match(match_id=match_id)
+        return "an unknown enemy" if match is None else match.enemy
+
     def log_move(self, move_data: MoveData):
-        self.logger.log(
-            level=self._level,
-            msg=f"{self.name} moves from {move_data.from_value} to {move_data.to}"
-                f"{f' Promotion {move_data.promotion_unit}' if move_data.promotion_unit else ''}"
-        )
+        if self._logger.isEnabledFor(self._level):
+            self._logger.log(self._level, "%s moves from %s to %s%s", self.name, move_data.from_value, move_data.to,
+                             f" Promotion {move_data.promotion_unit}" if move_data.promotion_unit else "")
+
+
+class _PGNBox:
+    # Boxed PGN for the log, only built when a handler formats the record
+
+    __slots__ = ("pgn",)
+
+    def __init__(self, pgn: str):
+        self.pgn = pgn
+
+    def __str__(self):
+        pgn = "\n".join(f"│ {x}" for x in self.pgn.strip().split("\n"))
+        return f"┌{'─' * 15}\n{pgn}\n└{'─' * 15}"
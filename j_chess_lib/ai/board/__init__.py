@@ -1,29 +1,45 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Dict, Tuple, Optional, List
 
+from .bitboard import Bitboard, BoardView
+from .moves import MoveList
+from .position import Position
+from .transposition import TranspositionTable
+
+__all__ = ["BoardState", "Bitboard", "BoardView", "MoveList", "Position", "TranspositionTable"]
+
 
 @dataclass(frozen=True)
 class BoardState:
     fen: str
+    _position: Optional[Position] = field(default=None, init=False, repr=False, compare=False)
+    _bitboard: Optional[Bitboard] = field(default=None, init=False, repr=False, compare=False)
 
-    def get_board(self) -> Dict[Tuple[str, int], Optional[str]]:
-        ret: Dict[Tuple[str, int], Optional[str]] = {}
-        row = 8
-        col = ord('a')
-        board_state = self.fen.strip().split(" ", maxsplit=1)[0].strip()
-        for s in board_state:
-            try:
-                i = int(s)
-                col += i
-            except ValueError:
-                if s == "/":
-                    row -= 1
-                    col = ord("a")
-                else:
-                    ret[(chr(col), row)] = s
-                    col += 1
+    @classmethod
+    def from_position(cls, position: Position) -> "BoardState":
+        ret = cls(fen=position.fen())
+        object.__setattr__(ret, "_position", position)
         return ret
 
+    @property
+    def position(self) -> Position:
+        if self._position is None:
+            object.__setattr__(self, "_position", Position.from_fen(self.fen))
+        return self._position
+
+    @property
+    def bitboard(self) -> Bitboard:
+        if self._bitboard is None:
+            object.__setattr__(self, "_bitboard", Bitboard.from_position(self.position))
+        return self._bitboard
+
+    @property
+    def key(self) -> int:
+        return self.bitboard.key
+
+    def get_board(self) -> Dict[Tuple[str, int], Optional[str]]:
+        return BoardView(bitboard=self.bitboard)
+
     def string(self) -> str:
         b = self.get_board()
         ret: List[List[str]] = [[]]
@@ -34,8 +50,8 @@ class BoardState:
                 ret.append([])
         return "\n".join("".join(y for y in x) for x in ret)
 
-    def white_turn(self):
-        return self.fen.lower().strip().split(" ")[1] == "w"
+    def white_turn(self) -> bool:
+        return self.position.white_turn
 
     def __str__(self):
         return self.fen
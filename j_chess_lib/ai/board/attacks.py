@@ -0,0 +1,116 @@
+from typing import Dict, List, Tuple
+
+# Precomputed attack tables, squares are numbered a1=0, ..., h8=63 like in the bitboard module.
+# Sliding pieces use one table per line (rank, file, diagonal, anti-diagonal) and square. Each table is keyed by the
+# occupancy of the relevant line squares, so a rook lookup is two dict accesses and no ray walking
+
+_KNIGHT_HOPS = ((2, 1), (-2, 1), (2, -1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2))
+_KING_STEPS = ((1, 1), (-1, 1), (1, -1), (-1, -1), (1, 0), (-1, 0), (0, 1), (0, -1))
+_LINES: Tuple[Tuple[Tuple[int, int], Tuple[int, int]], ...] = (
+    ((1, 0), (-1, 0)),  # rank
+    ((0, 1), (0, -1)),  # file
+    ((1, 1), (-1, -1)),  # diagonal
+    ((1, -1), (-1, 1)),  # anti-diagonal
+)
+RANK, FILE, DIAGONAL, ANTI_DIAGONAL = range(4)
+
+
+def _on_board(file: int, rank: int) -> bool:
+    return 0 <= file < 8 and 0 <= rank < 8
+
+
+def _leaper(square: int, steps: Tuple[Tuple[int, int], ...]) -> int:
+    file, rank = square % 8, square // 8
+    ret = 0
+    for df, dr in steps:
+        if _on_board(file + df, rank + dr):
+            ret |= 1 << (file + df + (rank + dr) * 8)
+    return ret
+
+
+def _ray(square: int, df: int, dr: int, occupied: int = 0) -> int:
+    file, rank = square % 8 + df, square // 8 + dr
+    ret = 0
+    while _on_board(file, rank):
+        bit = 1 << (file + rank * 8)
+        ret |= bit
+        if occupied & bit:
+            break
+        file, rank = file + df, rank + dr
+    return ret
+
+
+def _relevant(square: int, df: int, dr: int) -> int:
+    # Ray without its last square. A piece on the board edge never changes what is attacked
+    ray = _ray(square, df, dr)
+    if ray == 0:
+        return 0
+    return ray ^ (1 << (ray.bit_length() - 1) if df + 8 * dr > 0 else ray & -ray)
+
+
+def _between(a: int, b: int) -> int:
+    df, dr = b % 8 - a % 8, b // 8 - a // 8
+    if a == b or not (df == 0 or dr == 0 or abs(df) == abs(dr)):
+        return 0
+    df, dr = (df > 0) - (df < 0), (dr > 0) - (dr < 0)
+    return _ray(a, df, dr, occupied=1 << b) & ~(1 << b)
+
+
+def _subsets(mask: int):
+    sub = 0
+    while True:
+        yield sub
+        sub = (sub - mask) & mask
+        if sub == 0:
+            break
+
+
+def _build_line_tables() -> Tuple[List[List[int]], List[List[Dict[int, int]]]]:
+    masks: List[List[int]] = []
+    tables: List[List[Dict[int, int]]] = []
+    for directions in _LINES:
+        line_masks: List[int] = []
+        line_tables: List[Dict[int, int]] = []
+        for square in range(64):
+            mask = 0
+            for df, dr in directions:
+                mask |= _relevant(square, df, dr)
+            line_masks.append(mask)
+            line_tables.append({
+                occupied: _ray(square, *directions[0], occupied=occupied) | _ray(square, *directions[1],
+                                                                                 occupied=occupied)
+                for occupied in _subsets(mask)
+            })
+        masks.append(line_masks)
+        tables.append(line_tables)
+    return masks, tables
+
+
+KNIGHT_ATTACKS: List[int] = [_leaper(s, _KNIGHT_HOPS) for s in range(64)]
+KING_ATTACKS: List[int] = [_leaper(s, _KING_STEPS) for s in range(64)]
+# PAWN_ATTACKS[white][square]
+PAWN_ATTACKS: Tuple[List[int], List[int]] = (
+    [_leaper(s, ((1, -1), (-1, -1))) for s in range(64)],
+    [_leaper(s, ((1, 1), (-1, 1))) for s in range(64)],
+)
+LINE_MASKS, LINE_ATTACKS = _build_line_tables()
+_RANK_MASKS, _FILE_MASKS, _DIAGONAL_MASKS, _ANTI_DIAGONAL_MASKS = LINE_MASKS
+_RANK_ATTACKS, _FILE_ATTACKS, _DIAGONAL_ATTACKS, _ANTI_DIAGONAL_ATTACKS = LINE_ATTACKS
+ROOK_RAYS: List[int] = [_RANK_ATTACKS[s][0] | _FILE_ATTACKS[s][0] for s in range(64)]
+BISHOP_RAYS: List[int] = [_DIAGONAL_ATTACKS[s][0] | _ANTI_DIAGONAL_ATTACKS[s][0] for s in range(64)]
+# BETWEEN[a][b]: squares strictly between a and b if they share a rank, file or diagonal, else 0
+BETWEEN: List[List[int]] = [[_between(a, b) for b in range(64)] for a in range(64)]
+
+
+def rook_attacks(square: int, occupied: int) -> int:
+    return _RANK_ATTACKS[square][occupied & _RANK_MASKS[square]] | \
+           _FILE_ATTACKS[square][occupied & _FILE_MASKS[square]]
+
+
+def bishop_attacks(square: int, occupied: int) -> int:
+    return _DIAGONAL_ATTACKS[square][occupied & _DIAGONAL_MASKS[square]] | \
+           _ANTI_DIAGONAL_ATTACKS[square][occupied & _ANTI_DIAGONAL_MASKS[square]]
+
+
+def queen_attacks(square: int, occupied: int) -> int:
+    return rook_attacks(square, occupied) | bishop_attacks(square, occupied)
@@ -0,0 +1,189 @@
+from typing import NamedTuple, Optional, Sequence, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImportError("Batched board analysis needs numpy. Install it with 'pip install j_chess_lib[numpy]'") from e
+
+from .attacks import KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS
+from .bitboard import FULL, NOT_A, NOT_AB, NOT_GH, NOT_H, RANK_3, RANK_6
+from .position import Position
+
+# Boards are (N, 64) int8 arrays of Position piece codes: 0 empty, 1-6 white P N B R Q K, -1 to -6 black.
+# Internally every position becomes twelve uint64 bitboards and all pieces of the batch are processed together with
+# shift based (Kogge-Stone) fills, so there is no python loop over positions or pieces
+
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(1, 7)
+
+_U64 = np.dtype("<u8")
+_FULL = np.uint64(FULL)
+_RANK_3 = np.uint64(RANK_3)
+_RANK_6 = np.uint64(RANK_6)
+# (shift, mask applied after shifting) per direction, negative shifts move towards a1
+_ROOK_DIRECTIONS = ((8, _FULL), (-8, _FULL), (1, np.uint64(NOT_A)), (-1, np.uint64(NOT_H)))
+_BISHOP_DIRECTIONS = ((9, np.uint64(NOT_A)), (7, np.uint64(NOT_H)), (-7, np.uint64(NOT_A)), (-9, np.uint64(NOT_H)))
+_KNIGHT = np.array(KNIGHT_ATTACKS, dtype=_U64)
+_KING = np.array(KING_ATTACKS, dtype=_U64)
+# _PAWN[0] black, _PAWN[1] white
+_PAWN = np.array(PAWN_ATTACKS, dtype=_U64)
+_BITS = np.left_shift(np.uint64(1), np.arange(64, dtype=_U64))
+_POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+class BatchResult(NamedTuple):
+    # attacks[n, color]: bitboard (uint64) of the squares attacked by color (0 white, 1 black)
+    attacks: "np.ndarray"
+    # mobility[n, color]: number of pseudo legal moves of color
+    mobility: "np.ndarray"
+    # in_check[n, color]: king of color is attacked
+    in_check: "np.ndarray"
+    # moves[i] = (board index, from square, to square) of the pseudo legal moves of the side to move
+    moves: "np.ndarray"
+
+
+def _shift(bb: "np.ndarray", shift: int) -> "np.ndarray":
+    if shift > 0:
+        return np.left_shift(bb, np.uint64(shift))
+    return np.right_shift(bb, np.uint64(-shift))
+
+
+def _slide(generator: "np.ndarray", empty: "np.ndarray", directions) -> "np.ndarray":
+    ret = np.zeros_like(generator)
+    for shift, mask in directions:
+        gen = generator
+        free = empty & mask
+        gen = gen | (free & _shift(gen, shift))
+        free = free & _shift(free, shift)
+        gen = gen | (free & _shift(gen, 2 * shift))
+        free = free & _shift(free, 2 * shift)
+        gen = gen | (free & _shift(gen, 4 * shift))
+        ret |= _shift(gen, shift) & mask
+    return ret
+
+
+def popcount(bb: "np.ndarray") -> "np.ndarray":
+    bb = np.ascontiguousarray(bb, dtype=_U64)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(bb)
+    return _POPCOUNT8[bb.view(np.uint8)].reshape(bb.shape + (8,)).sum(axis=-1, dtype=np.uint8)
+
+
+def encode_fens(fens: Sequence[str]) -> Tuple["np.ndarray", "np.ndarray"]:
+    boards = np.zeros((len(fens), 64), dtype=np.int8)
+    white_turn = np.ones(len(fens), dtype=bool)
+    for i, fen in enumerate(fens):
+        position = Position.from_fen(fen)
+        boards[i] = np.frombuffer(position.board, dtype=np.int8)
+        white_turn[i] = position.white_turn
+    return boards, white_turn
+
+
+def to_bitboards(boards: "np.ndarray") -> "np.ndarray":
+    # (N, 12) uint64 in the piece order of the bitboard module (PNBRQKpnbrqk)
+    boards = np.asarray(boards, dtype=np.int8).reshape(-1, 64)
+    codes = np.array([1, 2, 3, 4, 5, 6, -1, -2, -3, -4, -5, -6], dtype=np.int8)
+    packed = np.packbits(boards[:, None, :] == codes[None, :, None], axis=-1, bitorder="little")
+    return np.ascontiguousarray(packed).view(_U64).reshape(-1, 12)
+
+
+def attack_maps(bitboards: "np.ndarray") -> "np.ndarray":
+    # (N, 2) uint64, squares attacked by white and by black
+    occupied = np.bitwise_or.reduce(bitboards, axis=1)
+    empty = ~occupied
+    ret = np.empty((bitboards.shape[0], 2), dtype=_U64)
+    for color, o in ((0, 0), (1, 6)):
+        p = bitboards[:, o:o + 6]
+        pawns = p[:, 0]
+        if color == 0:
+            pawn = (_shift(pawns, 9) & np.uint64(NOT_A)) | (_shift(pawns, 7) & np.uint64(NOT_H))
+        else:
+            pawn = (_shift(pawns, -7) & np.uint64(NOT_A)) | (_shift(pawns, -9) & np.uint64(NOT_H))
+        knights = p[:, 1]
+        knight = np.zeros_like(knights)
+        for shift, mask in ((17, NOT_A), (15, NOT_H), (10, NOT_AB), (6, NOT_GH),
+                            (-6, NOT_AB), (-10, NOT_GH), (-15, NOT_A), (-17, NOT_H)):
+            knight |= _shift(knights, shift) & np.uint64(mask)
+        kings = p[:, 5]
+        king = kings | (_shift(kings, 1) & np.uint64(NOT_A)) | (_shift(kings, -1) & np.uint64(NOT_H))
+        king = (king | _shift(king, 8) | _shift(king, -8)) ^ kings
+        straight = _slide(p[:, 3] | p[:, 4], empty, _ROOK_DIRECTIONS)
+        diagonal = _slide(p[:, 2] | p[:, 4], empty, _BISHOP_DIRECTIONS)
+        ret[:, color] = pawn | knight | king | straight | diagonal
+    return ret
+
+
+def _piece_targets(boards: "np.ndarray", bitboards: "np.ndarray", n: "np.ndarray", square: "np.ndarray"
+                   ) -> "np.ndarray":
+    # Pseudo legal target bitboard of every given piece
+    code = boards[n, square]
+    kind = np.abs(code)
+    white = code > 0
+    white_bb = np.bitwise_or.reduce(bitboards[:, :6], axis=1)[n]
+    black_bb = np.bitwise_or.reduce(bitboards[:, 6:], axis=1)[n]
+    empty = ~(white_bb | black_bb)
+    bit = _BITS[square]
+    ret = np.zeros(len(n), dtype=_U64)
+
+    sel = kind == KNIGHT
+    ret[sel] = _KNIGHT[square[sel]]
+    sel = kind == KING
+    ret[sel] = _KING[square[sel]]
+    for directions, kinds in ((_ROOK_DIRECTIONS, (ROOK, QUEEN)), (_BISHOP_DIRECTIONS, (BISHOP, QUEEN))):
+        sel = np.isin(kind, kinds)
+        ret[sel] |= _slide(bit[sel], empty[sel], directions)
+    ret &= ~np.where(white, white_bb, black_bb)
+
+    sel = (kind == PAWN) & white
+    single = np.left_shift(bit[sel], np.uint64(8)) & empty[sel]
+    double = np.left_shift(single & _RANK_3, np.uint64(8)) & empty[sel]
+    ret[sel] = single | double | (_PAWN[1][square[sel]] & black_bb[sel])
+    sel = (kind == PAWN) & ~white
+    single = np.right_shift(bit[sel], np.uint64(8)) & empty[sel]
+    double = np.right_shift(single & _RANK_6, np.uint64(8)) & empty[sel]
+    ret[sel] = single | double | (_PAWN[0][square[sel]] & white_bb[sel])
+    return ret
+
+
+def _analyze(boards: "np.ndarray", white_turn: "np.ndarray", offset: int) -> BatchResult:
+    bitboards = to_bitboards(boards)
+    attacks = attack_maps(bitboards)
+    kings = bitboards[:, [5, 11]]
+    in_check = (kings & attacks[:, ::-1]) != 0
+
+    n, square = np.nonzero(boards)
+    targets = _piece_targets(boards, bitboards, n, square)
+    color = (boards[n, square] < 0).astype(np.intp)
+    mobility = np.bincount(2 * n + color, weights=popcount(targets), minlength=2 * len(boards))
+    mobility = mobility.astype(np.int64).reshape(-1, 2)
+
+    own = color == (~white_turn[n]).astype(np.intp)
+    n, square, targets = n[own], square[own], targets[own]
+    bits = np.unpackbits(targets.astype(_U64).view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    i, to = np.nonzero(bits)
+    return BatchResult(
+        attacks=attacks, mobility=mobility, in_check=in_check,
+        moves=np.stack([n[i] + offset, square[i], to], axis=1).astype(np.int32),
+    )
+
+
+def analyze(
+    boards: Union["np.ndarray", Sequence[str]], white_turn: Optional["np.ndarray"] = None, chunk_size: int = 4096
+) -> BatchResult:
+    # Attack maps, mobility, check flags and move lists for a whole batch of positions. Takes an (N, 64) int8 array
+    # of piece codes or N FEN strings. Side to move comes from the FEN or white_turn and defaults to white.
+    # Work is done in chunks of chunk_size positions to keep the temporary arrays small
+    if len(boards) > 0 and isinstance(boards[0], str):
+        boards, fen_white_turn = encode_fens(boards)
+        white_turn = fen_white_turn if white_turn is None else white_turn
+    boards = np.asarray(boards, dtype=np.int8).reshape(-1, 64)
+    white_turn = np.ones(len(boards), dtype=bool) if white_turn is None else np.asarray(white_turn, dtype=bool)
+    results = [
+        _analyze(boards[i:i + chunk_size], white_turn[i:i + chunk_size], offset=i)
+        for i in range(0, len(boards), chunk_size)
+    ]
+    if len(results) == 0:
+        return BatchResult(
+            attacks=np.zeros((0, 2), dtype=_U64), mobility=np.zeros((0, 2), dtype=np.int64),
+            in_check=np.zeros((0, 2), dtype=bool), moves=np.zeros((0, 3), dtype=np.int32),
+        )
+    return BatchResult(*(np.concatenate(x) for x in zip(*results)))
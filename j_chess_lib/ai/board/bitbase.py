@@ -0,0 +1,252 @@
+import argparse
+import mmap
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+from .attacks import KING_ATTACKS, PAWN_ATTACKS, rook_attacks, queen_attacks
+from .bitboard import Bitboard, iter_bits, PAWN, ROOK, QUEEN, KING, BLACK_OFFSET
+
+# Win/draw bitbases of king and one piece against the lone king. The strong side is stored as white, positions with
+# a black piece are probed mirrored. Bit ((stm * 64 + strong king) * 64 + weak king) * 64 + piece is set if the
+# strong side wins, stm is 0 with the strong side to move and 1 with the weak side to move. The weak side can not
+# win these endings, so one bit holds the whole result. Castling and en passant are ignored
+TABLES: Dict[str, int] = {"KQK": QUEEN, "KRK": ROOK, "KPK": PAWN}
+# Tables the generation of a table reads, promotions of KPK end in KQK or KRK
+_DEPENDS: Dict[str, Sequence[str]] = {"KQK": (), "KRK": (), "KPK": ("KQK", "KRK")}
+SIZE = 2 * 64 * 64 * 64
+WIN, DRAW, LOSS = 1, 0, -1
+_INVALID = 255
+
+
+def index(strong_to_move: bool, strong_king: int, weak_king: int, piece: int) -> int:
+    return (((0 if strong_to_move else 1) * 64 + strong_king) * 64 + weak_king) * 64 + piece
+
+
+def _valid(kind: int, wk: int, bk: int, ps: int) -> bool:
+    if wk == bk or wk == ps or bk == ps or KING_ATTACKS[wk] >> bk & 1:
+        return False
+    return kind != PAWN or 8 <= ps < 56
+
+
+def _attacks(kind: int, wk: int, ps: int) -> int:
+    # Squares attacked by the strong side. The weak king is left out of the occupancy, it can not step back along
+    # the ray of a slider
+    occupied = 1 << wk | 1 << ps
+    if kind == QUEEN:
+        return KING_ATTACKS[wk] | queen_attacks(ps, occupied)
+    if kind == ROOK:
+        return KING_ATTACKS[wk] | rook_attacks(ps, occupied)
+    return KING_ATTACKS[wk] | PAWN_ATTACKS[1][ps]
+
+
+def _count_chunk(kind: int, wk: int) -> bytes:
+    # Legal moves of the weak side for every (weak king, piece) with the strong king on wk, _INVALID for impossible
+    # positions. Captures of the piece count as moves, they lead to a draw
+    ret = bytearray([_INVALID]) * (64 * 64)
+    for bk in range(64):
+        for ps in range(64):
+            if not _valid(kind, wk, bk, ps):
+                continue
+            attacked = _attacks(kind, wk, ps)
+            ret[bk * 64 + ps] = bin(KING_ATTACKS[bk] & ~attacked & ~(1 << wk)).count("1")
+    return bytes(ret)
+
+
+def _strong_unmoves(kind: int, wk: int, bk: int, ps: int) -> List[int]:
+    # Positions with the strong side to move that lead to (wk, bk, ps) with the weak side to move
+    occupied = 1 << wk | 1 << bk | 1 << ps
+    ret = []
+    for f in iter_bits(KING_ATTACKS[wk] & ~occupied & ~KING_ATTACKS[bk]):
+        if not _attacks(kind, f, ps) >> bk & 1:
+            ret.append(index(True, f, bk, ps))
+    if kind == PAWN:
+        origins = []
+        if ps >= 16 and not occupied >> (ps - 8) & 1:
+            origins.append(ps - 8)
+            if 24 <= ps < 32 and not occupied >> (ps - 16) & 1:
+                origins.append(ps - 16)
+    elif kind == QUEEN:
+        origins = iter_bits(queen_attacks(ps, occupied) & ~occupied)
+    else:
+        origins = iter_bits(rook_attacks(ps, occupied) & ~occupied)
+    for f in origins:
+        if not _attacks(kind, wk, f) >> bk & 1:
+            ret.append(index(True, wk, bk, f))
+    return ret
+
+
+def _weak_unmoves(kind: int, wk: int, bk: int, ps: int) -> List[int]:
+    occupied = 1 << wk | 1 << bk | 1 << ps
+    return [index(False, wk, f, ps) for f in iter_bits(KING_ATTACKS[bk] & ~occupied & ~KING_ATTACKS[wk])]
+
+
+def _solve(name: str, counts: List[bytes], tables: Dict[str, bytes]) -> bytearray:
+    # Retrograde analysis: a weak side position is lost once all its moves reach won strong side positions, a strong
+    # side position is won once one move reaches a lost weak side position. Returns one byte per position
+    kind = TABLES[name]
+    count = bytearray(b"".join(counts))
+    won = bytearray(SIZE)
+    queue = deque()
+    offset = index(False, 0, 0, 0)
+
+    def win_strong(i: int):
+        if won[i]:
+            return
+        won[i] = 1
+        wk, bk, ps = i >> 12 & 63, i >> 6 & 63, i & 63
+        for j in _weak_unmoves(kind, wk, bk, ps):
+            if won[j]:
+                continue
+            count[j - offset] -= 1
+            if count[j - offset] == 0:
+                won[j] = 1
+                queue.append(j)
+
+    for i, c in enumerate(count):
+        if c == 0:
+            # Mate if in check, else stalemate
+            wk, bk, ps = i >> 12, i >> 6 & 63, i & 63
+            if _attacks(kind, wk, ps) >> bk & 1:
+                won[offset + i] = 1
+                queue.append(offset + i)
+    if kind == PAWN:
+        # Promotions into won positions of the tables with the new piece
+        for wk in range(64):
+            for bk in range(64):
+                for ps in range(48, 56):
+                    if not _valid(kind, wk, bk, ps) or _attacks(kind, wk, ps) >> bk & 1 or ps + 8 in (wk, bk):
+                        continue
+                    after = index(False, wk, bk, ps + 8)
+                    if any(tables[t][after >> 3] >> (after & 7) & 1 for t in _DEPENDS[name]):
+                        win_strong(index(True, wk, bk, ps))
+
+    while queue:
+        i = queue.popleft()
+        for j in _strong_unmoves(kind, i >> 12 & 63, i >> 6 & 63, i & 63):
+            win_strong(j)
+    return won
+
+
+def pack(won: bytes) -> bytes:
+    # One byte per position (0 or 1) to one bit per position, bit i & 7 of byte i >> 3. The bytes of the slices are
+    # 0 or 1, so the shifted sums never carry into the next byte
+    size = len(won) // 8
+    packed = sum(int.from_bytes(bytes(won[bit::8]), "little") << bit for bit in range(8))
+    return packed.to_bytes(size, "little")
+
+
+def generate(directory: str, names: Sequence[str] = tuple(TABLES), workers: Optional[int] = None) -> Dict[str, str]:
+    # Writes <name>.bb for every table (and the tables it depends on) and returns the paths. The legal move counts
+    # are computed by a process pool split by strong king square, the retrograde passes of independent tables
+    # overlap with the counting of the others
+    names = list(dict.fromkeys([d for n in names for d in _DEPENDS[n]] + list(names)))
+    os.makedirs(directory, exist_ok=True)
+    paths = {name: os.path.join(directory, f"{name}.bb") for name in names}
+    tables: Dict[str, bytes] = {}
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        chunks = {name: [pool.submit(_count_chunk, TABLES[name], wk) for wk in range(64)] for name in names}
+        for name in names:
+            counts = [f.result() for f in chunks[name]]
+            tables[name] = pack(_solve(name, counts, tables))
+            with open(paths[name], "wb") as f_out:
+                f_out.write(tables[name])
+    return paths
+
+
+class Bitbases:
+    # Memory mapped tables of a directory written by generate. probe answers from the side to move's view with
+    # WIN, DRAW or LOSS and None for positions without a table
+
+    def __init__(self, directory: str):
+        self._files = []
+        self._tables: Dict[int, mmap.mmap] = {}
+        for name, kind in TABLES.items():
+            path = os.path.join(directory, f"{name}.bb")
+            if os.path.isfile(path):
+                f_in = open(path, "rb")
+                self._files.append(f_in)
+                self._tables[kind] = mmap.mmap(f_in.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @property
+    def names(self) -> List[str]:
+        return [name for name, kind in TABLES.items() if kind in self._tables]
+
+    def close(self):
+        for table in self._tables.values():
+            table.close()
+        for f_in in self._files:
+            f_in.close()
+        self._tables, self._files = {}, []
+
+    def __enter__(self) -> "Bitbases":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def probe(self, board: Bitboard) -> Optional[int]:
+        if bin(board.occupied).count("1") != 3:
+            return None
+        pieces = board.pieces
+        for kind, table in self._tables.items():
+            for strong_white in (True, False):
+                own = 0 if strong_white else BLACK_OFFSET
+                if pieces[own + kind] == 0:
+                    continue
+                ps = pieces[own + kind].bit_length() - 1
+                wk = pieces[own + KING].bit_length() - 1
+                bk = pieces[BLACK_OFFSET - own + KING].bit_length() - 1
+                if not strong_white:
+                    # Mirror the ranks, the pawn of the strong side has to move up
+                    ps, wk, bk = ps ^ 56, wk ^ 56, bk ^ 56
+                strong_to_move = board.white_turn == strong_white
+                i = index(strong_to_move, wk, bk, ps)
+                if table[i >> 3] >> (i & 7) & 1:
+                    return WIN if strong_to_move else LOSS
+                return DRAW
+        return None
+
+    def best_moves(self, board: Bitboard) -> Optional[List[int]]:
+        # Legal moves (encoded) that keep the best result of the position, None without a table for it. Moves out of
+        # the tables (captures, minor promotions) end in drawn material
+        if self.probe(board) is None:
+            return None
+        best, ret = LOSS, []
+        for move in board.generate_move_list():
+            undo = board.make_encoded_move(move)
+            try:
+                result = self.probe(board)
+            finally:
+                board.unmake_move(undo)
+            result = DRAW if result is None else -result
+            if result > best:
+                best, ret = result, []
+            if result == best:
+                ret.append(move)
+        return ret
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate endgame bitbases")
+    parser.add_argument("directory", help="directory to write the tables to")
+    # No choices, argparse would check the empty list against them
+    parser.add_argument("tables", nargs="*", help=f"tables to generate out of {', '.join(TABLES)}, all if missing")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="processes, all cores if missing")
+    parsed = parser.parse_args(args)
+    start = time.perf_counter()
+    unknown = [name for name in parsed.tables if name not in TABLES]
+    if unknown:
+        parser.error(f"unknown tables: {', '.join(unknown)} (choose from {', '.join(TABLES)})")
+    names = parsed.tables or list(TABLES)
+    for name, path in generate(parsed.directory, names=names, workers=parsed.workers).items():
+        print(f"{name}: {path}")
+    print(f"Generated in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,510 @@
+from typing import Dict, List, Optional, Tuple, Iterator, NamedTuple, TYPE_CHECKING
+
+from .attacks import KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, ROOK_RAYS, BISHOP_RAYS, BETWEEN, rook_attacks, \
+    bishop_attacks
+from .moves import CASTLING, EN_PASSANT, PROMOTION, MoveList, encode_move
+from .zobrist import PIECE_KEYS, SIDE_KEY, CASTLING_KEYS, EP_KEYS, compute_key
+
+if TYPE_CHECKING:
+    from .position import Position
+
+# Squares are numbered a1=0, b1=1, ..., h1=7, a2=8, ..., h8=63
+PIECES = "PNBRQKpnbrqk"
+PIECE_INDEX: Dict[str, int] = {p: i for i, p in enumerate(PIECES)}
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+BLACK_OFFSET = 6
+
+FULL = 0xFFFF_FFFF_FFFF_FFFF
+FILE_A = 0x0101_0101_0101_0101
+FILE_B = FILE_A << 1
+FILE_G = FILE_A << 6
+FILE_H = FILE_A << 7
+RANK_1 = 0xFF
+RANK_2 = RANK_1 << 8
+RANK_3 = RANK_1 << 16
+RANK_6 = RANK_1 << 40
+RANK_7 = RANK_1 << 48
+RANK_8 = RANK_1 << 56
+NOT_A = FULL ^ FILE_A
+NOT_H = FULL ^ FILE_H
+NOT_AB = FULL ^ (FILE_A | FILE_B)
+NOT_GH = FULL ^ (FILE_G | FILE_H)
+
+SQUARES: List[Tuple[str, int]] = [(chr(ord("a") + s % 8), s // 8 + 1) for s in range(64)]
+SQUARE_INDEX: Dict[Tuple[str, int], int] = {p: i for i, p in enumerate(SQUARES)}
+SQUARE_NAMES: List[str] = [f"{f}{r}" for f, r in SQUARES]
+SQUARE_NAME_INDEX: Dict[str, int] = {n: i for i, n in enumerate(SQUARE_NAMES)}
+
+WHITE_KING_SIDE, WHITE_QUEEN_SIDE, BLACK_KING_SIDE, BLACK_QUEEN_SIDE = 1, 2, 4, 8
+CASTLING_RIGHTS: Dict[str, int] = {"K": WHITE_KING_SIDE, "Q": WHITE_QUEEN_SIDE, "k": BLACK_KING_SIDE,
+                                   "q": BLACK_QUEEN_SIDE}
+# Castling rights that survive a move touching the square
+_CASTLING_MASK: List[int] = [15] * 64
+_CASTLING_MASK[0] ^= WHITE_QUEEN_SIDE
+_CASTLING_MASK[4] ^= WHITE_KING_SIDE | WHITE_QUEEN_SIDE
+_CASTLING_MASK[7] ^= WHITE_KING_SIDE
+_CASTLING_MASK[56] ^= BLACK_QUEEN_SIDE
+_CASTLING_MASK[60] ^= BLACK_KING_SIDE | BLACK_QUEEN_SIDE
+_CASTLING_MASK[63] ^= BLACK_KING_SIDE
+# Encoded promotion bits of queen, rook, bishop, knight
+_PROMOTION_FLAGS = tuple(encode_move(0, 0, promotion=p) for p in (QUEEN, ROOK, BISHOP, KNIGHT))
+# King target square -> (rook origin, rook target)
+_CASTLING_ROOK: Dict[int, Tuple[int, int]] = {6: (7, 5), 2: (0, 3), 62: (63, 61), 58: (56, 59)}
+
+
+def iter_bits(bb: int) -> Iterator[int]:
+    while bb:
+        lsb = bb & -bb
+        yield lsb.bit_length() - 1
+        bb ^= lsb
+
+
+def knight_attacks(bb: int) -> int:
+    return (((bb << 17) & NOT_A) | ((bb << 15) & NOT_H) | ((bb << 10) & NOT_AB) | ((bb << 6) & NOT_GH) |
+            ((bb >> 15) & NOT_A) | ((bb >> 17) & NOT_H) | ((bb >> 6) & NOT_AB) | ((bb >> 10) & NOT_GH)) & FULL
+
+
+def king_attacks(bb: int) -> int:
+    row = bb | ((bb << 1) & NOT_A) | ((bb >> 1) & NOT_H)
+    return (row | (row << 8) | (row >> 8)) & FULL & ~bb
+
+
+def pawn_attacks(bb: int, white: bool) -> int:
+    if white:
+        return (((bb << 9) & NOT_A) | ((bb << 7) & NOT_H)) & FULL
+    return ((bb >> 7) & NOT_A) | ((bb >> 9) & NOT_H)
+
+
+class Undo(NamedTuple):
+    from_square: int
+    to_square: int
+    piece: int
+    placed: int
+    captured: int
+    captured_square: int
+    castling: int
+    ep_square: int
+    halfmove: int
+    key: int
+
+
+class Bitboard:
+    __slots__ = ("pieces", "white", "black", "occupied", "squares",
+                 "white_turn", "castling", "ep_square", "halfmove", "fullmove", "key")
+
+    def __init__(self, pieces: Optional[List[int]] = None, white_turn: bool = True, castling: int = 0,
+                 ep_square: int = -1, halfmove: int = 0, fullmove: int = 1):
+        self.pieces: List[int] = [0] * 12 if pieces is None else list(pieces)
+        self.squares: List[int] = [-1] * 64
+        for i, bb in enumerate(self.pieces):
+            for square in iter_bits(bb):
+                self.squares[square] = i
+        self.white = 0
+        self.black = 0
+        self.occupied = 0
+        self.update_occupancy()
+        self.white_turn = white_turn
+        self.castling = castling
+        self.ep_square = ep_square
+        self.halfmove = halfmove
+        self.fullmove = fullmove
+        self.key = compute_key(self.pieces, white_turn, castling, ep_square)
+
+    def update_occupancy(self):
+        p = self.pieces
+        self.white = p[0] | p[1] | p[2] | p[3] | p[4] | p[5]
+        self.black = p[6] | p[7] | p[8] | p[9] | p[10] | p[11]
+        self.occupied = self.white | self.black
+
+    @classmethod
+    def from_fen(cls, fen: str) -> "Bitboard":
+        from .position import Position
+        return cls.from_position(Position.from_fen(fen))
+
+    @classmethod
+    def from_position(cls, position: "Position") -> "Bitboard":
+        pieces = [0] * 12
+        for square, code in enumerate(position.board):
+            if code > 0:
+                pieces[code - 1] |= 1 << square
+            elif code < 0:
+                pieces[BLACK_OFFSET - code - 1] |= 1 << square
+        return cls(pieces=pieces, white_turn=position.white_turn, castling=position.castling,
+                   ep_square=position.ep_square, halfmove=position.halfmove, fullmove=position.fullmove)
+
+    @classmethod
+    def from_dict(cls, board: Dict[Tuple[str, int], Optional[str]]) -> "Bitboard":
+        pieces = [0] * 12
+        for position, figure in board.items():
+            if figure is not None:
+                pieces[PIECE_INDEX[figure]] |= 1 << SQUARE_INDEX[position]
+        return cls(pieces=pieces)
+
+    def copy(self) -> "Bitboard":
+        return self.__class__(pieces=self.pieces, white_turn=self.white_turn, castling=self.castling,
+                              ep_square=self.ep_square, halfmove=self.halfmove, fullmove=self.fullmove)
+
+    def make_move(self, from_square: int, to_square: int, promotion: int = -1) -> Undo:
+        # Applies a move in place, including castling, en passant and promotions (a queen if none is given).
+        # The returned record restores the position with unmake_move
+        squares = self.squares
+        pieces = self.pieces
+        piece = squares[from_square]
+        if piece < 0:
+            raise ValueError(f"There is no piece on {SQUARE_NAMES[from_square]}")
+        white = piece < BLACK_OFFSET
+        color = 0 if white else BLACK_OFFSET
+        kind = piece - color
+        castle = kind == KING and (to_square - from_square == 2 or from_square - to_square == 2)
+        if castle and (to_square not in _CASTLING_ROOK or squares[_CASTLING_ROOK[to_square][0]] != color + ROOK):
+            raise ValueError(f"{SQUARE_NAMES[from_square]}{SQUARE_NAMES[to_square]} is no castling move")
+        move_bits = (1 << from_square) | (1 << to_square)
+        captured = squares[to_square]
+        captured_square = to_square
+        if kind == PAWN and to_square == self.ep_square and captured < 0:
+            captured_square = to_square - 8 if white else to_square + 8
+            captured = squares[captured_square]
+        placed = piece
+        if kind == PAWN and (to_square >= 56 or to_square < 8):
+            placed = color + (QUEEN if promotion < 0 else promotion)
+        undo = Undo(from_square, to_square, piece, placed, captured, captured_square,
+                    self.castling, self.ep_square, self.halfmove, self.key)
+        key = self.key ^ PIECE_KEYS[piece][from_square] ^ PIECE_KEYS[placed][to_square] ^ SIDE_KEY
+
+        if captured >= 0:
+            captured_bit = 1 << captured_square
+            pieces[captured] ^= captured_bit
+            squares[captured_square] = -1
+            key ^= PIECE_KEYS[captured][captured_square]
+            if white:
+                self.black ^= captured_bit
+            else:
+                self.white ^= captured_bit
+        pieces[piece] ^= 1 << from_square
+        pieces[placed] ^= 1 << to_square
+        squares[from_square] = -1
+        squares[to_square] = placed
+        if castle:
+            rook_from, rook_to = _CASTLING_ROOK[to_square]
+            rook = squares[rook_from]
+            pieces[rook] ^= (1 << rook_from) | (1 << rook_to)
+            squares[rook_from] = -1
+            squares[rook_to] = rook
+            move_bits ^= (1 << rook_from) | (1 << rook_to)
+            key ^= PIECE_KEYS[rook][rook_from] ^ PIECE_KEYS[rook][rook_to]
+        if white:
+            self.white ^= move_bits
+        else:
+            self.black ^= move_bits
+        self.occupied = self.white | self.black
+
+        key ^= CASTLING_KEYS[self.castling] ^ EP_KEYS[self.ep_square]
+        self.castling &= _CASTLING_MASK[from_square] & _CASTLING_MASK[to_square]
+        self.ep_square = (from_square + to_square) // 2 if kind == PAWN and \
+            (to_square - from_square == 16 or from_square - to_square == 16) else -1
+        self.key = key ^ CASTLING_KEYS[self.castling] ^ EP_KEYS[self.ep_square]
+        self.halfmove = 0 if kind == PAWN or captured >= 0 else self.halfmove + 1
+        if not white:
+            self.fullmove += 1
+        self.white_turn = not self.white_turn
+        return undo
+
+    def unmake_move(self, undo: Undo):
+        from_square, to_square, piece, placed, captured, captured_square, castling, ep_square, halfmove, key = undo
+        squares = self.squares
+        pieces = self.pieces
+        white = piece < BLACK_OFFSET
+        move_bits = (1 << from_square) | (1 << to_square)
+        pieces[placed] ^= 1 << to_square
+        pieces[piece] ^= 1 << from_square
+        squares[to_square] = -1
+        squares[from_square] = piece
+        if piece == KING or piece == BLACK_OFFSET + KING:
+            if to_square - from_square == 2 or from_square - to_square == 2:
+                rook_from, rook_to = _CASTLING_ROOK[to_square]
+                rook = squares[rook_to]
+                pieces[rook] ^= (1 << rook_from) | (1 << rook_to)
+                squares[rook_to] = -1
+                squares[rook_from] = rook
+                move_bits ^= (1 << rook_from) | (1 << rook_to)
+        if white:
+            self.white ^= move_bits
+        else:
+            self.black ^= move_bits
+        if captured >= 0:
+            captured_bit = 1 << captured_square
+            pieces[captured] ^= captured_bit
+            squares[captured_square] = captured
+            if white:
+                self.black ^= captured_bit
+            else:
+                self.white ^= captured_bit
+        self.occupied = self.white | self.black
+
+        self.castling = castling
+        self.ep_square = ep_square
+        self.halfmove = halfmove
+        self.key = key
+        if not white:
+            self.fullmove -= 1
+        self.white_turn = not self.white_turn
+
+    def piece_index_at(self, square: int) -> int:
+        return self.squares[square]
+
+    def piece_at(self, square: int) -> Optional[str]:
+        i = self.piece_index_at(square)
+        return None if i < 0 else PIECES[i]
+
+    def items(self) -> Iterator[Tuple[Tuple[str, int], str]]:
+        for i, bb in enumerate(self.pieces):
+            figure = PIECES[i]
+            for square in iter_bits(bb):
+                yield SQUARES[square], figure
+
+    def to_dict(self) -> "BoardView":
+        return BoardView(bitboard=self)
+
+    def attacks(self, white: bool, occupied: Optional[int] = None) -> int:
+        p = self.pieces
+        o = 0 if white else BLACK_OFFSET
+        if occupied is None:
+            occupied = self.occupied
+        ret = pawn_attacks(p[o + PAWN], white) | knight_attacks(p[o + KNIGHT]) | king_attacks(p[o + KING])
+        for square in iter_bits(p[o + ROOK] | p[o + QUEEN]):
+            ret |= rook_attacks(square, occupied)
+        for square in iter_bits(p[o + BISHOP] | p[o + QUEEN]):
+            ret |= bishop_attacks(square, occupied)
+        return ret
+
+    def is_square_attacked(self, square: int, by_white: bool) -> bool:
+        # Looks outward from the square and stops at the first attacker found
+        p = self.pieces
+        o = 0 if by_white else BLACK_OFFSET
+        if KNIGHT_ATTACKS[square] & p[o + KNIGHT] or PAWN_ATTACKS[not by_white][square] & p[o + PAWN] or \
+                KING_ATTACKS[square] & p[o + KING]:
+            return True
+        sliders = p[o + ROOK] | p[o + QUEEN]
+        if sliders & ROOK_RAYS[square] and rook_attacks(square, self.occupied) & sliders:
+            return True
+        sliders = p[o + BISHOP] | p[o + QUEEN]
+        return bool(sliders & BISHOP_RAYS[square] and bishop_attacks(square, self.occupied) & sliders)
+
+    def king_attacked(self, white: bool) -> bool:
+        return any(self.is_square_attacked(square, not white)
+                   for square in iter_bits(self.pieces[KING if white else BLACK_OFFSET + KING]))
+
+    def targets(self, square: int, piece: int, white: bool) -> int:
+        if piece == PAWN:
+            bit = 1 << square
+            empty = FULL ^ self.occupied
+            if white:
+                single = (bit << 8) & empty
+                double = ((single & RANK_3) << 8) & empty
+                return single | double | (PAWN_ATTACKS[1][square] & self.black)
+            single = (bit >> 8) & empty
+            double = ((single & RANK_6) >> 8) & empty
+            return single | double | (PAWN_ATTACKS[0][square] & self.white)
+        if piece == KNIGHT:
+            attacks = KNIGHT_ATTACKS[square]
+        elif piece == BISHOP:
+            attacks = bishop_attacks(square, self.occupied)
+        elif piece == ROOK:
+            attacks = rook_attacks(square, self.occupied)
+        elif piece == QUEEN:
+            attacks = rook_attacks(square, self.occupied) | bishop_attacks(square, self.occupied)
+        else:
+            attacks = KING_ATTACKS[square]
+        return attacks & ~(self.white if white else self.black)
+
+    def generate_moves(self, white: bool) -> List[Tuple[int, int]]:
+        moves: List[Tuple[int, int]] = []
+        offset = 0 if white else BLACK_OFFSET
+        for piece in range(6):
+            for square in iter_bits(self.pieces[offset + piece]):
+                moves.extend((square, target) for target in iter_bits(self.targets(square, piece, white)))
+        return moves
+
+    def generate_legal_moves(self) -> List[Tuple[int, int, int]]:
+        # Legal moves of the side to move as (from, to, promotion) with promotion -1 or the piece type promoted to
+        return [(m & 0x3F, m >> 6 & 0x3F, (m >> 12 & 3) + 1 if m >> 14 == PROMOTION else -1)
+                for m in self.generate_move_list()]
+
+    def generate_move_list(self, moves: Optional[MoveList] = None) -> MoveList:
+        # Legal moves of the side to move encoded as 16 bit ints (see the moves module), written into moves (cleared
+        # first) or a new MoveList. Checks and pins are computed once per position, only en passant captures are
+        # verified by make and unmake
+        white = self.white_turn
+        p = self.pieces
+        o, e = (0, BLACK_OFFSET) if white else (BLACK_OFFSET, 0)
+        own, enemy = (self.white, self.black) if white else (self.black, self.white)
+        occupied = self.occupied
+        if moves is None:
+            moves = MoveList()
+        buffer = moves.moves
+        n = 0
+
+        king_bb = p[o + KING]
+        if king_bb & (king_bb - 1):
+            raise ValueError("Legal moves need at most one king per side")
+        check_mask = FULL
+        checkers = 0
+        pins: Dict[int, int] = {}
+        if king_bb:
+            king = king_bb.bit_length() - 1
+            enemy_rooks = p[e + ROOK] | p[e + QUEEN]
+            enemy_bishops = p[e + BISHOP] | p[e + QUEEN]
+            checkers = (KNIGHT_ATTACKS[king] & p[e + KNIGHT]) | (PAWN_ATTACKS[white][king] & p[e + PAWN]) | \
+                       (rook_attacks(king, occupied) & enemy_rooks) | (bishop_attacks(king, occupied) & enemy_bishops)
+            danger = self.attacks(not white, occupied=occupied ^ king_bb)
+            for target in iter_bits(KING_ATTACKS[king] & ~own & ~danger):
+                buffer[n] = king | target << 6
+                n += 1
+            if checkers & (checkers - 1):
+                moves.size = n
+                return moves
+            if checkers:
+                check_mask = checkers | BETWEEN[king][checkers.bit_length() - 1]
+            for pinner in iter_bits((ROOK_RAYS[king] & enemy_rooks) | (BISHOP_RAYS[king] & enemy_bishops)):
+                between = BETWEEN[king][pinner] & occupied
+                if between & own and not between & (between - 1):
+                    pins[between.bit_length() - 1] = BETWEEN[king][pinner] | (1 << pinner)
+            if not checkers:
+                for move in self._castling_moves(king, danger):
+                    buffer[n] = move
+                    n += 1
+
+        for piece in (KNIGHT, BISHOP, ROOK, QUEEN):
+            for square in iter_bits(p[o + piece]):
+                if piece == KNIGHT:
+                    targets = KNIGHT_ATTACKS[square]
+                elif piece == BISHOP:
+                    targets = bishop_attacks(square, occupied)
+                elif piece == ROOK:
+                    targets = rook_attacks(square, occupied)
+                else:
+                    targets = rook_attacks(square, occupied) | bishop_attacks(square, occupied)
+                targets &= check_mask & ~own
+                if square in pins:
+                    targets &= pins[square]
+                for target in iter_bits(targets):
+                    buffer[n] = square | target << 6
+                    n += 1
+
+        empty = FULL ^ occupied
+        pawns = p[o + PAWN]
+        for square in iter_bits(pawns):
+            bit = 1 << square
+            if white:
+                single = (bit << 8) & empty
+                targets = single | ((single & RANK_3) << 8) & empty
+            else:
+                single = (bit >> 8) & empty
+                targets = single | ((single & RANK_6) >> 8) & empty
+            targets = (targets | (PAWN_ATTACKS[white][square] & enemy)) & check_mask
+            if square in pins:
+                targets &= pins[square]
+            for target in iter_bits(targets):
+                if target >= 56 or target < 8:
+                    for promotion in _PROMOTION_FLAGS:
+                        buffer[n] = square | target << 6 | promotion
+                        n += 1
+                else:
+                    buffer[n] = square | target << 6
+                    n += 1
+
+        ep_square = self.ep_square
+        if ep_square >= 0:
+            for square in iter_bits(PAWN_ATTACKS[not white][ep_square] & pawns):
+                undo = self.make_move(square, ep_square)
+                if not self.king_attacked(white=white):
+                    buffer[n] = square | ep_square << 6 | EN_PASSANT << 14
+                    n += 1
+                self.unmake_move(undo)
+        moves.size = n
+        return moves
+
+    def _castling_moves(self, king: int, danger: int) -> List[int]:
+        if self.white_turn:
+            rights, rooks, home = self.castling & (WHITE_KING_SIDE | WHITE_QUEEN_SIDE), self.pieces[ROOK], 4
+        else:
+            rights, rooks, home = self.castling & (BLACK_KING_SIDE | BLACK_QUEEN_SIDE), \
+                                  self.pieces[BLACK_OFFSET + ROOK], 60
+        ret: List[int] = []
+        if not rights or king != home:
+            return ret
+        if rights & (WHITE_KING_SIDE | BLACK_KING_SIDE) and rooks >> (home + 3) & 1 and \
+                not self.occupied & (0b11 << (home + 1)) and not danger & (0b11 << (home + 1)):
+            ret.append(encode_move(home, home + 2, flag=CASTLING))
+        if rights & (WHITE_QUEEN_SIDE | BLACK_QUEEN_SIDE) and rooks >> (home - 4) & 1 and \
+                not self.occupied & (0b111 << (home - 3)) and not danger & (0b11 << (home - 2)):
+            ret.append(encode_move(home, home - 2, flag=CASTLING))
+        return ret
+
+    def make_encoded_move(self, move: int) -> Undo:
+        return self.make_move(move & 0x3F, move >> 6 & 0x3F, (move >> 12 & 3) + 1 if move >> 14 == PROMOTION else -1)
+
+    def __eq__(self, other):
+        if isinstance(other, Bitboard):
+            return self.key == other.key and self.pieces == other.pieces and self.white_turn == other.white_turn and \
+                   self.castling == other.castling and self.ep_square == other.ep_square
+        return NotImplemented
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.pieces})"
+
+
+class BoardView(dict):
+    # Dict view of a Bitboard for the (Tuple[str, int] -> figure) api. Edits drop the attached bitboard, it is rebuilt
+    # from the dict contents the next time it is needed
+    __slots__ = ("_bitboard",)
+
+    def __init__(self, bitboard: Bitboard):
+        super().__init__(bitboard.items())
+        self._bitboard: Optional[Bitboard] = bitboard
+
+    @property
+    def bitboard(self) -> Bitboard:
+        if self._bitboard is None:
+            self._bitboard = Bitboard.from_dict(self)
+        return self._bitboard
+
+    def _invalidate(self):
+        self._bitboard = None
+
+    def __setitem__(self, key, value):
+        self._invalidate()
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._invalidate()
+        super().__delitem__(key)
+
+    def pop(self, *args):
+        self._invalidate()
+        return super().pop(*args)
+
+    def popitem(self):
+        self._invalidate()
+        return super().popitem()
+
+    def setdefault(self, *args):
+        self._invalidate()
+        return super().setdefault(*args)
+
+    def update(self, *args, **kwargs):
+        self._invalidate()
+        super().update(*args, **kwargs)
+
+    def clear(self):
+        self._invalidate()
+        super().clear()
+
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+
+def as_bitboard(board_state: Dict[Tuple[str, int], Optional[str]]) -> Bitboard:
+    if isinstance(board_state, BoardView):
+        return board_state.bitboard
+    return Bitboard.from_dict(board_state)
@@ -0,0 +1,87 @@
+from array import array
+from typing import Iterator
+
+# Moves packed into 16 bits:
+#   bits  0-5   from square (a1=0, ..., h8=63)
+#   bits  6-11  to square
+#   bits 12-13  promotion piece, knight=0, bishop=1, rook=2, queen=3 (piece type of the bitboard module minus one)
+#   bits 14-15  flag
+# 0 (a1a1) is never a legal move and is used as "no move", e.g. by the transposition table
+NORMAL, PROMOTION, EN_PASSANT, CASTLING = 0, 1, 2, 3
+NULL_MOVE = 0
+# Most legal moves a position can have is 218
+MAX_MOVES = 256
+
+
+def encode_move(from_square: int, to_square: int, promotion: int = -1, flag: int = NORMAL) -> int:
+    # promotion is the piece type (bitboard module) promoted to or -1, it implies the PROMOTION flag
+    if promotion >= 0:
+        return from_square | to_square << 6 | (promotion - 1) << 12 | PROMOTION << 14
+    return from_square | to_square << 6 | flag << 14
+
+
+def move_from(move: int) -> int:
+    return move & 0x3F
+
+
+def move_to(move: int) -> int:
+    return move >> 6 & 0x3F
+
+
+def move_flag(move: int) -> int:
+    return move >> 14
+
+
+def move_promotion(move: int) -> int:
+    return (move >> 12 & 3) + 1 if move >> 14 == PROMOTION else -1
+
+
+class MoveList:
+    # Fixed capacity move buffer backed by array('H'). Allocate once per search ply and reuse it with clear()
+    __slots__ = ("moves", "size")
+
+    def __init__(self, capacity: int = MAX_MOVES):
+        self.moves = array("H", bytes(2 * capacity))
+        self.size = 0
+
+    def append(self, move: int):
+        self.moves[self.size] = move
+        self.size += 1
+
+    def clear(self):
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, item: int) -> int:
+        if item < 0:
+            item += self.size
+        if not 0 <= item < self.size:
+            raise IndexError("move list index out of range")
+        return self.moves[item]
+
+    def __iter__(self) -> Iterator[int]:
+        moves = self.moves
+        return (moves[i] for i in range(self.size))
+
+    def __contains__(self, move: int) -> bool:
+        return move in self.moves[:self.size]
+
+    def swap(self, i: int, j: int):
+        # Used for move ordering, e.g. picking the best scored move to the front
+        moves = self.moves
+        moves[i], moves[j] = moves[j], moves[i]
+
+    def tobytes(self) -> bytes:
+        return self.moves[:self.size].tobytes()
+
+    @classmethod
+    def frombytes(cls, data: bytes) -> "MoveList":
+        ret = cls(capacity=max(MAX_MOVES, len(data) // 2))
+        ret.moves[:len(data) // 2] = array("H", data)
+        ret.size = len(data) // 2
+        return ret
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({list(self)})"
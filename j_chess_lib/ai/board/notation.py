@@ -0,0 +1,80 @@
+import re
+
+from .bitboard import Bitboard, PIECES, PIECE_INDEX, SQUARE_NAMES, SQUARE_NAME_INDEX, PAWN, QUEEN, BLACK_OFFSET
+from .moves import CASTLING, move_flag, move_promotion
+
+# Standard algebraic notation (Nf3, exd5, e8=Q+, O-O) and long algebraic notation (Ng1-f3, e7xd8=Q, e2e4) of the
+# side to move. Both are resolved against the legal moves of the position
+_MOVE = re.compile(r"^([NBRQK])?([a-h])?([1-8])?[-x:]?([a-h][1-8])(?:=?([NBRQnbrq]))?$")
+_DECORATION = re.compile(r"[+#!?]+$")
+
+
+def parse_move(board: Bitboard, text: str) -> int:
+    # Encoded legal move (see moves module) for the notation, raises ValueError if it is illegal or ambiguous
+    san = _DECORATION.sub("", text.strip())
+    moves = board.generate_move_list()
+    if san in ("O-O", "0-0", "O-O-O", "0-0-0"):
+        file = 6 if len(san) == 3 else 2
+        for move in moves:
+            if move_flag(move) == CASTLING and (move >> 6 & 7) == file:
+                return move
+        raise ValueError(f"Castling {text} is not legal in this position")
+
+    match = _MOVE.match(san)
+    if match is None:
+        raise ValueError(f"Can not read the move {text}")
+    piece, from_file, from_rank, to_square, promotion = match.groups()
+    # Without a piece letter a fully given origin square (LAN like e2e4 or g1f3) may be any piece, else a pawn
+    kind = PIECE_INDEX[piece] if piece is not None else -1 if from_file and from_rank else PAWN
+    to_square = SQUARE_NAME_INDEX[to_square]
+    promotion = -1 if promotion is None else PIECE_INDEX[promotion.upper()]
+    squares = board.squares
+    candidates = []
+    for move in moves:
+        from_square = move & 0x3F
+        if (move >> 6 & 0x3F) != to_square or (kind >= 0 and squares[from_square] % BLACK_OFFSET != kind):
+            continue
+        if from_file is not None and from_square & 7 != ord(from_file) - ord("a"):
+            continue
+        if from_rank is not None and from_square >> 3 != int(from_rank) - 1:
+            continue
+        # A promotion without a piece is read as a queen promotion like Bitboard.make_move does
+        if move_promotion(move) != (QUEEN if promotion < 0 and move_promotion(move) >= 0 else promotion):
+            continue
+        candidates.append(move)
+    if len(candidates) != 1:
+        raise ValueError(f"The move {text} is {'ambiguous' if candidates else 'not legal'} in this position")
+    return candidates[0]
+
+
+def move_to_san(board: Bitboard, move: int) -> str:
+    from_square, to_square = move & 0x3F, move >> 6 & 0x3F
+    kind = board.squares[from_square] % BLACK_OFFSET
+    promotion = move_promotion(move)
+    capture = board.squares[to_square] >= 0 or (kind == PAWN and from_square & 7 != to_square & 7)
+    if move_flag(move) == CASTLING:
+        ret = "O-O" if to_square & 7 == 6 else "O-O-O"
+    elif kind == PAWN:
+        ret = f"{SQUARE_NAMES[from_square][0] + 'x' if capture else ''}{SQUARE_NAMES[to_square]}" \
+              f"{'=' + PIECES[promotion] if promotion >= 0 else ''}"
+    else:
+        # Disambiguate by file, then rank, then both
+        others = [m & 0x3F for m in board.generate_move_list() if m >> 6 & 0x3F == to_square and
+                  m & 0x3F != from_square and board.squares[m & 0x3F] % BLACK_OFFSET == kind]
+        origin = ""
+        if others:
+            if all(o & 7 != from_square & 7 for o in others):
+                origin = SQUARE_NAMES[from_square][0]
+            elif all(o >> 3 != from_square >> 3 for o in others):
+                origin = SQUARE_NAMES[from_square][1]
+            else:
+                origin = SQUARE_NAMES[from_square]
+        ret = f"{PIECES[kind]}{origin}{'x' if capture else ''}{SQUARE_NAMES[to_square]}"
+
+    undo = board.make_encoded_move(move)
+    try:
+        if board.king_attacked(board.white_turn):
+            ret += "#" if len(board.generate_move_list()) == 0 else "+"
+    finally:
+        board.unmake_move(undo)
+    return ret
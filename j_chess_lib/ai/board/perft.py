@@ -0,0 +1,134 @@
+import argparse
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .bitboard import Bitboard, PIECES, SQUARE_NAMES
+from .moves import MoveList
+
+# Standard perft positions and their known node counts for depth 1, 2, ...
+SUITE: List[Tuple[str, str, List[int]]] = [
+    ("start", "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1", [20, 400, 8902, 197281, 4865609]),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1", [48, 2039, 97862, 4085603]),
+    ("position3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", [14, 191, 2812, 43238, 674624]),
+    ("position4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1", [6, 264, 9467, 422333]),
+    ("position5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", [44, 1486, 62379, 2103487]),
+    ("position6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     [46, 2079, 89890, 3894594]),
+]
+
+
+class PerftResult(NamedTuple):
+    name: str
+    depth: int
+    nodes: int
+    expected: Optional[int]
+    seconds: float
+
+    @property
+    def ok(self) -> bool:
+        return self.expected is None or self.nodes == self.expected
+
+    @property
+    def nps(self) -> float:
+        return self.nodes / self.seconds if self.seconds > 0 else 0.0
+
+
+def perft(board: Bitboard, depth: int) -> int:
+    # Number of leaf nodes of the legal move tree. The last ply is counted without making the moves
+    if depth <= 0:
+        return 1
+    return _perft(board, depth, [MoveList() for _ in range(depth)])
+
+
+def _perft(board: Bitboard, depth: int, move_lists: List[MoveList]) -> int:
+    # One preallocated move list per ply
+    moves = board.generate_move_list(move_lists[depth - 1])
+    if depth == 1:
+        return moves.size
+    nodes = 0
+    buffer = moves.moves
+    for i in range(moves.size):
+        undo = board.make_encoded_move(buffer[i])
+        nodes += _perft(board, depth - 1, move_lists)
+        board.unmake_move(undo)
+    return nodes
+
+
+def move_name(move: Tuple[int, int, int]) -> str:
+    from_square, to_square, promotion = move
+    return f"{SQUARE_NAMES[from_square]}{SQUARE_NAMES[to_square]}{PIECES[6 + promotion] if promotion >= 0 else ''}"
+
+
+def _perft_move(fen: str, move: Tuple[int, int, int], depth: int) -> int:
+    board = Bitboard.from_fen(fen)
+    board.make_move(*move)
+    return perft(board, depth - 1)
+
+
+def divide(fen: str, depth: int, workers: int = 1) -> Dict[str, int]:
+    # Node count below every root move in uci notation. With workers > 1 the root moves are split over processes
+    board = Bitboard.from_fen(fen)
+    moves = board.generate_legal_moves()
+    if depth <= 0:
+        return {}
+    if workers > 1 and depth > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            counts = list(executor.map(_perft_move, [fen] * len(moves), moves, [depth] * len(moves)))
+    else:
+        counts = [_perft_move(fen, move, depth) for move in moves]
+    return {move_name(move): count for move, count in zip(moves, counts)}
+
+
+def run(fen: str, depth: int, workers: int = 1, name: str = "", expected: Optional[int] = None) -> PerftResult:
+    start = time.perf_counter()
+    if workers > 1:
+        nodes = sum(divide(fen, depth, workers=workers).values())
+    else:
+        nodes = perft(Bitboard.from_fen(fen), depth)
+    return PerftResult(name=name or fen, depth=depth, nodes=nodes, expected=expected,
+                       seconds=time.perf_counter() - start)
+
+
+def run_suite(max_depth: int = 3, workers: int = 1) -> List[PerftResult]:
+    return [
+        run(fen, depth, workers=workers, name=name, expected=expected)
+        for name, fen, counts in SUITE
+        for depth, expected in enumerate(counts[:max_depth], 1)
+    ]
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Count move generator leaf nodes and measure the throughput")
+    parser.add_argument("fen", nargs="?", default=None, help="position to count, runs the standard suite if missing")
+    parser.add_argument("-d", "--depth", type=int, default=3, help="search depth (maximum depth for the suite)")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="processes to split the root moves over")
+    parser.add_argument("--divide", action="store_true", help="print the node count of every root move")
+    parsed = parser.parse_args(args)
+
+    if parsed.fen is not None and parsed.divide:
+        start = time.perf_counter()
+        counts = divide(parsed.fen, parsed.depth, workers=parsed.workers)
+        seconds = time.perf_counter() - start
+        for move, count in sorted(counts.items()):
+            print(f"{move}: {count}")
+        nodes = sum(counts.values())
+        print(f"\nMoves: {len(counts)}\nNodes: {nodes}\nTime: {seconds:.3f}s\nNPS: {nodes / max(seconds, 1e-9):.0f}")
+        return 0
+
+    if parsed.fen is not None:
+        results = [run(parsed.fen, parsed.depth, workers=parsed.workers)]
+    else:
+        results = run_suite(max_depth=parsed.depth, workers=parsed.workers)
+    for result in results:
+        print(f"{result.name:<12.60} depth {result.depth} {result.nodes:>10} nodes {result.seconds:8.3f}s "
+              f"{result.nps:>10.0f} nps {'' if result.expected is None else 'ok' if result.ok else 'FAILED'}")
+    nodes = sum(x.nodes for x in results)
+    seconds = sum(x.seconds for x in results)
+    print(f"Total {nodes} nodes in {seconds:.3f}s, {nodes / max(seconds, 1e-9):.0f} nps")
+    return 0 if all(x.ok for x in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+from array import array
+from typing import Dict, List, Optional
+
+from .bitboard import CASTLING_RIGHTS, SQUARE_NAMES, SQUARE_NAME_INDEX, PIECES, _CASTLING_MASK, _CASTLING_ROOK
+
+# Piece codes of the mailbox: 0 is empty, white pieces are positive, black pieces negative
+EMPTY = 0
+PIECE_CODES: Dict[str, int] = {p: (i % 6 + 1) * (1 if i < 6 else -1) for i, p in enumerate(PIECES)}
+CODE_PIECES: Dict[int, str] = {c: p for p, c in PIECE_CODES.items()}
+_PAWN, _KING = PIECE_CODES["P"], PIECE_CODES["K"]
+
+
+def rank_fen(board: array, rank: int) -> str:
+    # FEN placement string of one rank (0 is rank 1)
+    ret = []
+    empty = 0
+    for code in board[rank * 8:rank * 8 + 8]:
+        if code == EMPTY:
+            empty += 1
+            continue
+        if empty > 0:
+            ret.append(str(empty))
+            empty = 0
+        ret.append(CODE_PIECES[code])
+    if empty > 0:
+        ret.append(str(empty))
+    return "".join(ret)
+
+
+class Position:
+    __slots__ = ("board", "ranks", "white_turn", "castling", "ep_square", "halfmove", "fullmove")
+
+    def __init__(self, board: array, ranks: List[str], white_turn: bool = True, castling: int = 0,
+                 ep_square: int = -1, halfmove: int = 0, fullmove: int = 1):
+        # board: array('b', 64) of piece codes indexed a1=0 ... h8=63
+        # ranks: FEN placement strings of the ranks, ranks[0] is rank 1
+        self.board = board
+        self.ranks = ranks
+        self.white_turn = white_turn
+        self.castling = castling
+        self.ep_square = ep_square
+        self.halfmove = halfmove
+        self.fullmove = fullmove
+
+    @classmethod
+    def from_fen(cls, fen: str) -> "Position":
+        placement, *tail = fen.split()
+        board = array("b", bytes(64))
+        ranks = placement.split("/")[:8]
+        ranks.reverse()
+        for r, rank in enumerate(ranks):
+            square = r * 8
+            for s in rank:
+                if s.isdigit():
+                    square += int(s)
+                else:
+                    board[square] = PIECE_CODES[s]
+                    square += 1
+        tail += ["w", "-", "-", "0", "1"][len(tail):]
+        castling = 0
+        for s in tail[1]:
+            castling |= CASTLING_RIGHTS.get(s, 0)
+        return cls(
+            board=board, ranks=ranks, white_turn=tail[0].lower() == "w", castling=castling,
+            ep_square=SQUARE_NAME_INDEX.get(tail[2], -1), halfmove=int(tail[3]), fullmove=int(tail[4]),
+        )
+
+    def piece_at(self, square: int) -> Optional[str]:
+        return CODE_PIECES.get(self.board[square], None)
+
+    @property
+    def castling_fen(self) -> str:
+        return "".join(c for c, r in CASTLING_RIGHTS.items() if self.castling & r) or "-"
+
+    @property
+    def en_passant(self) -> Optional[str]:
+        return None if self.ep_square < 0 else SQUARE_NAMES[self.ep_square]
+
+    def play(self, from_square: int, to_square: int, promotion: Optional[str] = None) -> "Position":
+        # Position after the move. Castling, en passant and promotion (queen if none is given) are handled and only
+        # the FEN strings of the touched ranks are rebuilt, all other ranks are shared with this position
+        board = array("b", self.board)
+        code = board[from_square]
+        if code == EMPTY:
+            raise ValueError(f"There is no piece on {SQUARE_NAMES[from_square]}")
+        captured = board[to_square]
+        white = code > 0
+        kind = abs(code)
+        board[from_square] = EMPTY
+        if kind == _PAWN and (to_square < 8 or to_square >= 56):
+            code = PIECE_CODES[(promotion or "q").upper() if white else (promotion or "q").lower()]
+        elif kind == _PAWN and to_square == self.ep_square:
+            captured_square = to_square - 8 if white else to_square + 8
+            captured = board[captured_square]
+            board[captured_square] = EMPTY
+        elif kind == _KING and abs(to_square - from_square) == 2 and to_square in _CASTLING_ROOK:
+            rook_from, rook_to = _CASTLING_ROOK[to_square]
+            board[rook_to] = board[rook_from]
+            board[rook_from] = EMPTY
+        board[to_square] = code
+
+        ranks = list(self.ranks)
+        ranks[from_square >> 3] = rank_fen(board, from_square >> 3)
+        if to_square >> 3 != from_square >> 3:
+            ranks[to_square >> 3] = rank_fen(board, to_square >> 3)
+        return Position(
+            board=board, ranks=ranks, white_turn=not self.white_turn,
+            castling=self.castling & _CASTLING_MASK[from_square] & _CASTLING_MASK[to_square],
+            ep_square=(from_square + to_square) // 2 if kind == _PAWN and abs(to_square - from_square) == 16 else -1,
+            halfmove=0 if kind == _PAWN or captured != EMPTY else self.halfmove + 1,
+            fullmove=self.fullmove if white else self.fullmove + 1,
+        )
+
+    def fen(self) -> str:
+        return f"{'/'.join(reversed(self.ranks))} {'w' if self.white_turn else 'b'} {self.castling_fen} " \
+               f"{self.en_passant or '-'} {self.halfmove} {self.fullmove}"
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.fen()!r})"
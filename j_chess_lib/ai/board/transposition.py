@@ -0,0 +1,90 @@
+from array import array
+from typing import NamedTuple, Optional
+
+EXACT, LOWER_BOUND, UPPER_BOUND = 0, 1, 2
+
+_EMPTY = 0xFF
+
+
+class TTEntry(NamedTuple):
+    depth: int
+    score: int
+    flag: int
+    move: int
+
+
+class TranspositionTable:
+    # Fixed size hash table of search results keyed by zobrist key.
+    # Every bucket holds two slots. The first one keeps the deepest result of the current search and is only
+    # replaced by deeper (or equally deep) results or results of a newer search. The second one is always replaced.
+    # Call new_search at the start of every get_move so entries of earlier turns age out, clear on a new game.
+
+    def __init__(self, entries: int = 1 << 18):
+        buckets = 1
+        while buckets * 2 < entries:
+            buckets *= 2
+        self._mask = buckets - 1
+        size = 2 * buckets
+        self._keys = array("Q", bytes(8 * size))
+        self._scores = array("i", bytes(4 * size))
+        self._moves = array("H", bytes(2 * size))
+        self._depths = array("b", bytes(size))
+        self._flags = array("B", [_EMPTY]) * size
+        self._generations = array("B", bytes(size))
+        self._generation = 0
+        self._hits = 0
+        self._probes = 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @property
+    def hit_rate(self) -> float:
+        return self._hits / self._probes if self._probes > 0 else 0.0
+
+    def new_search(self):
+        self._generation = (self._generation + 1) & 0xFF
+
+    def clear(self):
+        size = len(self._keys)
+        self._flags = array("B", [_EMPTY]) * size
+        self._generation = 0
+        self._hits = 0
+        self._probes = 0
+
+    def _find(self, key: int) -> int:
+        i = (key & self._mask) << 1
+        if self._keys[i] == key and self._flags[i] != _EMPTY:
+            return i
+        if self._keys[i + 1] == key and self._flags[i + 1] != _EMPTY:
+            return i + 1
+        return -1
+
+    def probe(self, key: int) -> Optional[TTEntry]:
+        self._probes += 1
+        i = self._find(key)
+        if i < 0:
+            return None
+        self._hits += 1
+        return TTEntry(self._depths[i], self._scores[i], self._flags[i], self._moves[i])
+
+    def best_move(self, key: int) -> int:
+        i = self._find(key)
+        return 0 if i < 0 else self._moves[i]
+
+    def store(self, key: int, depth: int, score: int, flag: int, move: int = 0):
+        i = (key & self._mask) << 1
+        if self._keys[i] == key or self._flags[i] == _EMPTY or depth >= self._depths[i] or \
+                self._generations[i] != self._generation:
+            slot = i
+        else:
+            slot = i + 1
+        if move == 0 and self._keys[slot] == key and self._flags[slot] != _EMPTY:
+            # Keep the known best move of the position when the new result has none
+            move = self._moves[slot]
+        self._keys[slot] = key
+        self._scores[slot] = score
+        self._moves[slot] = move
+        self._depths[slot] = max(-128, min(127, depth))
+        self._flags[slot] = flag
+        self._generations[slot] = self._generation
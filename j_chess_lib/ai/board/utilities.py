@@ -1,38 +1,68 @@
-from copy import deepcopy
-from typing import List, Tuple, Dict, Optional, Callable, Set
+from array import array
+from typing import List, Tuple, Dict, Optional, Callable
 
 from j_chess_lib.ai.board import BoardState
+from j_chess_lib.ai.board.attacks import KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, rook_attacks, bishop_attacks, \
+    queen_attacks
+from j_chess_lib.ai.board.bitboard import SQUARES, SQUARE_INDEX, SQUARE_NAMES, PIECES, PIECE_INDEX, PAWN, QUEEN, KING, \
+    BLACK_OFFSET, BoardView, SQUARE_NAME_INDEX, as_bitboard, iter_bits
+from j_chess_lib.ai.board.moves import CASTLING, EN_PASSANT, MoveList, encode_move, move_promotion
+from j_chess_lib.ai.board.position import PIECE_CODES, rank_fen
 from j_chess_lib.communication import MoveData
 
-
-def _add(t1: Tuple[int, int], t2: Tuple[int, int]) -> Tuple[int, int]:
-    return t1[0] + t2[0], t1[1] + t2[1]
-
-
-def _mul(t1: Tuple[int, int], mul: int) -> Tuple[int, int]:
-    return t1[0] * mul, t1[1] * mul
+_PROMOTION_UNITS = "NBRQnbrq"
 
 
 def get_possible_moves(
     board_state: Dict[Tuple[str, int], Optional[str]], white: bool
 ) -> List[Tuple[Tuple[str, int], Tuple[str, int]]]:
-    ret: Set[Tuple[Tuple[str, int], Tuple[str, int]]] = set()
+    return [(SQUARES[f], SQUARES[t]) for f, t in as_bitboard(board_state).generate_moves(white=white)]
+
+
+def get_legal_moves(board: BoardState) -> List[MoveData]:
+    white = board.bitboard.white_turn
+    return [move_to_data(move=m, white=white) for m in board.bitboard.generate_move_list()]
+
 
-    fun: Callable[[str], bool] = str.isupper if white else str.islower
-    for origin_position, figure in board_state.items():
-        if not fun(figure):
-            continue
-        moves = get_next_position(origin_position=origin_position, board_state=board_state)
-        ret.update([(origin_position, x[0]) for x in moves])
-        # print(origin_position, figure)
-        # print(moves)
+def get_move_list(board: BoardState, moves: Optional[MoveList] = None) -> MoveList:
+    return board.bitboard.generate_move_list(moves)
 
-    return list(ret)
+
+def move_to_data(move: int, white: bool) -> MoveData:
+    promotion = move_promotion(move)
+    return MoveData(
+        from_value=SQUARE_NAMES[move & 0x3F], to=SQUARE_NAMES[move >> 6 & 0x3F],
+        promotion_unit=None if promotion < 0 else PIECES[promotion + (0 if white else BLACK_OFFSET)],
+    )
+
+
+def move_from_data(board: BoardState, move: MoveData) -> int:
+    bitboard = board.bitboard
+    from_square, to_square = SQUARE_NAME_INDEX[move.from_value], SQUARE_NAME_INDEX[move.to]
+    piece = bitboard.squares[from_square] % BLACK_OFFSET if bitboard.squares[from_square] >= 0 else -1
+    if move.promotion_unit:
+        if len(move.promotion_unit) != 1 or move.promotion_unit not in _PROMOTION_UNITS:
+            raise ValueError(f"Cannot promote to {move.promotion_unit!r}")
+        return encode_move(from_square, to_square, promotion=PIECE_INDEX[move.promotion_unit] % BLACK_OFFSET)
+    if piece == PAWN and (to_square >= 56 or to_square < 8):
+        return encode_move(from_square, to_square, promotion=QUEEN)
+    if piece == PAWN and to_square == bitboard.ep_square:
+        return encode_move(from_square, to_square, flag=EN_PASSANT)
+    if piece == KING and abs(to_square - from_square) == 2:
+        return encode_move(from_square, to_square, flag=CASTLING)
+    return encode_move(from_square, to_square)
 
 
 def kill_king_move(board_state: Dict[Tuple[str, int], Optional[str]],
                    move: Tuple[Tuple[str, int], Tuple[str, int]]) -> bool:
     f, t = move
+    if isinstance(board_state, BoardView):
+        bitboard = board_state.bitboard
+        f, t = SQUARE_INDEX.get(f, -1), SQUARE_INDEX.get(t, -1)
+        if f < 0 or t < 0:
+            return False
+        white_king, black_king = bitboard.pieces[KING], bitboard.pieces[BLACK_OFFSET + KING]
+        return bool(bitboard.white >> f & 1 and black_king >> t & 1 or bitboard.black >> f & 1 and white_king >> t & 1)
     if (f not in board_state) or (t not in board_state):
         return False
     white = board_state[f].isupper()
@@ -40,18 +70,24 @@ def kill_king_move(board_state: Dict[Tuple[str, int], Optional[str]],
     return enemy(board_state[t]) and board_state[t] in ("k", "K")
 
 
+def is_square_attacked(board_state: Dict[Tuple[str, int], Optional[str]], square: Tuple[str, int],
+                       by_white: bool) -> bool:
+    return as_bitboard(board_state).is_square_attacked(SQUARE_INDEX[square], by_white=by_white)
+
+
 def in_chess(board_state: Dict[Tuple[str, int], Optional[str]], white: bool) -> bool:
-    opponent_moves = get_possible_moves(board_state=board_state, white=not white)
-    return any(kill_king_move(board_state=board_state, move=x) for x in opponent_moves)
+    return as_bitboard(board_state).king_attacked(white=white)
 
 
 def in_chess_after_move(board_state: Dict[Tuple[str, int], Optional[str]],
                         move: Tuple[Tuple[str, int], Tuple[str, int]],
                         white: bool) -> bool:
-    new_board = deepcopy(board_state)
-    new_board[move[1]] = board_state[move[0]]
-    del new_board[move[0]]
-    return in_chess(board_state=new_board, white=white)
+    bitboard = as_bitboard(board_state)
+    undo = bitboard.make_move(SQUARE_INDEX[move[0]], SQUARE_INDEX[move[1]])
+    try:
+        return bitboard.king_attacked(white=white)
+    finally:
+        bitboard.unmake_move(undo)
 
 
 def is_promotion(board_state: Dict[Tuple[str, int], Optional[str]],
@@ -74,92 +110,80 @@ def get_next_position(
     return []
 
 
-def _get_next_position_straight(
-    origin_position: Tuple[str, int], board_state: Dict[Tuple[str, int], Optional[str]], white: bool,
-    directions: List[Tuple[int, int]], max_steps: int = 8
+def _occupied(board_state: Dict[Tuple[str, int], Optional[str]]) -> int:
+    if isinstance(board_state, BoardView):
+        return board_state.bitboard.occupied
+    occupied = 0
+    for position in board_state:
+        occupied |= 1 << SQUARE_INDEX[position]
+    return occupied
+
+
+def _table_moves(
+    targets: int, board_state: Dict[Tuple[str, int], Optional[str]], white: bool
 ) -> List[Tuple[Tuple[str, int], bool]]:
-    j = 1
-    moves = []
-    hits = []
-    start_pos = (ord(origin_position[0]), origin_position[1])
     enemy: Callable[[str], bool] = str.islower if white else str.isupper
-    a, h = ord("a"), ord("h")
-    while j <= max_steps and len(directions) > 0:
-        for i, direction in reversed(list(enumerate(directions))):
-            direction: Tuple[int, int]
-            new_pos_tmp = _add(start_pos, _mul(direction, j))
-            if not 1 <= new_pos_tmp[1] <= 8 or not a <= new_pos_tmp[0] <= h:
-                del directions[i]
-                continue
-            new_pos: Tuple[str, int] = (chr(new_pos_tmp[0]), new_pos_tmp[1])
-            if new_pos in board_state:
-                if enemy(board_state[new_pos]):
-                    hits.append(new_pos)
-                del directions[i]
-                continue
-            moves.append(new_pos)
-        j += 1
-    return [(x, False) for x in moves] + [(x, True) for x in hits]
+    ret = []
+    for square in iter_bits(targets):
+        position = SQUARES[square]
+        if position not in board_state:
+            ret.append((position, False))
+        elif enemy(board_state[position]):
+            ret.append((position, True))
+    return ret
 
 
 def _get_next_position_rook(
     origin_position: Tuple[str, int], board_state: Dict[Tuple[str, int], Optional[str]], white: bool
 ) -> List[Tuple[Tuple[str, int], bool]]:
-    directions = [(1, 0), (-1, 0), (0, 1), (0, -1)]
-    return _get_next_position_straight(origin_position=origin_position, board_state=board_state, white=white,
-                                       directions=directions)
+    targets = rook_attacks(SQUARE_INDEX[origin_position], _occupied(board_state=board_state))
+    return _table_moves(targets=targets, board_state=board_state, white=white)
 
 
 def _get_next_position_knight(
     origin_position: Tuple[str, int], board_state: Dict[Tuple[str, int], Optional[str]], white: bool
 ) -> List[Tuple[Tuple[str, int], bool]]:
-    hops = [(2, 1), (-2, 1), (2, -1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2)]
-    enemy: Callable[[str], bool] = str.islower if white else str.isupper
-    start_pos = (ord(origin_position[0]), origin_position[1])
-    a, h = ord("a"), ord("h")
-    moves = [(chr(y[0]), y[1]) for y in (_add(x, start_pos) for x in hops) if a <= y[0] <= h and 1 <= y[1] <= 8]
-    return [(x, x in board_state) for x in moves if x not in board_state or enemy(board_state[x])]
+    return _table_moves(targets=KNIGHT_ATTACKS[SQUARE_INDEX[origin_position]], board_state=board_state, white=white)
 
 
 def _get_next_position_bishop(
     origin_position: Tuple[str, int], board_state: Dict[Tuple[str, int], Optional[str]], white: bool
 ) -> List[Tuple[Tuple[str, int], bool]]:
-    directions = [(1, 1), (-1, 1), (1, -1), (-1, -1)]
-    return _get_next_position_straight(origin_position=origin_position, board_state=board_state, white=white,
-                                       directions=directions)
+    targets = bishop_attacks(SQUARE_INDEX[origin_position], _occupied(board_state=board_state))
+    return _table_moves(targets=targets, board_state=board_state, white=white)
 
 
 def _get_next_position_queen(
     origin_position: Tuple[str, int], board_state: Dict[Tuple[str, int], Optional[str]], white: bool
 ) -> List[Tuple[Tuple[str, int], bool]]:
-    directions = [(1, 1), (-1, 1), (1, -1), (-1, -1), (1, 0), (-1, 0), (0, 1), (0, -1)]
-    return _get_next_position_straight(origin_position=origin_position, board_state=board_state, white=white,
-                                       directions=directions)
+    targets = queen_attacks(SQUARE_INDEX[origin_position], _occupied(board_state=board_state))
+    return _table_moves(targets=targets, board_state=board_state, white=white)
 
 
 def _get_next_position_king(
     origin_position: Tuple[str, int], board_state: Dict[Tuple[str, int], Optional[str]], white: bool
 ) -> List[Tuple[Tuple[str, int], bool]]:
-    directions = [(1, 1), (-1, 1), (1, -1), (-1, -1), (1, 0), (-1, 0), (0, 1), (0, -1)]
-    return _get_next_position_straight(origin_position=origin_position, board_state=board_state, white=white,
-                                       directions=directions, max_steps=1)
+    return _table_moves(targets=KING_ATTACKS[SQUARE_INDEX[origin_position]], board_state=board_state, white=white)
 
 
 def _get_next_position_pawn(
     origin_position: Tuple[str, int], board_state: Dict[Tuple[str, int], Optional[str]], white: bool
 ) -> List[Tuple[Tuple[str, int], bool]]:
-    direction = -1 + 2 * white
-    home_row = 2 if white else 7
-    moves = [(origin_position[0], origin_position[1] + direction)]
-    if not 1 <= moves[0][1] <= 8:
+    square = SQUARE_INDEX[origin_position]
+    step = 8 if white else -8
+    if not 0 <= square + step < 64:
         return []
-    if origin_position[1] == home_row and moves[0] not in board_state:
-        moves.append((origin_position[0], origin_position[1] + direction * 2))
-    col = ord(origin_position[0])
-    hits = [(chr(col + x), origin_position[1] + direction) for x in (-1, 1) if ord("a") <= col + x <= ord("h")]
+    moves = []
+    if SQUARES[square + step] not in board_state:
+        moves.append((SQUARES[square + step], False))
+        if origin_position[1] == (2 if white else 7) and SQUARES[square + 2 * step] not in board_state:
+            moves.append((SQUARES[square + 2 * step], False))
     fun: Callable[[str], bool] = str.islower if white else str.isupper
-    return [(x, False) for x in moves if x not in board_state] + \
-           [(x, True) for x in hits if x in board_state and fun(board_state[x])]
+    for target in iter_bits(PAWN_ATTACKS[white][square]):
+        position = SQUARES[target]
+        if position in board_state and fun(board_state[position]):
+            moves.append((position, True))
+    return moves
 
 
 _FUNCTIONS: Dict["str",
@@ -181,37 +205,17 @@ _FUNCTIONS: Dict["str",
 
 
 def predict_board(board: BoardState, move: MoveData) -> BoardState:
-    board_dict = board.get_board()
-    f = move.from_value[0], int(move.from_value[1])
-    t = move.to[0], int(move.to[1])
-
-    board_dict[t] = board_dict[f]
-    del board_dict[f]
-    if move.promotion_unit:
-        board_dict[t] = move.promotion_unit.upper() if board.white_turn() else move.promotion_unit.lower()
-
-    fen = board_to_fen(board=board_dict, fen_tail=board.fen.split(" ", maxsplit=1)[-1])
-    return BoardState(fen=fen)
+    position = board.position.play(
+        SQUARE_NAME_INDEX[move.from_value], SQUARE_NAME_INDEX[move.to], promotion=move.promotion_unit or None
+    )
+    return BoardState.from_position(position)
 
 
 def board_to_fen(board: Dict[Tuple[str, int], Optional[str]], fen_tail: str) -> str:
     fen_tail = fen_tail.strip()
-    ret = []
-
-    for r in range(8, 1 - 1, -1):
-        cc = 0
-        for c in range(0, 8, 1):
-            c = chr(c + ord("a"))
-            p = (c, r)
-            if p in board:
-                if cc > 0:
-                    ret.append(cc)
-                cc = 0
-                ret.append(board[p])
-            else:
-                cc += 1
-        if cc > 0:
-            ret.append(cc)
-        ret.append("/")
-
-    return f'{"".join(str(x) for x in ret)} {fen_tail}'
+    codes = array("b", bytes(64))
+    for square, piece in board.items():
+        if piece is not None:
+            codes[SQUARE_INDEX[square]] = PIECE_CODES[piece]
+    ranks = [rank_fen(codes, r) for r in range(8)]
+    return f"{'/'.join(reversed(ranks))} {fen_tail}"
@@ -0,0 +1,31 @@
+import random
+from typing import List
+
+# Keys come from a fixed seed so every process (and every stored table) agrees on the hash of a position
+_rng = random.Random(0x6A_63_68_65_73_73)
+
+PIECE_KEYS: List[List[int]] = [[_rng.getrandbits(64) for _ in range(64)] for _ in range(12)]
+SIDE_KEY: int = _rng.getrandbits(64)
+CASTLING_KEYS: List[int] = [0] * 16
+_castling_bits = [_rng.getrandbits(64) for _ in range(4)]
+for _rights in range(16):
+    for _bit in range(4):
+        if _rights >> _bit & 1:
+            CASTLING_KEYS[_rights] ^= _castling_bits[_bit]
+# Indexed by the en passant square, squares on the same file share a key. Index -1 (no en passant) maps to 0
+_file_keys = [_rng.getrandbits(64) for _ in range(8)]
+EP_KEYS: List[int] = [_file_keys[s % 8] for s in range(64)] + [0]
+del _rng, _castling_bits, _rights, _bit, _file_keys
+
+
+def compute_key(pieces: List[int], white_turn: bool, castling: int, ep_square: int) -> int:
+    key = CASTLING_KEYS[castling] ^ EP_KEYS[ep_square]
+    if not white_turn:
+        key ^= SIDE_KEY
+    for i, bb in enumerate(pieces):
+        keys = PIECE_KEYS[i]
+        while bb:
+            lsb = bb & -bb
+            key ^= keys[lsb.bit_length() - 1]
+            bb ^= lsb
+    return key
@@ -0,0 +1,180 @@
+import argparse
+import logging
+import mmap
+import os
+import random
+import struct
+import sys
+from functools import partial
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .board import BoardState
+from .board.bitboard import Bitboard
+from .board.notation import parse_move
+from .board.utilities import move_to_data
+from .pgn import START_FEN, PGNGame, bulk, read_file
+from ..communication import MoveData
+
+_logger = logging.getLogger("j_chess_lib")
+
+# Polyglot style layout: 16 byte big endian entries (key u64, move u16, weight u16, learn u32) sorted by key.
+# Keys are the zobrist keys of the board module and moves the 16 bit encoding of the moves module, so the files are
+# not interchangeable with Polyglot books. learn holds the number of games the move was played in
+ENTRY = struct.Struct(">QHHI")
+_KEY = struct.Struct(">Q")
+
+
+class BookEntry(NamedTuple):
+    key: int
+    move: int
+    weight: int
+    learn: int
+
+
+class OpeningBook:
+    # Read only view of a book file. The file is memory mapped, so opening costs nothing and every process using the
+    # same book shares it through the page cache. Lookups are a binary search over the sorted keys
+
+    def __init__(self, path: str):
+        self._path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._size = size // ENTRY.size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size > 0 else b""
+
+    def __len__(self) -> int:
+        return self._size
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> "OpeningBook":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _lower_bound(self, key: int) -> int:
+        low, high = 0, self._size
+        data = self._map
+        while low < high:
+            middle = (low + high) // 2
+            if _KEY.unpack_from(data, middle * ENTRY.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def entries(self, key: int) -> List[BookEntry]:
+        ret = []
+        data = self._map
+        i = self._lower_bound(key)
+        while i < self._size:
+            entry = BookEntry(*ENTRY.unpack_from(data, i * ENTRY.size))
+            if entry.key != key:
+                break
+            ret.append(entry)
+            i += 1
+        return ret
+
+    def choose(self, board: Bitboard, rng: Optional[random.Random] = None) -> int:
+        # Encoded book move for the position chosen by weight, 0 if the book has no (legal) move for it
+        entries = [e for e in self.entries(board.key) if e.weight > 0]
+        if len(entries) == 0:
+            return 0
+        legal = board.generate_move_list()
+        entries = [e for e in entries if e.move in legal]
+        if len(entries) == 0:
+            return 0
+        return (rng or random).choices([e.move for e in entries], weights=[e.weight for e in entries])[0]
+
+    def get_move(self, board_state: BoardState, rng: Optional[random.Random] = None) -> Optional[MoveData]:
+        move = self.choose(board_state.bitboard, rng=rng)
+        return None if move == 0 else move_to_data(move=move, white=board_state.bitboard.white_turn)
+
+
+def game_entries(game: PGNGame, max_ply: int = 30) -> List[Tuple[int, int, int]]:
+    # (position key, encoded move, points) of the first max_ply plies of the game. A move gets 2 points per win and
+    # 1 per draw of the side that played it (1 per game if the result is unknown). Stops at the first illegal move
+    ret = []
+    board = Bitboard.from_fen(game.fen)
+    for text in game.moves[:max_ply]:
+        try:
+            move = parse_move(board, text)
+        except ValueError as e:
+            _logger.debug("Skipping rest of game %s: %s", game.headers, e)
+            break
+        if game.result in ("*", "1/2-1/2"):
+            points = 1
+        else:
+            points = 2 if (game.result == "1-0") == board.white_turn else 0
+        ret.append((board.key, move, points))
+        board.make_encoded_move(move)
+    return ret
+
+
+def write_book(games: Iterable[List[Tuple[int, int, int]]], path: str, min_games: int = 1) -> int:
+    # Writes the book of the game_entries of all games and returns the number of entries
+    stats: Dict[Tuple[int, int], List[int]] = {}
+    for entries in games:
+        for key, move, points in entries:
+            stat = stats.setdefault((key, move), [0, 0])
+            stat[0] += points
+            stat[1] += 1
+
+    entries = sorted(
+        ((key, move, min(0xFFFF, weight), min(0xFFFF_FFFF, count))
+         for (key, move), (weight, count) in stats.items() if count >= min_games),
+        key=lambda x: (x[0], -x[2], x[1])
+    )
+    with open(path, "wb") as f_out:
+        for entry in entries:
+            f_out.write(ENTRY.pack(*entry))
+    return len(entries)
+
+
+def build_book(games: Iterable[PGNGame], path: str, max_ply: int = 30, min_games: int = 1) -> int:
+    return write_book((game_entries(game, max_ply=max_ply) for game in games), path, min_games=min_games)
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Opening book tools")
+    commands = parser.add_subparsers(dest="command")
+    build = commands.add_parser("build", help="compile PGN files into a book")
+    build.add_argument("book", help="book file to write")
+    build.add_argument("pgn", nargs="+", help="PGN files to read")
+    build.add_argument("--max-ply", type=int, default=30, help="plies of every game to add")
+    build.add_argument("--min-games", type=int, default=1, help="games a move needs to be played in")
+    build.add_argument("-w", "--workers", type=int, default=1, help="processes replaying the games")
+    build.add_argument("--mmap", action="store_true", help="memory map the PGN files instead of reading them")
+    probe = commands.add_parser("probe", help="print the book moves of a position")
+    probe.add_argument("book", help="book file to read")
+    probe.add_argument("fen", nargs="?", default=START_FEN, help="position, the start position if missing")
+    parsed = parser.parse_args(args)
+
+    if parsed.command == "build":
+        if parsed.workers > 1:
+            games = bulk(parsed.pgn, partial(game_entries, max_ply=parsed.max_ply), workers=parsed.workers,
+                         use_mmap=parsed.mmap)
+        else:
+            games = (game_entries(game, max_ply=parsed.max_ply)
+                     for pgn in parsed.pgn for game in read_file(pgn, use_mmap=parsed.mmap))
+        count = write_book(games, parsed.book, min_games=parsed.min_games)
+        print(f"Wrote {count} entries to {parsed.book}")
+        return 0
+    if parsed.command == "probe":
+        board = Bitboard.from_fen(parsed.fen)
+        with OpeningBook(parsed.book) as book:
+            for entry in book.entries(board.key):
+                data = move_to_data(move=entry.move, white=board.white_turn)
+                print(f"{data.from_value}{data.to}{data.promotion_unit or ''} weight {entry.weight} "
+                      f"games {entry.learn}")
+        return 0
+    parser.print_help()
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
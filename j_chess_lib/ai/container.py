@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Optional
 
 from j_chess_lib.ai.board import BoardState
 from j_chess_lib.communication.schema import AwaitMoveMessage, MoveData
@@ -10,12 +11,15 @@ class GameState:
     your_time: int
     last_move: MoveData
     board_state: BoardState
+    # None if the AI did not ponder, else if last_move is the reply it pondered on
+    ponder_hit: Optional[bool] = None
 
     @classmethod
-    def from_await_move(cls, data: AwaitMoveMessage) -> "GameState":
+    def from_await_move(cls, data: AwaitMoveMessage, ponder_hit: Optional[bool] = None) -> "GameState":
         return GameState(
             enemy_time=data.time_control.enemy_time_in_ms,
             your_time=data.time_control.your_time_in_ms,
             last_move=data.last_move,
             board_state=BoardState(fen=data.position),
+            ponder_hit=ponder_hit,
         )
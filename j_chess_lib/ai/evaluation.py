@@ -0,0 +1,159 @@
+from typing import Callable, List, Sequence, Tuple
+
+from .board.bitboard import Bitboard, Undo, BLACK_OFFSET, KING, ROOK, iter_bits, _CASTLING_ROOK
+
+# Middlegame material and piece square tables from white's point of view, index 0 is a1 (simplified evaluation
+# function values). The endgame values favour advanced pawns and a central king
+PIECE_VALUES = (100, 320, 330, 500, 900, 0)
+ENDGAME_PIECE_VALUES = (120, 300, 320, 520, 920, 0)
+PST = (
+    (0, 0, 0, 0, 0, 0, 0, 0, 5, 10, 10, -20, -20, 10, 10, 5, 5, -5, -10, 0, 0, -10, -5, 5, 0, 0, 0, 20, 20, 0, 0, 0,
+     5, 5, 10, 25, 25, 10, 5, 5, 10, 10, 20, 30, 30, 20, 10, 10, 50, 50, 50, 50, 50, 50, 50, 50,
+     0, 0, 0, 0, 0, 0, 0, 0),
+    (-50, -40, -30, -30, -30, -30, -40, -50, -40, -20, 0, 5, 5, 0, -20, -40, -30, 5, 10, 15, 15, 10, 5, -30,
+     -30, 0, 15, 20, 20, 15, 0, -30, -30, 5, 15, 20, 20, 15, 5, -30, -30, 0, 10, 15, 15, 10, 0, -30,
+     -40, -20, 0, 0, 0, 0, -20, -40, -50, -40, -30, -30, -30, -30, -40, -50),
+    (-20, -10, -10, -10, -10, -10, -10, -20, -10, 5, 0, 0, 0, 0, 5, -10, -10, 10, 10, 10, 10, 10, 10, -10,
+     -10, 0, 10, 10, 10, 10, 0, -10, -10, 5, 5, 10, 10, 5, 5, -10, -10, 0, 5, 10, 10, 5, 0, -10,
+     -10, 0, 0, 0, 0, 0, 0, -10, -20, -10, -10, -10, -10, -10, -10, -20),
+    (0, 0, 0, 5, 5, 0, 0, 0, -5, 0, 0, 0, 0, 0, 0, -5, -5, 0, 0, 0, 0, 0, 0, -5, -5, 0, 0, 0, 0, 0, 0, -5,
+     -5, 0, 0, 0, 0, 0, 0, -5, -5, 0, 0, 0, 0, 0, 0, -5, 5, 10, 10, 10, 10, 10, 10, 5, 0, 0, 0, 0, 0, 0, 0, 0),
+    (-20, -10, -10, -5, -5, -10, -10, -20, -10, 0, 5, 0, 0, 0, 0, -10, -10, 5, 5, 5, 5, 5, 0, -10,
+     0, 0, 5, 5, 5, 5, 0, -5, -5, 0, 5, 5, 5, 5, 0, -5, -10, 0, 5, 5, 5, 5, 0, -10,
+     -10, 0, 0, 0, 0, 0, 0, -10, -20, -10, -10, -5, -5, -10, -10, -20),
+    (20, 30, 10, 0, 0, 10, 30, 20, 20, 20, 0, 0, 0, 0, 20, 20, -10, -20, -20, -20, -20, -20, -20, -10,
+     -20, -30, -30, -40, -40, -30, -30, -20, -30, -40, -40, -50, -50, -40, -40, -30,
+     -30, -40, -40, -50, -50, -40, -40, -30, -30, -40, -40, -50, -50, -40, -40, -30,
+     -30, -40, -40, -50, -50, -40, -40, -30),
+)
+ENDGAME_PST = (
+    tuple((0, 10, 10, 20, 35, 60, 100, 0)[s >> 3] for s in range(64)),
+    PST[1],
+    PST[2],
+    (0,) * 64,
+    PST[4],
+    (-50, -30, -30, -30, -30, -30, -30, -50, -30, -30, 0, 0, 0, 0, -30, -30, -30, -10, 20, 30, 30, 20, -10, -30,
+     -30, -10, 30, 40, 40, 30, -10, -30, -30, -10, 30, 40, 40, 30, -10, -30, -30, -10, 20, 30, 30, 20, -10, -30,
+     -30, -20, -10, 0, 0, -10, -20, -30, -50, -40, -30, -20, -20, -30, -40, -50),
+)
+# Game phase of the pieces, the start position has the full phase of 24 (pure middlegame), bare kings 0
+PHASE_WEIGHTS = (0, 1, 1, 2, 4, 0)
+FULL_PHASE = 24
+
+
+def square_tables(values: Sequence[int], pst: Sequence[Sequence[int]]) -> List[List[int]]:
+    # tables[piece index][square]: material plus piece square value, positive for white and negative for black
+    return [
+        [(values[p % 6] + pst[p % 6][s if p < BLACK_OFFSET else s ^ 56]) * (1 if p < BLACK_OFFSET else -1)
+         for s in range(64)]
+        for p in range(12)
+    ]
+
+
+class Evaluator:
+    # Scores positions for the search from the point of view of the side to move. The search calls reset with the
+    # root position and push / pop for every move it makes and takes back, so an evaluator can keep its terms up to
+    # date instead of computing them per node. Subclasses need to implement evaluate and may use the hooks
+
+    def reset(self, board: Bitboard):
+        pass
+
+    def push(self, undo: Undo):
+        pass
+
+    def pop(self):
+        pass
+
+    def evaluate(self, board: Bitboard) -> int:
+        raise NotImplementedError()
+
+    def __call__(self, board: Bitboard) -> int:
+        return self.evaluate(board)
+
+    def make_move(self, board: Bitboard, move: int) -> Undo:
+        undo = board.make_encoded_move(move)
+        self.push(undo)
+        return undo
+
+    def unmake_move(self, board: Bitboard, undo: Undo):
+        board.unmake_move(undo)
+        self.pop()
+
+
+class FunctionEvaluator(Evaluator):
+    # Evaluates every node from scratch with a function of the board
+
+    def __init__(self, function: Callable[[Bitboard], int]):
+        self._function = function
+
+    def evaluate(self, board: Bitboard) -> int:
+        return self._function(board)
+
+
+class IncrementalEvaluator(Evaluator):
+    # Material and piece square tables tapered between middlegame and endgame by the phase of the remaining pieces.
+    # The sums are updated from the undo record of every move and restored from a stack when it is taken back, so
+    # evaluate is O(1). Subclasses can add terms by overriding evaluate and adding to super().evaluate(board)
+
+    def __init__(self, middlegame: Tuple[Sequence[int], Sequence[Sequence[int]]] = (PIECE_VALUES, PST),
+                 endgame: Tuple[Sequence[int], Sequence[Sequence[int]]] = (ENDGAME_PIECE_VALUES, ENDGAME_PST),
+                 phase_weights: Sequence[int] = PHASE_WEIGHTS):
+        # middlegame and endgame are (piece values, piece square tables) of pawn to king from white's point of view
+        self._mg_tables = square_tables(*middlegame)
+        self._eg_tables = square_tables(*endgame)
+        self._phase_weights = [phase_weights[p % 6] for p in range(12)]
+        self.mg = self.eg = self.phase = 0
+        self._stack: List[Tuple[int, int, int]] = []
+
+    def reset(self, board: Bitboard):
+        self.mg, self.eg, self.phase = self.terms(board)
+        self._stack = []
+
+    def terms(self, board: Bitboard) -> Tuple[int, int, int]:
+        # Middlegame score, endgame score (both from white's point of view) and phase computed from scratch
+        mg = eg = phase = 0
+        for piece, bb in enumerate(board.pieces):
+            for square in iter_bits(bb):
+                mg += self._mg_tables[piece][square]
+                eg += self._eg_tables[piece][square]
+                phase += self._phase_weights[piece]
+        return mg, eg, phase
+
+    def push(self, undo: Undo):
+        from_square, to_square, piece, placed, captured, captured_square = undo[:6]
+        mg_tables, eg_tables = self._mg_tables, self._eg_tables
+        self._stack.append((self.mg, self.eg, self.phase))
+        mg = self.mg - mg_tables[piece][from_square] + mg_tables[placed][to_square]
+        eg = self.eg - eg_tables[piece][from_square] + eg_tables[placed][to_square]
+        if placed != piece:
+            self.phase += self._phase_weights[placed] - self._phase_weights[piece]
+        if captured >= 0:
+            mg -= mg_tables[captured][captured_square]
+            eg -= eg_tables[captured][captured_square]
+            self.phase -= self._phase_weights[captured]
+        if piece % BLACK_OFFSET == KING and (to_square - from_square == 2 or from_square - to_square == 2):
+            rook = piece - KING + ROOK
+            rook_from, rook_to = _CASTLING_ROOK[to_square]
+            mg += mg_tables[rook][rook_to] - mg_tables[rook][rook_from]
+            eg += eg_tables[rook][rook_to] - eg_tables[rook][rook_from]
+        self.mg, self.eg = mg, eg
+
+    def pop(self):
+        self.mg, self.eg, self.phase = self._stack.pop()
+
+    def evaluate(self, board: Bitboard) -> int:
+        phase = min(self.phase, FULL_PHASE)
+        score = (self.mg * phase + self.eg * (FULL_PHASE - phase)) // FULL_PHASE
+        return score if board.white_turn else -score
+
+
+def evaluate(board: Bitboard) -> int:
+    # Tapered material and piece square score of the side to move computed from scratch. Only the tables of the shared
+    # evaluator are read, none of its state, so the ponder thread and the search can call this at the same time
+    mg, eg, phase = _TABLES.terms(board)
+    phase = min(phase, FULL_PHASE)
+    score = (mg * phase + eg * (FULL_PHASE - phase)) // FULL_PHASE
+    return score if board.white_turn else -score
+
+
+_TABLES = IncrementalEvaluator()
@@ -1,4 +1,5 @@
 from .pgn_player import PGNPlayer
 from .rng import Random
+from .search_ai import SearchAI
 
-__all__ = ["Random", "PGNPlayer"]
+__all__ = ["Random", "PGNPlayer", "SearchAI"]
@@ -0,0 +1,130 @@
+import logging
+import threading
+from typing import Optional
+from uuid import UUID
+
+from j_chess_lib.ai import VerboseAI
+from j_chess_lib.ai.board import BoardState
+from j_chess_lib.ai.board.bitbase import Bitbases
+from j_chess_lib.ai.board.utilities import get_legal_moves, move_to_data
+from j_chess_lib.ai.book import OpeningBook
+from j_chess_lib.ai.container import GameState
+from j_chess_lib.ai.evaluation import Evaluator
+from j_chess_lib.ai.parallel import ParallelSearcher
+from j_chess_lib.ai.search import Searcher
+from j_chess_lib.communication import MoveData, MatchFormatData
+
+
+class SearchAI(VerboseAI):
+
+    def __init__(
+        self, name: str = "Searcher", max_depth: int = 64, tt_entries: int = 1 << 18, moves_to_go: int = 30,
+        safety_margin: int = 150, min_time: int = 20, workers: int = 1, ponder: bool = False,
+        book: Optional[str] = None, bitbases: Optional[str] = None, evaluator: Optional[Evaluator] = None
+    ):
+        # Times are in milliseconds like the clocks sent by the server. With workers > 1 the root moves are searched
+        # by a process pool that lives as long as this AI. With ponder the enemy's thinking time is used to search the
+        # expected position, a hit finds that search in the transposition table. book is the path of an opening book
+        # (see j_chess_lib.ai.book) played from before searching, bitbases a directory of endgame tables (see
+        # j_chess_lib.ai.board.bitbase) that limit the searched moves to the ones keeping the win or draw. evaluator
+        # replaces the incremental material and piece square evaluation (see j_chess_lib.ai.evaluation)
+        super().__init__(name=name)
+        self._ponder = ponder
+        self._searcher = Searcher(tt_entries=tt_entries, evaluator=evaluator)
+        self._parallel = ParallelSearcher(workers=workers, tt_entries=tt_entries, evaluator=evaluator) \
+            if workers > 1 else None
+        self._book = None if book is None else OpeningBook(book)
+        self._bitbases = None if bitbases is None else Bitbases(bitbases)
+        self._max_depth = max_depth
+        self._moves_to_go = moves_to_go
+        self._safety_margin = safety_margin
+        self._min_time = min_time
+
+    @property
+    def searcher(self) -> Searcher:
+        return self._searcher
+
+    @property
+    def pondering(self) -> bool:
+        # The worker processes have their own transposition tables, pondering in this one would not help them
+        return self._ponder and self._parallel is None
+
+    def predict_reply(self, game_id: UUID, match_id: UUID, board_state: BoardState) -> Optional[MoveData]:
+        # The reply of the principal variation of the last search
+        bitboard = board_state.bitboard
+        move = self._searcher.tt.best_move(bitboard.key)
+        if move == 0 or move not in bitboard.generate_move_list():
+            return None
+        return move_to_data(move=move, white=bitboard.white_turn)
+
+    def ponder(self, game_id: UUID, match_id: UUID, board_state: BoardState, stop: threading.Event):
+        result = self._searcher.search(board_state.bitboard, max_depth=self._max_depth, stop=stop.is_set)
+        if self.verbose and self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("%s pondered depth %d nodes %d on %s", self.name, result.depth, result.nodes,
+                              board_state.fen)
+
+    def close(self):
+        if self._parallel is not None:
+            self._parallel.close()
+        if self._book is not None:
+            self._book.close()
+        if self._bitbases is not None:
+            self._bitbases.close()
+
+    def new_game(self, game_id: UUID, match_id: UUID, white_player: str):
+        super().new_game(game_id=game_id, match_id=match_id, white_player=white_player)
+        self._searcher.new_game()
+        if self._parallel is not None:
+            self._parallel.start()
+
+    def time_budget(self, game_state: GameState, match_format: Optional[MatchFormatData]) -> int:
+        # Milliseconds to think: an even share of the clock plus most of the increment, a bit more when ahead on
+        # time and never more than a quarter of the clock or the per move limit of the match
+        your_time = max(0, game_state.your_time - self._safety_margin)
+        increment = per_move = 0
+        if match_format is not None:
+            increment = match_format.time_per_side_increment or 0
+            per_move = match_format.time_per_side_per_move or 0
+        budget = your_time / self._moves_to_go + increment * 0.8
+        if game_state.enemy_time > 0:
+            budget *= min(1.25, max(0.75, game_state.your_time / game_state.enemy_time))
+        budget = min(budget, your_time / 4)
+        if per_move > 0:
+            budget = min(budget, per_move - self._safety_margin)
+        return int(max(self._min_time, budget))
+
+    def get_move(self, game_id: UUID, match_id: UUID, game_state: GameState) -> MoveData:
+        if self._book is not None:
+            move_data = self._book.get_move(board_state=game_state.board_state)
+            if move_data is not None:
+                if self.verbose:
+                    self.logger.log(self._level, "%s plays from the opening book", self.name)
+                    self.log_move(move_data=move_data)
+                return move_data
+        match = self.get_match(match_id=match_id)
+        budget = self.time_budget(game_state=game_state, match_format=None if match is None else match[1])
+        board = game_state.board_state.bitboard
+        if game_state.ponder_hit is not None and self.verbose:
+            self.logger.log(self._level, "%s ponder %s", self.name, "hit" if game_state.ponder_hit else "miss")
+        # Positions of the bitbases are small enough for the own searcher
+        root_moves = None if self._bitbases is None else self._bitbases.best_moves(board)
+        if self._parallel is not None and root_moves is None:
+            result = self._parallel.search(game_state.board_state.fen, time_limit=budget / 1000,
+                                           max_depth=self._max_depth)
+        else:
+            result = self._searcher.search(board, time_limit=budget / 1000, max_depth=self._max_depth,
+                                           root_moves=root_moves)
+        if result.move == 0:
+            # No legal move, the game should be over. Send something instead of nothing
+            moves = get_legal_moves(board=game_state.board_state)
+            move_data = moves[0] if moves else MoveData(from_value="a1", to="a1")
+        else:
+            move_data = move_to_data(move=result.move, white=board.white_turn)
+        if self.verbose:
+            self.logger.log(
+                self._level, "%s searched depth %d score %d nodes %d in %.0f/%dms (%.0f nps)",
+                self.name, result.depth, result.score, result.nodes, result.seconds * 1000, budget,
+                result.nodes / max(result.seconds, 1e-9)
+            )
+            self.log_move(move_data=move_data)
+        return move_data
@@ -0,0 +1,158 @@
+import multiprocessing
+import os
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from typing import Dict, List, Optional, Sequence
+
+from .board.bitboard import Bitboard
+from .evaluation import Evaluator
+from .search import MATE, MAX_PLY, SearchResult, Searcher
+
+# Searcher of the worker process, created once by the pool initializer so its transposition table survives moves
+_worker_searcher: Optional[Searcher] = None
+# Completed depths go to _worker_reports as they finish, a worker searches as long as _worker_current holds its id
+_worker_reports = None
+_worker_current = None
+_MATE_BOUND = MATE - MAX_PLY
+# Seconds before the deadline the shares are merged, the workers stop another margin earlier
+_MERGE_MARGIN = 0.05
+
+
+def _init_worker(tt_entries: int, evaluator: Optional[Evaluator], reports, current):
+    global _worker_searcher, _worker_reports, _worker_current
+    _worker_searcher = Searcher(tt_entries=tt_entries, evaluator=evaluator)
+    _worker_reports = reports
+    _worker_current = current
+
+
+def _ping():
+    pass
+
+
+def _search_worker(search_id: int, share: int, fen: str, root_moves: Sequence[int], time_limit: Optional[float],
+                   max_depth: int, soft_limit: float) -> List[SearchResult]:
+    _worker_searcher.search(Bitboard.from_fen(fen), time_limit=time_limit, max_depth=max_depth,
+                            soft_limit=soft_limit, root_moves=root_moves,
+                            stop=lambda: _worker_current.value != search_id,
+                            report=lambda result: _worker_reports.put((search_id, share, result)))
+    return _worker_searcher.iterations
+
+
+class ParallelSearcher:
+    # Root splitting search over a process pool. The legal root moves are dealt round robin (after move ordering)
+    # to the workers, every worker runs an iterative deepening search on its share and reports the result of every
+    # completed depth. The merged result is the best move of the deepest depth all workers completed.
+    # The shares are merged shortly before the deadline, a share that is still searching then takes part with the
+    # depths it reported so far and is stopped.
+    # The pool is started with the searcher (again by start after close) and kept until close, so the workers are
+    # spawned outside of any move's time. Positions are sent as FEN strings, the evaluator is pickled once per worker
+
+    def __init__(self, workers: Optional[int] = None, tt_entries: int = 1 << 18,
+                 evaluator: Optional[Evaluator] = None):
+        self._workers = workers or os.cpu_count() or 1
+        self._tt_entries = tt_entries
+        self._evaluator = evaluator
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._reports = None
+        self._current = None
+        self._searches = 0
+        # Orders the root moves and searches alone when there is nothing to split
+        self._searcher = Searcher(tt_entries=tt_entries, evaluator=evaluator)
+        if self._workers > 1:
+            self.start()
+
+    @property
+    def workers(self) -> int:
+        return self._workers
+
+    @property
+    def started(self) -> bool:
+        return self._pool is not None
+
+    def start(self):
+        # Spawns all workers and waits until they are initialized
+        if self._pool is not None:
+            return
+        context = multiprocessing.get_context()
+        self._reports = context.Queue()
+        self._current = context.RawValue("q", 0)
+        self._pool = ProcessPoolExecutor(max_workers=self._workers, mp_context=context, initializer=_init_worker,
+                                         initargs=(self._tt_entries, self._evaluator, self._reports, self._current))
+        wait([self._pool.submit(_ping) for _ in range(self._workers)])
+
+    def close(self):
+        if self._pool is not None:
+            self._current.value = 0
+            self._pool.shutdown(wait=True)
+            self._reports.close()
+            self._pool = self._reports = self._current = None
+
+    def __enter__(self) -> "ParallelSearcher":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def split(self, board: Bitboard) -> List[List[int]]:
+        moves = self._searcher._order(board, board.generate_move_list(), 0, 0)
+        shares = min(self._workers, len(moves))
+        return [moves[i::shares] for i in range(shares)]
+
+    def search(self, fen: str, time_limit: Optional[float] = None, max_depth: int = 64,
+               soft_limit: float = 0.5) -> SearchResult:
+        start = time.perf_counter()
+        board = Bitboard.from_fen(fen)
+        shares = self.split(board)
+        if len(shares) == 0 or (len(shares) == 1 and len(shares[0]) == 1) or self._workers == 1:
+            return self._searcher.search(board, time_limit=time_limit, max_depth=max_depth, soft_limit=soft_limit)
+
+        self.start()
+        self._searches += 1
+        search_id = self._current.value = self._searches
+        deadline = worker_limit = None
+        if time_limit is not None:
+            margin = min(_MERGE_MARGIN, time_limit / 10)
+            deadline = start + time_limit - margin
+            worker_limit = max(0.0, deadline - margin - time.perf_counter())
+        futures = [self._pool.submit(_search_worker, search_id, i, fen, share, worker_limit, max_depth, soft_limit)
+                   for i, share in enumerate(shares)]
+        done, _ = wait(futures, timeout=None if deadline is None else max(0.0, deadline - time.perf_counter()))
+        self._current.value = 0
+        reported = self._reported(search_id=search_id)
+        iterations = []
+        for i, future in enumerate(futures):
+            its = future.result() if future in done and future.exception() is None else reported.get(i, [])
+            # Shares without a single completed depth are left out of the merge
+            if len(its) > 0:
+                iterations.append(its)
+        if len(iterations) == 0:
+            return SearchResult(move=shares[0][0], score=0, depth=0, nodes=0, seconds=time.perf_counter() - start)
+        return merge(iterations)._replace(seconds=time.perf_counter() - start)
+
+    def _reported(self, search_id: int) -> Dict[int, List[SearchResult]]:
+        # Completed depths per share of the search, reports left over from earlier searches are dropped
+        reported: Dict[int, List[SearchResult]] = {}
+        while True:
+            try:
+                report_id, share, result = self._reports.get_nowait()
+            except queue.Empty:
+                return reported
+            if report_id == search_id:
+                reported.setdefault(share, []).append(result)
+
+
+def merge(iterations: List[List[SearchResult]]) -> SearchResult:
+    # Best result at the deepest depth completed by every share. A share that stopped early on a mate score keeps
+    # that score for all deeper depths
+    depth = min(
+        MAX_PLY if abs(its[-1].score) >= _MATE_BOUND else its[-1].depth
+        for its in iterations
+    )
+    best: Optional[SearchResult] = None
+    for its in iterations:
+        candidate = [x for x in its if x.depth <= depth][-1]
+        if best is None or candidate.score > best.score:
+            best = candidate
+    return SearchResult(move=best.move, score=best.score, depth=min(depth, max(x[-1].depth for x in iterations)),
+                        nodes=sum(its[-1].nodes for its in iterations), seconds=0.0)
@@ -0,0 +1,171 @@
+import mmap
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, TypeVar
+
+from .board.bitboard import Bitboard
+from .board.notation import parse_move
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+# Suffix annotations and the numeric annotation glyphs they stand for
+SUFFIX_NAGS = {"!": 1, "?": 2, "!!": 3, "??": 4, "!?": 5, "?!": 6}
+
+_TAG = re.compile(r"^\[(\w+)\s+\"((?:[^\"\\]|\\.)*)\"\]\s*$")
+_TOKEN = re.compile(
+    r"\{([^}]*)\}|;([^\n]*)|(\()|(\))|\$(\d+)|\d+\.+|(1-0|0-1|1/2-1/2|\*)(?=\s|$)|([^\s(){};$]+)"
+)
+_SUFFIX = re.compile(r"^(.*?)([!?]+)$")
+T = TypeVar("T")
+
+
+class PGNGame(NamedTuple):
+    headers: Dict[str, str]
+    # Moves of the main line as written (SAN or LAN), without annotations
+    moves: List[str]
+    result: str
+    # Comments after ply n (0 is before the first move), NAGs and variations of the move of ply n. Variations hold
+    # the moves replacing the move of ply n, variations inside variations are dropped
+    comments: Dict[int, List[str]]
+    nags: Dict[int, List[int]]
+    variations: Dict[int, List[List[str]]]
+
+    @property
+    def fen(self) -> str:
+        return self.headers.get("FEN", START_FEN)
+
+    def encoded_moves(self) -> List[int]:
+        # Main line as encoded moves (see board.moves), raises ValueError at the first illegal move
+        board = Bitboard.from_fen(self.fen)
+        ret = []
+        for text in self.moves:
+            move = parse_move(board, text)
+            board.make_encoded_move(move)
+            ret.append(move)
+        return ret
+
+
+def split_games(lines: Iterable[str]) -> Iterator[str]:
+    # Text of one game after the other. Only the current game is kept in memory
+    game: List[str] = []
+    has_moves = False
+    open_comment = False
+    for line in lines:
+        if line.startswith("%"):
+            continue
+        stripped = line.strip()
+        if not open_comment and stripped.startswith("[") and _TAG.match(stripped) is not None and has_moves:
+            yield "\n".join(game)
+            game, has_moves = [], False
+        if stripped:
+            game.append(stripped)
+            if open_comment or _TAG.match(stripped) is None:
+                has_moves = True
+                # Braced comments do not nest and may span lines, tags inside them are not tags
+                open_comment = stripped.rfind("{") > stripped.rfind("}") if "{" in stripped or "}" in stripped \
+                    else open_comment
+    if game:
+        yield "\n".join(game)
+
+
+def parse_game(text: str) -> PGNGame:
+    headers: Dict[str, str] = {}
+    movetext = []
+    for line in text.splitlines():
+        tag = _TAG.match(line) if not movetext else None
+        if tag is not None:
+            headers[tag.group(1)] = tag.group(2).replace('\\"', '"').replace("\\\\", "\\")
+        else:
+            movetext.append(line)
+
+    moves: List[str] = []
+    comments: Dict[int, List[str]] = {}
+    nags: Dict[int, List[int]] = {}
+    variations: Dict[int, List[List[str]]] = {}
+    result = headers.get("Result", "*")
+    depth = 0
+    variation: List[str] = []
+    for match in _TOKEN.finditer("\n".join(movetext)):
+        comment, line_comment, open_variation, close_variation, nag, game_result, san = match.groups()
+        if open_variation:
+            depth += 1
+            variation = [] if depth == 1 else variation
+        elif close_variation:
+            if depth == 1 and moves:
+                variations.setdefault(len(moves) - 1, []).append(variation)
+            depth = max(0, depth - 1)
+        elif depth > 0:
+            if depth == 1 and san is not None:
+                suffix = _SUFFIX.match(san)
+                san = san if suffix is None else suffix.group(1)
+                if san:
+                    variation.append(san)
+        elif comment is not None or line_comment is not None:
+            comments.setdefault(len(moves), []).append((comment if comment is not None else line_comment).strip())
+        elif nag is not None:
+            nags.setdefault(len(moves) - 1, []).append(int(nag))
+        elif game_result is not None:
+            result = game_result
+        elif san is not None:
+            suffix = _SUFFIX.match(san)
+            if suffix is not None:
+                san = suffix.group(1)
+                if san:
+                    moves.append(san)
+                nags.setdefault(len(moves) - 1, []).append(SUFFIX_NAGS.get(suffix.group(2), 0))
+            else:
+                moves.append(san)
+    return PGNGame(headers=headers, moves=moves, result=result, comments=comments, nags=nags, variations=variations)
+
+
+def read_games(lines: Iterable[str]) -> Iterator[PGNGame]:
+    for text in split_games(lines):
+        yield parse_game(text)
+
+
+def _mmap_lines(path: str) -> Iterator[str]:
+    with open(path, "rb") as f_in:
+        with mmap.mmap(f_in.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for line in iter(data.readline, b""):
+                yield line.decode("utf-8", errors="replace")
+
+
+def _file_lines(path: str) -> Iterator[str]:
+    with open(path, "r", encoding="utf-8", errors="replace") as f_in:
+        yield from f_in
+
+
+def read_file(path: str, use_mmap: bool = False) -> Iterator[PGNGame]:
+    # Games of a PGN file, read lazily. With use_mmap the file is mapped instead of read through a buffer, which
+    # shares the pages with other processes reading the same archive
+    yield from read_games(_mmap_lines(path) if use_mmap else _file_lines(path))
+
+
+def _parse_and_apply(function: Callable[[PGNGame], T], texts: List[str]) -> List[T]:
+    return [function(parse_game(text)) for text in texts]
+
+
+def bulk(paths: Iterable[str], function: Callable[[PGNGame], T], workers: Optional[int] = None,
+         use_mmap: bool = False, batch_size: int = 256) -> Iterator[T]:
+    # function applied to every game of the files in a process pool, results in file order. The files are split into
+    # games here, parsing and function run in the workers. At most two batches per worker are in flight, so memory
+    # does not grow with the archive. function has to be picklable (a module level function or a partial of one)
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        limit = 2 * workers
+        batch: List[str] = []
+        for path in paths:
+            for text in split_games(_mmap_lines(path) if use_mmap else _file_lines(path)):
+                batch.append(text)
+                if len(batch) >= batch_size:
+                    pending.append(pool.submit(_parse_and_apply, function, batch))
+                    batch = []
+                    while len(pending) >= limit:
+                        yield from pending.popleft().result()
+        if batch:
+            pending.append(pool.submit(_parse_and_apply, function, batch))
+        while pending:
+            yield from pending.popleft().result()
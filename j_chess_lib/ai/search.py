@@ -0,0 +1,245 @@
+import time
+from typing import Callable, List, NamedTuple, Optional, Sequence
+
+from .board.bitboard import Bitboard
+from .board.moves import EN_PASSANT, PROMOTION, MoveList
+from .board.transposition import EXACT, LOWER_BOUND, UPPER_BOUND, TranspositionTable
+from .evaluation import PIECE_VALUES, Evaluator, FunctionEvaluator, IncrementalEvaluator
+
+MATE = 30000
+INFINITY = 32000
+MAX_PLY = 96
+# Scores beyond this are mate scores, they are stored in the transposition table relative to the node
+_MATE_BOUND = MATE - MAX_PLY
+_ASPIRATION_WINDOW = 35
+_TIME_CHECK_MASK = 255
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class SearchResult(NamedTuple):
+    move: int
+    score: int
+    depth: int
+    nodes: int
+    seconds: float
+
+
+class Searcher:
+    # Negamax alpha-beta with principal variation search, iterative deepening, aspiration windows, quiescence search,
+    # a transposition table, check extensions and killer moves. Works on encoded moves (see board.moves)
+
+    def __init__(self, tt_entries: int = 1 << 18, evaluate_function: Optional[Callable[[Bitboard], int]] = None,
+                 evaluator: Optional[Evaluator] = None):
+        # evaluator defaults to the incremental material and piece square evaluation, evaluate_function replaces it
+        # by a function called on every leaf
+        self.tt = TranspositionTable(entries=tt_entries)
+        if evaluator is None:
+            evaluator = IncrementalEvaluator() if evaluate_function is None else FunctionEvaluator(evaluate_function)
+        self.evaluator = evaluator
+        self.nodes = 0
+        self._move_lists = [MoveList() for _ in range(MAX_PLY + 1)]
+        self._killers = [[0, 0] for _ in range(MAX_PLY + 1)]
+        self._path: List[int] = []
+        self._deadline = float("inf")
+        self._root_move = 0
+        self._root_moves: Optional[Sequence[int]] = None
+        self._stop: Callable[[], bool] = _never
+        # Results of the completed depths of the last search
+        self.iterations: List[SearchResult] = []
+
+    def new_game(self):
+        self.tt.clear()
+
+    def search(self, board: Bitboard, time_limit: Optional[float] = None, max_depth: int = 64,
+               soft_limit: float = 0.5, root_moves: Optional[Sequence[int]] = None,
+               stop: Optional[Callable[[], bool]] = None,
+               report: Optional[Callable[[SearchResult], None]] = None) -> SearchResult:
+        # Searches a copy of board. Returns the best move of the last completed depth. A new depth is only started
+        # while less than soft_limit of the time limit (in seconds) is used. root_moves restricts the moves searched
+        # at the root, e.g. to split the root over several processes. stop ends the search early once it returns True,
+        # report is called with the result of every completed depth
+        start = time.perf_counter()
+        self._deadline = float("inf") if time_limit is None else start + time_limit
+        self._stop = _never if stop is None else stop
+        self.nodes = 0
+        self.iterations = []
+        self.tt.new_search()
+        self._killers = [[0, 0] for _ in range(MAX_PLY + 1)]
+        board = board.copy()
+        self.evaluator.reset(board)
+
+        legal_moves = list(board.generate_move_list())
+        self._root_moves = None if root_moves is None else [m for m in legal_moves if m in root_moves]
+        if self._root_moves is not None:
+            legal_moves = self._root_moves
+        if len(legal_moves) == 0:
+            return SearchResult(move=0, score=-MATE if board.king_attacked(board.white_turn) else 0, depth=0,
+                                nodes=0, seconds=time.perf_counter() - start)
+        result = SearchResult(move=legal_moves[0], score=0, depth=0, nodes=0, seconds=0.0)
+        if len(legal_moves) == 1 and root_moves is None:
+            return result._replace(seconds=time.perf_counter() - start)
+
+        score = 0
+        for depth in range(1, max(1, min(max_depth, MAX_PLY - 1)) + 1):
+            self._path = []
+            try:
+                if depth >= 4 and abs(score) < _MATE_BOUND:
+                    score = self._aspiration(board, depth, score)
+                else:
+                    score = self._negamax(board, depth, -INFINITY, INFINITY, 0)
+            except SearchTimeout:
+                break
+            elapsed = time.perf_counter() - start
+            result = SearchResult(move=self._root_move, score=score, depth=depth, nodes=self.nodes, seconds=elapsed)
+            self.iterations.append(result)
+            if report is not None:
+                report(result)
+            if abs(score) >= _MATE_BOUND or (time_limit is not None and elapsed > soft_limit * time_limit):
+                break
+        return result._replace(nodes=self.nodes, seconds=time.perf_counter() - start)
+
+    def _aspiration(self, board: Bitboard, depth: int, score: int) -> int:
+        delta = _ASPIRATION_WINDOW
+        alpha, beta = score - delta, score + delta
+        while True:
+            score = self._negamax(board, depth, alpha, beta, 0)
+            if score <= alpha:
+                alpha = max(-INFINITY, alpha - delta)
+            elif score >= beta:
+                beta = min(INFINITY, beta + delta)
+            else:
+                return score
+            delta *= 2
+
+    def _check_time(self):
+        if time.perf_counter() > self._deadline or self._stop():
+            raise SearchTimeout()
+
+    def _order(self, board: Bitboard, moves: MoveList, tt_move: int, ply: int, captures_only: bool = False
+               ) -> List[int]:
+        # TT move, captures by most valuable victim / least valuable attacker, promotions, killers, the rest
+        squares = board.squares
+        killers = self._killers[ply]
+        scored = []
+        for move in moves:
+            victim = squares[move >> 6 & 0x3F]
+            if move == tt_move:
+                scored.append((1 << 20, move))
+            elif victim >= 0 or move >> 14 == EN_PASSANT:
+                scored.append(((1 << 16) + PIECE_VALUES[victim % 6 if victim >= 0 else 0] * 8 -
+                               squares[move & 0x3F] % 6, move))
+            elif move >> 14 == PROMOTION:
+                scored.append(((1 << 16) + (move >> 12 & 3), move))
+            elif captures_only:
+                continue
+            elif move == killers[0] or move == killers[1]:
+                scored.append((1 << 12, move))
+            else:
+                scored.append((0, move))
+        scored.sort(reverse=True)
+        return [move for _, move in scored]
+
+    def _negamax(self, board: Bitboard, depth: int, alpha: int, beta: int, ply: int) -> int:
+        self.nodes += 1
+        if self.nodes & _TIME_CHECK_MASK == 0:
+            self._check_time()
+        key = board.key
+        if ply > 0 and (board.halfmove >= 100 or key in self._path):
+            return 0
+        if depth <= 0 or ply >= MAX_PLY:
+            return self._quiescence(board, alpha, beta, ply)
+
+        entry = self.tt.probe(key)
+        tt_move = 0
+        if entry is not None:
+            tt_move = entry.move
+            if ply > 0 and entry.depth >= depth:
+                score = _from_tt(entry.score, ply)
+                if entry.flag == EXACT or (entry.flag == LOWER_BOUND and score >= beta) or \
+                        (entry.flag == UPPER_BOUND and score <= alpha):
+                    return score
+
+        in_check = board.king_attacked(board.white_turn)
+        if in_check:
+            depth += 1
+        moves = board.generate_move_list(self._move_lists[ply])
+        if moves.size == 0:
+            return -MATE + ply if in_check else 0
+
+        original_alpha = alpha
+        best_score, best_move = -INFINITY, 0
+        ordered = self._order(board, moves, tt_move, ply)
+        if ply == 0 and self._root_moves is not None:
+            ordered = [move for move in ordered if move in self._root_moves]
+        self._path.append(key)
+        for i, move in enumerate(ordered):
+            undo = self.evaluator.make_move(board, move)
+            if i == 0:
+                score = -self._negamax(board, depth - 1, -beta, -alpha, ply + 1)
+            else:
+                score = -self._negamax(board, depth - 1, -alpha - 1, -alpha, ply + 1)
+                if alpha < score < beta:
+                    score = -self._negamax(board, depth - 1, -beta, -alpha, ply + 1)
+            self.evaluator.unmake_move(board, undo)
+            if score > best_score:
+                best_score, best_move = score, move
+                if ply == 0:
+                    self._root_move = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                if undo.captured < 0 and move >> 14 != PROMOTION:
+                    killers = self._killers[ply]
+                    if killers[0] != move:
+                        killers[1], killers[0] = killers[0], move
+                break
+        self._path.pop()
+
+        flag = LOWER_BOUND if best_score >= beta else UPPER_BOUND if best_score <= original_alpha else EXACT
+        self.tt.store(key, depth, _to_tt(best_score, ply), flag, best_move)
+        return best_score
+
+    def _quiescence(self, board: Bitboard, alpha: int, beta: int, ply: int) -> int:
+        self.nodes += 1
+        if self.nodes & _TIME_CHECK_MASK == 0:
+            self._check_time()
+        moves = board.generate_move_list(self._move_lists[ply])
+        if moves.size == 0:
+            return -MATE + ply if board.king_attacked(board.white_turn) else 0
+        stand_pat = self.evaluator.evaluate(board)
+        if stand_pat >= beta or ply >= MAX_PLY:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+        for move in self._order(board, moves, 0, ply, captures_only=True):
+            undo = self.evaluator.make_move(board, move)
+            score = -self._quiescence(board, -beta, -alpha, ply + 1)
+            self.evaluator.unmake_move(board, undo)
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
+
+
+def _never() -> bool:
+    return False
+
+
+def _to_tt(score: int, ply: int) -> int:
+    if score >= _MATE_BOUND:
+        return score + ply
+    if score <= -_MATE_BOUND:
+        return score - ply
+    return score
+
+
+def _from_tt(score: int, ply: int) -> int:
+    if score >= _MATE_BOUND:
+        return score - ply
+    if score <= -_MATE_BOUND:
+        return score + ply
+    return score
@@ -0,0 +1,162 @@
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Generic, Hashable, Iterator, List, Optional, TypeVar
+
+from ..communication.schema import MatchFormatData
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    # max_entries keeps the most recently used records (None for no limit), ttl drops records not used for that
+    # many seconds. With evict_finished records are dropped once their match or game is finalized, at the start of
+    # the next one so the finalize methods of subclasses can still read them
+    max_entries: Optional[int] = 1024
+    ttl: Optional[float] = None
+    evict_finished: bool = False
+
+
+class MatchRecord:
+    __slots__ = ("enemy", "match_format")
+
+    def __init__(self, enemy: str, match_format: MatchFormatData):
+        self.enemy = enemy
+        self.match_format = match_format
+
+    # Unpacks and indexes like the (enemy, match format) tuples StoreAI used to return
+    def __iter__(self) -> Iterator[Any]:
+        yield self.enemy
+        yield self.match_format
+
+    def __getitem__(self, item: int) -> Any:
+        return (self.enemy, self.match_format)[item]
+
+    def __len__(self) -> int:
+        return 2
+
+    def __eq__(self, other):
+        if not isinstance(other, (MatchRecord, tuple)):
+            return NotImplemented
+        return tuple(self) == tuple(other)
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __repr__(self):
+        return f"MatchRecord(enemy={self.enemy!r}, match_format={self.match_format!r})"
+
+
+class GameRecord:
+    __slots__ = ("white_player", "winner", "pgn", "finished")
+
+    def __init__(self, white_player: str):
+        self.white_player = white_player
+        self.winner: Optional[str] = None
+        self.pgn: Optional[str] = None
+        self.finished = False
+
+
+class BoundedStore(Generic[K, V]):
+    # Dict with least recently used eviction and expiry, O(1) per operation. on_evict is called with every record
+    # dropped by the policy (not with the ones removed by pop)
+
+    def __init__(self, policy: RetentionPolicy, on_evict: Optional[Callable[[K, V], None]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self._policy = policy
+        self._on_evict = on_evict
+        self._clock = clock
+        # key -> (record, last use), least recently used first
+        self._data: "OrderedDict[K, List[Any]]" = OrderedDict()
+        self._finished: List[K] = []
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._data
+
+    def keys(self) -> List[K]:
+        return list(self._data.keys())
+
+    def get(self, key: K) -> Optional[V]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        now = self._clock()
+        if self._policy.ttl is not None and now - entry[1] > self._policy.ttl:
+            self._evict(key)
+            return None
+        entry[1] = now
+        self._data.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: K, value: V):
+        self.collect()
+        self._data[key] = [value, self._clock()]
+        self._data.move_to_end(key)
+        self._expire()
+        if self._policy.max_entries is not None:
+            while len(self._data) > self._policy.max_entries:
+                self._evict(next(iter(self._data)))
+
+    def pop(self, key: K) -> Optional[V]:
+        entry = self._data.pop(key, None)
+        return None if entry is None else entry[0]
+
+    def finish(self, key: K):
+        # Marks the record as done, with evict_finished it is dropped by the next put or collect
+        if self._policy.evict_finished:
+            self._finished.append(key)
+
+    def collect(self):
+        finished, self._finished = self._finished, []
+        for key in finished:
+            if key in self._data:
+                self._evict(key)
+        self._expire()
+
+    def _expire(self):
+        if self._policy.ttl is None:
+            return
+        deadline = self._clock() - self._policy.ttl
+        while self._data:
+            key, entry = next(iter(self._data.items()))
+            if entry[1] >= deadline:
+                break
+            self._evict(key)
+
+    def _evict(self, key: K):
+        value = self._data.pop(key)[0]
+        if self._on_evict is not None:
+            self._on_evict(key, value)
+
+
+class GameArchive:
+    # Finished games evicted from a StoreAI appended as JSON lines to a file
+
+    def __init__(self, path: str):
+        self._path = path
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def write(self, match_id, game_id, record: GameRecord, enemy: Optional[str]):
+        with open(self._path, "a", encoding="utf-8") as f_out:
+            f_out.write(json.dumps({
+                "match_id": str(match_id), "game_id": str(game_id), "enemy": enemy,
+                "white_player": record.white_player, "winner": record.winner, "pgn": record.pgn,
+            }) + "\n")
+
+    def __iter__(self) -> Iterator[Dict[str, Optional[str]]]:
+        try:
+            with open(self._path, "r", encoding="utf-8") as f_in:
+                for line in f_in:
+                    if line.strip():
+                        yield json.loads(line)
+        except FileNotFoundError:
+            return
@@ -0,0 +1,69 @@
+import asyncio
+import logging
+from concurrent.futures import Executor
+from typing import Iterable, List, Optional, Union
+from uuid import UUID
+
+from .Client import ClientBase
+from .Exceptions import InterruptClient
+from ..ai import AI
+from ..communication import AsyncConnection, JchessMessage, JchessMessageType
+
+_logger = logging.getLogger("j_chess_lib")
+
+
+class AsyncClient(ClientBase):
+    # Client as a coroutine instead of three threads, so one event loop serves many of them. get_move runs in
+    # executor, the default executor of the loop if None. A ProcessPoolExecutor needs a picklable AI and changes the
+    # AI makes to itself in get_move stay in the worker
+
+    def __init__(self, connection: AsyncConnection, ai: AI, tournament_code: Optional[str] = None,
+                 executor: Optional[Executor] = None):
+        super().__init__(connection=connection, ai=ai, tournament_code=tournament_code)
+        self._executor = executor
+
+    @property
+    def executor(self) -> Optional[Executor]:
+        return self._executor
+
+    async def _send(self, message: Union[JchessMessage, bytes]):
+        await self._connection.send(message=message)
+
+    async def _recv(self) -> JchessMessage:
+        while True:
+            message = self._intercept(message=await self._connection.recv())
+            if message is not None:
+                return message
+
+    async def run(self):
+        try:
+            self._logged_in(new_id=await self._handle_login())
+
+            while True:
+                message = await self._recv()
+                if message.message_type == JchessMessageType.MATCH_FOUND:
+                    await self._handle_match(message=message)
+
+        except InterruptClient as e:
+            _logger.error("Client interrupeted and killed", extra={"AI": self._ai, "Connection": self._connection})
+            _logger.error("Cause: %s", e, extra={"AI": self._ai, "Connection": self._connection})
+        except (asyncio.IncompleteReadError, OSError) as e:
+            _logger.error("Connection lost: %s", e, extra={"AI": self._ai, "Connection": self._connection})
+
+    async def _handle_login(self) -> Optional[UUID]:
+        while True:
+            await self._send(message=self._login_msg())
+            message = await self._recv()
+            if message.message_type != JchessMessageType.ACCEPT:
+                return self._login_reply(message=message)
+
+    async def _handle_match(self, message: JchessMessage):
+        from .match import AsyncMatch
+        match = AsyncMatch.handle_match(message=message, recv=self._recv, ai=self.ai, client=self, send=self._send)
+        await match.play_match()
+
+
+async def run_clients(clients: Iterable[AsyncClient]) -> List[Optional[BaseException]]:
+    # Runs the clients concurrently on the current event loop until all of them are done. A client failing does not
+    # end the others, the exception is returned at its place instead
+    return await asyncio.gather(*(client.run() for client in clients), return_exceptions=True)
@@ -1,49 +1,146 @@
 import logging
 import queue
 import threading
-from typing import Optional
+from typing import Optional, Union
 from uuid import uuid4, UUID
 
 from .Exceptions import UnhandledMessageError, LoginFailedError, InterruptClient
 from ..ai import AI
 from ..communication import Connection, JchessMessage, JchessMessageType
+from ..communication.connection.templates import MessageTemplates
 from ..communication.schema import LoginMessage
 
 _logger = logging.getLogger("j_chess_lib")
+_MAX_SEND_BATCH = 64
 
 
-class Client(threading.Thread):
+class ClientBase:
+    # Identity, login and message interception shared by the thread based Client and the asyncio AsyncClient
 
-    def __init__(self, connection: Connection, ai: AI, tournament_code: Optional[str] = None):
+    def __init__(self, connection, ai: AI, tournament_code: Optional[str] = None):
         self._id = uuid4()
         self._original_id = self._id
         self._tournament_code = tournament_code
         self._ai = ai
         self._connection = connection
-        self._send_queue: queue.Queue[JchessMessage] = queue.Queue()
-        self._recv_queue: queue.Queue[JchessMessage] = queue.Queue()
-        super().__init__(daemon=True, name=f"ClientThread-{ai.name}")
+        self._player_id = str(self._id)
+        self._templates: Optional[MessageTemplates] = None
+
+    @property
+    def id(self) -> UUID:
+        return self._id
+
+    @property
+    def templates(self) -> MessageTemplates:
+        # Rendered MOVE bodies for the current id, rebuilt after the login changed it
+        if self._templates is None or self._templates.player_id != self._player_id:
+            self._templates = MessageTemplates(player_id=self._player_id)
+        return self._templates
+
+    @property
+    def ai(self) -> AI:
+        return self._ai
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __eq__(self, other):
+        if isinstance(other, ClientBase):
+            return other.id == self.id
+        return False
+
+    def __str__(self):
+        return f"Client {self.id} with {self.ai.name}"
+
+    def base_msg(self) -> JchessMessage:
+        return JchessMessage(player_id=self._player_id)
+
+    def _login_msg(self) -> JchessMessage:
+        message = self.base_msg()
+        message.login = LoginMessage(name=self.ai.name, tournament_code=self._tournament_code)
+        message.message_type = JchessMessageType.LOGIN
+        return message
+
+    @staticmethod
+    def _login_reply(message: JchessMessage) -> Optional[UUID]:
+        if message.message_type == JchessMessageType.LOGIN_REPLY:
+            return UUID(message.login_reply.new_id)
+        elif message.message_type == JchessMessageType.DISCONNECT:
+            return None
+        raise UnhandledMessageError(message=message)
+
+    def _logged_in(self, new_id: Optional[UUID]):
+        if new_id is None:
+            _logger.info("Login failed")
+            raise LoginFailedError()
+        if self._id != new_id:
+            _logger.info("Login success id changed %s -> %s", self._id, new_id,
+                         extra={"AI": self._ai, "Connection": self._connection})
+        else:
+            _logger.info("Login success", extra={"AI": self._ai, "Connection": self._connection})
+        self._original_id = self._id
+        self._id = new_id
+        self._player_id = str(new_id)
+
+    def _intercept(self, message: JchessMessage) -> Optional[JchessMessage]:
+        message = self._intercept_disconnect(message=message)
+        return self._intercept_heartbeat(message=message)
+
+    def _intercept_disconnect(self, message: JchessMessage) -> Optional[JchessMessage]:
+        if message is None:
+            return message
+        if message.message_type == JchessMessageType.DISCONNECT:
+            raise InterruptClient(message.disconnect.error_type_code)
+        return message
+
+    def _intercept_heartbeat(self, message: JchessMessage) -> Optional[JchessMessage]:
+        if message is None:
+            return message
+        if message.message_type == JchessMessageType.HEART_BEAT:
+            _logger.debug("Received a heartbeat", extra={"AI": self._ai, "Connection": self._connection})
+            return None
+        return message
+
+
+class Client(ClientBase, threading.Thread):
+
+    def __init__(self, connection: Connection, ai: AI, tournament_code: Optional[str] = None):
+        ClientBase.__init__(self, connection=connection, ai=ai, tournament_code=tournament_code)
+        self._send_queue: queue.Queue[Union[JchessMessage, bytes]] = queue.Queue()
+        self._recv_queue: queue.Queue[Union[JchessMessage, OSError]] = queue.Queue()
+        threading.Thread.__init__(self, daemon=True, name=f"ClientThread-{ai.name}")
 
         class SendThread(threading.Thread):
-            def __init__(self, _connection: Connection, _send_queue: queue.Queue[JchessMessage]):
+            def __init__(self, _connection: Connection, _send_queue: queue.Queue[Union[JchessMessage, bytes]]):
                 super().__init__(daemon=True)
                 self._connection = _connection
                 self._send_queue = _send_queue
 
             def run(self) -> None:
+                # Messages queued while the last batch was written go out together in one syscall
                 while True:
-                    message = self._send_queue.get()
-                    self._connection.send(message=message)
+                    messages = [self._send_queue.get()]
+                    while len(messages) < _MAX_SEND_BATCH:
+                        try:
+                            messages.append(self._send_queue.get_nowait())
+                        except queue.Empty:
+                            break
+                    self._connection.send_many(messages=messages)
 
         class RecvThread(threading.Thread):
-            def __init__(self, _connection: Connection, _recv_queue: queue.Queue[JchessMessage]):
+            def __init__(self, _connection: Connection, _recv_queue: queue.Queue[Union[JchessMessage, OSError]]):
                 super().__init__(daemon=True)
                 self._connection = _connection
                 self._recv_queue = _recv_queue
 
             def run(self) -> None:
                 while True:
-                    message = self._connection.recv()
+                    try:
+                        message = self._connection.recv()
+                    except OSError as e:
+                        # Queued in place of a message, so the client stops waiting for one and raises it
+                        self._recv_queue.put(e)
+                        return
                     # _logger.info("MESSAGE", message)
                     self._recv_queue.put(message)
 
@@ -52,35 +149,14 @@ class Client(threading.Thread):
         send_thread.start()
         recv_thread.start()
 
-    @property
-    def id(self) -> UUID:
-        return self._id
-
-    @property
-    def ai(self) -> AI:
-        return self._ai
-
-    def __hash__(self):
-        return hash(self.id)
-
-    def __eq__(self, other):
-        if isinstance(other, Client):
-            return other.id == self.id
-        return False
-
-    def __str__(self):
-        return f"Client {self.id} with {self.ai.name}"
-
-    def base_msg(self) -> JchessMessage:
-        return JchessMessage(player_id=str(self.id))
-
-    def _send(self, message: JchessMessage):
+    def _send(self, message: Union[JchessMessage, bytes]):
         self._send_queue.put(message)
 
     def _recv(self) -> JchessMessage:
         message = self._recv_queue.get()
-        message = self._intercept_disconnect(message=message)
-        message = self._intercept_heartbeat(message=message)
+        if isinstance(message, OSError):
+            raise message
+        message = self._intercept(message=message)
         if message is None:
             return self._recv()
         return message
@@ -88,14 +164,7 @@ class Client(threading.Thread):
     def run(self):
         try:
             # --Region Login--
-            new_id = self._handle_login()
-            if new_id is None:
-                _logger.info("Login failed")
-                raise LoginFailedError()
-            _logger.info(f"Login success{f' id changed {self._id} -> {new_id}'}" if self._id != new_id else '',
-                         extra={"AI": self._ai, "Connection": self._connection})
-            self._original_id = self._id
-            self._id = new_id
+            self._logged_in(new_id=self._handle_login())
             # --Region Login--
 
             while True:
@@ -105,39 +174,16 @@ class Client(threading.Thread):
 
         except InterruptClient as e:
             _logger.error("Client interrupeted and killed", extra={"AI": self._ai, "Connection": self._connection})
-            _logger.error(f"Cause: {e}", extra={"AI": self._ai, "Connection": self._connection})
-
-    def _intercept_disconnect(self, message: JchessMessage) -> Optional[JchessMessage]:
-        if message is None:
-            return message
-        if message.message_type == JchessMessageType.DISCONNECT:
-            raise InterruptClient(message.disconnect.error_type_code)
-        return message
-
-    def _intercept_heartbeat(self, message: JchessMessage) -> Optional[JchessMessage]:
-        if message is None:
-            return message
-        if message.message_type == JchessMessageType.HEART_BEAT:
-            _logger.debug("Received a heartbeat", extra={"AI": self._ai, "Connection": self._connection})
-            return None
-        return message
+            _logger.error("Cause: %s", e, extra={"AI": self._ai, "Connection": self._connection})
+        except OSError as e:
+            _logger.error("Connection lost: %s", e, extra={"AI": self._ai, "Connection": self._connection})
 
     def _handle_login(self) -> Optional[UUID]:
-        login = LoginMessage(name=self.ai.name, tournament_code=self._tournament_code)
-        message = self.base_msg()
-        message.login = login
-        message.message_type = JchessMessageType.LOGIN
-        self._send(message=message)
-        message = self._recv()
-        if message.message_type == JchessMessageType.LOGIN_REPLY:
-            repl_id = message.login_reply.new_id
-            return UUID(repl_id)
-        elif message.message_type == JchessMessageType.ACCEPT:
-            return self._handle_login()
-        elif message.message_type == JchessMessageType.DISCONNECT:
-            return None
-        else:
-            raise UnhandledMessageError(message=message)
+        while True:
+            self._send(message=self._login_msg())
+            message = self._recv()
+            if message.message_type != JchessMessageType.ACCEPT:
+                return self._login_reply(message=message)
 
     def _handle_match(self, message: JchessMessage):
         from .match import Match
@@ -1,3 +1,4 @@
 from .Client import Client
+from .AsyncClient import AsyncClient, run_clients
 
-__all__ = ["Client"]
+__all__ = ["Client", "AsyncClient", "run_clients"]
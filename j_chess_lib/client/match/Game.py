@@ -1,16 +1,36 @@
-from typing import Callable
+import asyncio
+import functools
+import logging
+import threading
+from typing import Awaitable, Callable, NamedTuple, Optional, Union
 from uuid import uuid4, UUID
 
 from j_chess_lib.ai import AI
+from j_chess_lib.ai.board.utilities import predict_board
 from j_chess_lib.ai.container import GameState
-from j_chess_lib.communication import JchessMessage, JchessMessageType
-from j_chess_lib.communication.schema import GameStartMessage, GameOverMessage, MoveMessage
-from .Match import Match
+from j_chess_lib.communication import JchessMessage, JchessMessageType, MoveData
+from j_chess_lib.communication.schema import GameStartMessage, GameOverMessage
+from .Match import Match, AsyncMatch
+
+_logger = logging.getLogger("j_chess_lib")
+
+
+class _Pondering(NamedTuple):
+    thread: threading.Thread
+    stop: threading.Event
+    predicted: MoveData
+
+
+def _same_move(a: Optional[MoveData], b: Optional[MoveData]) -> bool:
+    if a is None or b is None:
+        return False
+    return a.from_value == b.from_value and a.to == b.to and \
+        (a.promotion_unit or "").lower() == (b.promotion_unit or "").lower()
 
 
 class Game:
-    def __init__(self, data: GameStartMessage, recv: Callable[[], JchessMessage], send: Callable[[JchessMessage], None],
-                 ai: AI, match: Match):
+    def __init__(self, data: GameStartMessage, recv: Callable[[], JchessMessage],
+                 send: Callable[[Union[JchessMessage, bytes]], None], ai: AI, match: Match):
         self._id = uuid4()
         self._recv = recv
         self._send = send
@@ -24,20 +44,101 @@ class Game:
         return self._id
 
     def play(self) -> GameOverMessage:
+        pondering: Optional[_Pondering] = None
+        try:
+            while True:
+                message = self._recv()
+                if message.message_type == JchessMessageType.AWAIT_MOVE:
+                    ponder_hit = None
+                    if pondering is not None:
+                        self._stop_pondering(pondering=pondering)
+                        ponder_hit = _same_move(pondering.predicted, message.await_move.last_move)
+                        pondering = None
+                    game_state = GameState.from_await_move(data=message.await_move, ponder_hit=ponder_hit)
+                    move_data = self._ai.get_move(game_id=self.id, match_id=self._match.id, game_state=game_state)
+                    self._send(self._move_msg(move_data=move_data))
+                    if self._ai.pondering:
+                        pondering = self._start_pondering(game_state=game_state, move_data=move_data)
+                elif message.message_type == JchessMessageType.GAME_OVER:
+                    # finalize_game must not run next to ponder on the same AI
+                    if pondering is not None:
+                        self._stop_pondering(pondering=pondering)
+                        pondering = None
+                    return self._game_over(message=message)
+                else:
+                    raise Exception(f"Unexpected message of {message.message_type}: {message}")
+        finally:
+            if pondering is not None:
+                self._stop_pondering(pondering=pondering)
+
+    def _move_msg(self, move_data: MoveData) -> bytes:
+        # Rendered from the template of the client, the connection sends it as it is
+        return self._match.client.templates.move(move_data=move_data)
+
+    def _game_over(self, message: JchessMessage) -> GameOverMessage:
+        winner = None if message.game_over.is_draw else message.game_over.winner
+        self._ai.finalize_game(game_id=self.id, match_id=self._match.id, winner=winner, pgn=message.game_over.pgn)
+        return message.game_over
+
+    def _start_pondering(self, game_state: GameState, move_data: MoveData) -> Optional[_Pondering]:
+        try:
+            board_state = predict_board(board=game_state.board_state, move=move_data)
+            predicted = self._ai.predict_reply(game_id=self.id, match_id=self._match.id, board_state=board_state)
+            if predicted is None:
+                return None
+            board_state = predict_board(board=board_state, move=predicted)
+        except (KeyError, ValueError) as e:
+            _logger.debug("No pondering, could not predict the position after the reply: %s", e,
+                          extra={"AI": self._ai})
+            return None
+        stop = threading.Event()
+        thread = threading.Thread(
+            target=self._ai.ponder, daemon=True, name=f"PonderThread-{self._ai.name}",
+            kwargs={"game_id": self.id, "match_id": self._match.id, "board_state": board_state, "stop": stop},
+        )
+        thread.start()
+        return _Pondering(thread=thread, stop=stop, predicted=predicted)
+
+    @staticmethod
+    def _stop_pondering(pondering: _Pondering):
+        pondering.stop.set()
+        pondering.thread.join()
+
+
+class AsyncGame(Game):
+    # Game of an AsyncClient, recv and send are coroutine functions. get_move runs in the executor of the client so
+    # the event loop keeps serving the other clients meanwhile
+
+    def __init__(self, data: GameStartMessage, recv: Callable[[], Awaitable[JchessMessage]],
+                 send: Callable[[Union[JchessMessage, bytes]], Awaitable[None]], ai: AI, match: AsyncMatch):
+        super().__init__(data=data, recv=recv, send=send, ai=ai, match=match)
 
-        while True:
-            message = self._recv()
-            if message.message_type == JchessMessageType.AWAIT_MOVE:
-                move_data = self._ai.get_move(game_id=self.id, match_id=self._match.id,
-                                              game_state=GameState.from_await_move(data=message.await_move))
-                move_message = self._match.client.base_msg()
-                move_message.message_type = JchessMessageType.MOVE
-                move_message.move = MoveMessage(move=move_data)
-                self._send(move_message)
-            elif message.message_type == JchessMessageType.GAME_OVER:
-                winner = None if message.game_over.is_draw else message.game_over.winner
-                self._ai.finalize_game(game_id=self.id, match_id=self._match.id,
-                                       winner=winner, pgn=message.game_over.pgn)
-                return message.game_over
-            else:
-                raise Exception(f"Unexpected message of {message.message_type}: {message}")
+    async def play(self) -> GameOverMessage:
+        loop = asyncio.get_running_loop()
+        pondering: Optional[_Pondering] = None
+        try:
+            while True:
+                message = await self._recv()
+                if message.message_type == JchessMessageType.AWAIT_MOVE:
+                    ponder_hit = None
+                    if pondering is not None:
+                        await loop.run_in_executor(None, self._stop_pondering, pondering)
+                        ponder_hit = _same_move(pondering.predicted, message.await_move.last_move)
+                        pondering = None
+                    game_state = GameState.from_await_move(data=message.await_move, ponder_hit=ponder_hit)
+                    move_data = await loop.run_in_executor(self._match.client.executor, functools.partial(
+                        self._ai.get_move, game_id=self.id, match_id=self._match.id, game_state=game_state
+                    ))
+                    await self._send(self._move_msg(move_data=move_data))
+                    if self._ai.pondering:
+                        pondering = self._start_pondering(game_state=game_state, move_data=move_data)
+                elif message.message_type == JchessMessageType.GAME_OVER:
+                    if pondering is not None:
+                        await loop.run_in_executor(None, self._stop_pondering, pondering)
+                        pondering = None
+                    return self._game_over(message=message)
+                else:
+                    raise Exception(f"Unexpected message of {message.message_type}: {message}")
+        finally:
+            if pondering is not None:
+                await loop.run_in_executor(None, self._stop_pondering, pondering)
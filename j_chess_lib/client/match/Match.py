@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Callable, List
+from typing import TYPE_CHECKING, Awaitable, Callable, List, Union
 from uuid import uuid4, UUID
 
 from j_chess_lib.ai import AI
@@ -8,11 +8,14 @@ from j_chess_lib.communication.schema import MatchFormatData, MatchFoundMessage,
 from j_chess_lib.client.Exceptions import WrongMessageType
 from j_chess_lib.client.Client import Client
 
+if TYPE_CHECKING:
+    from j_chess_lib.client.AsyncClient import AsyncClient
+
 
 class Match:
 
     def __init__(self, data: MatchFoundMessage, recv: Callable[[], JchessMessage],
-                 send: Callable[[JchessMessage], None], ai: AI, client: Client):
+                 send: Callable[[Union[JchessMessage, bytes]], None], ai: AI, client: Client):
         self._recv = recv
         self._send = send
         self._ai = ai
@@ -32,7 +35,7 @@ class Match:
 
     @classmethod
     def handle_match(cls, message: JchessMessage, recv: Callable[[], JchessMessage],
-                     send: Callable[[JchessMessage], None], ai: AI, client: Client) -> "Match":
+                     send: Callable[[Union[JchessMessage, bytes]], None], ai: AI, client: Client) -> "Match":
         if not message.message_type == JchessMessageType.MATCH_FOUND:
             raise WrongMessageType(message=message, expected_type=(JchessMessageType.MATCH_FOUND, ))
 
@@ -63,4 +66,21 @@ class Match:
                 message = game.play()
 
 
+class AsyncMatch(Match):
+    # Match of an AsyncClient, recv and send are coroutine functions
+
+    def __init__(self, data: MatchFoundMessage, recv: Callable[[], Awaitable[JchessMessage]],
+                 send: Callable[[Union[JchessMessage, bytes]], Awaitable[None]], ai: AI, client: "AsyncClient"):
+        super().__init__(data=data, recv=recv, send=send, ai=ai, client=client)
 
+    async def play_match(self):
+        while True:
+            message = await self._recv()
+            if message.message_type == JchessMessageType.MATCH_FOUND:
+                self.new_match(data=message.match_found)
+            elif message.message_type == JchessMessageType.MATCH_OVER:
+                self.end_match(data=message.match_over)
+            elif message.message_type == JchessMessageType.GAME_START:
+                from .Game import AsyncGame
+                game = AsyncGame(data=message.game_start, recv=self._recv, send=self._send, ai=self._ai, match=self)
+                await game.play()
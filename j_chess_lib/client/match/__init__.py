@@ -1,4 +1,4 @@
-from .Match import Match
-from .Game import Game
+from .Match import Match, AsyncMatch
+from .Game import Game, AsyncGame
 
-__all__ = ["Match", "Game"]
+__all__ = ["Match", "Game", "AsyncMatch", "AsyncGame"]
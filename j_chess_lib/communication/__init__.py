@@ -4,9 +4,10 @@ except ImportError as e:
     raise ImportError("Failed to import communication classes provided by schema. Did you install them?") from e
 
 from .connection.Connection import Connection
+from .connection.AsyncConnection import AsyncConnection
 schema_version = JchessMessage.schema_version
 
 __all__ = [
-    "Connection",
+    "Connection", "AsyncConnection",
     "JchessMessage", "JchessMessageType", "schema_version", "MoveData", "MatchStatusData", "MatchFormatData"
 ]
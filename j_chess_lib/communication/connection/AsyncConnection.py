@@ -0,0 +1,84 @@
+import asyncio
+import logging
+import socket
+from typing import Iterable, Union
+
+from .Connection import MessageCodec
+from .. import JchessMessage
+
+_logger = logging.getLogger("j_chess_lib")
+
+
+class AsyncConnection(MessageCodec):
+    # The Connection protocol on asyncio streams. Create it with connect inside a running event loop, any number of
+    # them can share the loop
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, address: str = "localhost",
+                 port: int = 5123, no_delay: bool = True):
+        super().__init__()
+        self._address = address
+        self._port = port
+        self._reader = reader
+        self._writer = writer
+        self._socket: socket.socket = writer.get_extra_info("socket")
+        if self._socket is not None:
+            self.no_delay = no_delay
+        self._send_count = 0
+        self._recv_count = 0
+
+    @classmethod
+    async def connect(cls, address: str = "localhost", port: int = 5123, no_delay: bool = True) -> "AsyncConnection":
+        reader, writer = await asyncio.open_connection(host=address, port=port)
+        return cls(reader=reader, writer=writer, address=address, port=port, no_delay=no_delay)
+
+    @property
+    def no_delay(self) -> bool:
+        return bool(self._socket.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY))
+
+    @no_delay.setter
+    def no_delay(self, value: bool):
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, int(value))
+
+    async def __aenter__(self):
+        return self
+
+    async def disconnect(self):
+        _logger.info("Disconnecting from connection")
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except ConnectionError:
+            pass
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.disconnect()
+
+    async def send(self, message: Union[JchessMessage, str, bytes]):
+        await self.send_many(messages=(message, ))
+
+    async def send_many(self, messages: Iterable[Union[JchessMessage, str, bytes]]):
+        buffers = []
+        for message in messages:
+            data = self.encode(message=message)
+            buffers.append(len(data).to_bytes(self._PREFIX_BYTES, self._ENDIAN_TYPE))
+            buffers.append(data)
+            self._send_count += 1
+        self._writer.writelines(buffers)
+        await self._writer.drain()
+
+    async def recv(self) -> JchessMessage:
+        len_msg = await self._reader.readexactly(self._PREFIX_BYTES)
+        data = await self._reader.readexactly(int.from_bytes(len_msg, self._ENDIAN_TYPE))
+        self._recv_count += 1
+        return self.decode(data=data)
+
+    @property
+    def send_count(self):
+        return self._send_count
+
+    @property
+    def recv_count(self):
+        return self._recv_count
+
+    def __str__(self):
+        return f"Connection to {self._address}:{self._port}"
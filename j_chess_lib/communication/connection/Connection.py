@@ -1,12 +1,14 @@
 import logging
 import socket
-from typing import Union
+from typing import Iterable, Union
 
 from xsdata.exceptions import ParserError
 from xsdata.formats.dataclass.parsers import XmlParser
 from xsdata.formats.dataclass.serializers import XmlSerializer
 from xsdata.formats.dataclass.serializers.config import SerializerConfig
 
+from .decoder import fast_decode
+from .framing import FrameBuffer, FrameWriter
 from .. import JchessMessage
 
 _logger = logging.getLogger("j_chess_lib")
@@ -25,16 +27,48 @@ class ConnectionDecodeError(Exception):
         return self._raw_message
 
 
-class Connection:
+class MessageCodec:
+    # Turns messages into frame bodies and back, shared by Connection and AsyncConnection
     _PREFIX_BYTES = 4
     _ENDIAN_TYPE = "big"
 
-    def __init__(self, address: str = "localhost", port: int = 5123):
+    def __init__(self):
+        self._xml_parse = XmlParser()
+        self._xml_serialize = XmlSerializer(config=SerializerConfig(pretty_print=False))
+
+    def encode(self, message: Union[JchessMessage, str, bytes]) -> bytes:
+        # bytes are taken as an already rendered body, like the ones of MessageTemplates
+        if isinstance(message, bytes):
+            return message
+        if isinstance(message, JchessMessage):
+            message = self._xml_serialize.render(message)
+        if isinstance(message, str):
+            return message.encode("utf-8")
+        raise Exception(f"Can't send data of type {type(message)}")
+
+    def decode(self, data: bytes) -> JchessMessage:
+        # Heartbeats and AWAIT_MOVE go through the cheap tiers of fast_decode, the rest through xsdata
+        message = fast_decode(data=data)
+        if message is not None:
+            return message
+        try:
+            return self._xml_parse.from_bytes(source=data, clazz=JchessMessage)
+        except ParserError as e:
+            raise ConnectionDecodeError(message="", raw_message=data.decode("utf-8", errors="replace")) from e
+
+
+class Connection(MessageCodec):
+
+    def __init__(self, address: str = "localhost", port: int = 5123, no_delay: bool = True):
+        # no_delay sets TCP_NODELAY. Every frame or batch of frames is written with one syscall, so Nagle's algorithm
+        # has nothing left to merge and would only hold MOVE frames back
+        super().__init__()
         self._address = address
         self._port = port
         self._conn = socket.create_connection(address=(address, port))
-        self._xml_parse = XmlParser()
-        self._xml_serialize = XmlSerializer(config=SerializerConfig(pretty_print=False))
+        self._frames = FrameBuffer(sock=self._conn, prefix_bytes=self._PREFIX_BYTES, endian=self._ENDIAN_TYPE)
+        self._writer = FrameWriter(sock=self._conn, prefix_bytes=self._PREFIX_BYTES, endian=self._ENDIAN_TYPE)
+        self.no_delay = no_delay
         self._send_count = 0
         self._recv_count = 0
 
@@ -48,34 +82,27 @@ class Connection:
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.disconnect()
 
-    def send(self, message: Union[JchessMessage, str]):
-        if isinstance(message, str):
-            length = len(message)
-            # print(f"Sending message with length of {length}")
-            length = length.to_bytes(self._PREFIX_BYTES, self._ENDIAN_TYPE)
-            self._conn.send(length + message.encode('utf-8'))
-            self._send_count += 1
-            return
-        if isinstance(message, JchessMessage):
-            # print(f"Send message of type {message.message_type}")
-            return self.send(message=self._xml_serialize.render(message))
-        raise Exception(f"Can't send data of type {type(message)}")
+    @property
+    def no_delay(self) -> bool:
+        return bool(self._conn.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY))
+
+    @no_delay.setter
+    def no_delay(self, value: bool):
+        self._conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, int(value))
+
+    def send(self, message: Union[JchessMessage, str, bytes]):
+        self.send_many(messages=(message, ))
+
+    def send_many(self, messages: Iterable[Union[JchessMessage, str, bytes]]):
+        # Writes all messages with as few syscalls as possible
+        bodies = [self.encode(message=message) for message in messages]
+        self._writer.write(bodies=bodies)
+        self._send_count += len(bodies)
 
     def recv(self) -> JchessMessage:
-        len_msg = self._conn.recv(self._PREFIX_BYTES)
-        message_byte_len = int.from_bytes(len_msg, self._ENDIAN_TYPE)
+        data = self._frames.read_frame()
         self._recv_count += 1
-        rcv_msg = bytes()
-        while message_byte_len > 0:
-            new_rcv_msg = self._conn.recv(message_byte_len)
-            message_byte_len -= len(new_rcv_msg)
-            rcv_msg += new_rcv_msg
-        raw_message = rcv_msg.decode("utf-8")
-        try:
-            message = self._xml_parse.from_string(source=raw_message, clazz=JchessMessage)
-        except ParserError as e:
-            raise ConnectionDecodeError(message="", raw_message=raw_message) from e
-        return message
+        return self.decode(data=data)
 
     @property
     def send_count(self):
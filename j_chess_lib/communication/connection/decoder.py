@@ -0,0 +1,67 @@
+import re
+from typing import Dict, Optional
+
+from .. import JchessMessage, JchessMessageType, MoveData
+from ..schema import AwaitMoveMessage, HeartBeatMessage, TimeControlData
+
+_ROOT = b"<JChessMessage"
+_ATTRIBUTE = re.compile(rb"\s(messageType|playerId)\s*=\s*(?:\"([^\"&<]*)\"|'([^'&<]*)')")
+_TYPES: Dict[bytes, JchessMessageType] = {x.value.encode("ascii"): x for x in JchessMessageType}
+_AWAIT_MOVE = re.compile(
+    rb"<AwaitMove>\s*<position>([^<&]*)</position>\s*"
+    rb"(?:<lastMove>\s*<from>([^<&]*)</from>\s*<to>([^<&]*)</to>\s*"
+    rb"(?:<promotionUnit>([^<&]*)</promotionUnit>\s*)?</lastMove>\s*)?"
+    rb"<timeControl>\s*<yourTimeInMs>\s*(-?\d+)\s*</yourTimeInMs>\s*"
+    rb"<enemyTimeInMs>\s*(-?\d+)\s*</enemyTimeInMs>\s*</timeControl>\s*</AwaitMove>\s*</JChessMessage>"
+)
+
+# Returned for every heartbeat, the client only looks at the type and drops it. Its player id is not read
+HEART_BEAT = JchessMessage(message_type=JchessMessageType.HEART_BEAT, heart_beat=HeartBeatMessage())
+
+
+def peek_attributes(data: bytes) -> Dict[bytes, bytes]:
+    # messageType and playerId of the root element, without parsing the document
+    start = data.find(_ROOT)
+    if start < 0:
+        return {}
+    end = data.find(b">", start)
+    return {m.group(1): m.group(2) if m.group(2) is not None else m.group(3)
+            for m in _ATTRIBUTE.finditer(data, start, end)}
+
+
+def peek_message_type(data: bytes) -> Optional[JchessMessageType]:
+    return _TYPES.get(peek_attributes(data).get(b"messageType"))
+
+
+def decode_await_move(data: bytes, player_id: Optional[str] = None) -> Optional[JchessMessage]:
+    # Position, last move and time control of an AWAIT_MOVE with a single regular expression. None if the body
+    # is not in the plain form the server writes (entities, comments, empty or extra elements), the caller then
+    # has to parse it in full
+    match = _AWAIT_MOVE.search(data)
+    if match is None:
+        return None
+    position, from_value, to, promotion_unit, your_time, enemy_time = match.groups()
+    last_move = None
+    if from_value is not None:
+        last_move = MoveData(from_value=from_value.decode("utf-8"), to=to.decode("utf-8"),
+                             promotion_unit=None if promotion_unit is None else promotion_unit.decode("utf-8"))
+    return JchessMessage(
+        message_type=JchessMessageType.AWAIT_MOVE, player_id=player_id,
+        await_move=AwaitMoveMessage(
+            position=position.decode("utf-8"), last_move=last_move,
+            time_control=TimeControlData(your_time_in_ms=int(your_time), enemy_time_in_ms=int(enemy_time)),
+        ),
+    )
+
+
+def fast_decode(data: bytes) -> Optional[JchessMessage]:
+    # The cheap tiers of MessageCodec.decode: heartbeats without building anything and AWAIT_MOVE by
+    # decode_await_move. None for everything else
+    attributes = peek_attributes(data)
+    message_type = _TYPES.get(attributes.get(b"messageType"))
+    if message_type is JchessMessageType.HEART_BEAT:
+        return HEART_BEAT
+    if message_type is JchessMessageType.AWAIT_MOVE:
+        player_id = attributes.get(b"playerId")
+        return decode_await_move(data=data, player_id=None if player_id is None else player_id.decode("utf-8"))
+    return None
@@ -0,0 +1,108 @@
+import os
+import socket
+from typing import Iterable, List, Union
+
+try:
+    _IOV_MAX = os.sysconf("SC_IOV_MAX")
+except (AttributeError, ValueError, OSError):
+    _IOV_MAX = 16
+_IOV_MAX = max(2, min(_IOV_MAX, 1024))
+
+
+class FrameBuffer:
+    # Reads length prefixed frames from a socket into one reusable buffer with recv_into. Every syscall takes as much
+    # as fits, so frames that arrive together are cut from the buffer without another recv. The buffer grows to the
+    # largest frame seen and is never shrunk
+    _DEFAULT_SIZE = 1 << 16
+
+    def __init__(self, sock: socket.socket, prefix_bytes: int = 4, endian: str = "big", size: int = _DEFAULT_SIZE):
+        self._sock = sock
+        self._prefix_bytes = prefix_bytes
+        self._endian = endian
+        self._buffer = bytearray(max(size, prefix_bytes))
+        self._view = memoryview(self._buffer)
+        # Unread data is _buffer[_start:_end]
+        self._start = 0
+        self._end = 0
+        self._recv_calls = 0
+
+    @property
+    def pending(self) -> int:
+        return self._end - self._start
+
+    @property
+    def recv_calls(self) -> int:
+        return self._recv_calls
+
+    def read_frame(self) -> bytes:
+        if self._start == self._end:
+            self._start = self._end = 0
+        self._fill(self._prefix_bytes)
+        length = int.from_bytes(self._view[self._start:self._start + self._prefix_bytes], self._endian)
+        self._fill(self._prefix_bytes + length)
+        start = self._start + self._prefix_bytes
+        self._start = start + length
+        return bytes(self._view[start:self._start])
+
+    def _fill(self, needed: int):
+        # Buffers at least needed bytes from _start on
+        if self._end - self._start >= needed:
+            return
+        if self._start + needed > len(self._buffer) or self._start > len(self._buffer) // 2:
+            self._compact(needed)
+        while self._end - self._start < needed:
+            received = self._sock.recv_into(self._view[self._end:])
+            self._recv_calls += 1
+            if received == 0:
+                raise ConnectionError("Connection closed by the server")
+            self._end += received
+
+    def _compact(self, needed: int):
+        pending = bytes(self._view[self._start:self._end])
+        if needed > len(self._buffer):
+            self._view.release()
+            self._buffer = bytearray(max(needed, 2 * len(self._buffer)))
+            self._view = memoryview(self._buffer)
+        self._buffer[:len(pending)] = pending
+        self._start, self._end = 0, len(pending)
+
+
+class FrameWriter:
+    # Writes length prefixed frames with sendmsg, headers and bodies go out as one scatter/gather list so nothing is
+    # concatenated and a batch of frames takes a single syscall as long as the kernel accepts it whole. Sockets
+    # without sendmsg (Windows) fall back to one sendall of the joined batch
+
+    def __init__(self, sock: socket.socket, prefix_bytes: int = 4, endian: str = "big"):
+        self._sock = sock
+        self._prefix_bytes = prefix_bytes
+        self._endian = endian
+        self._scatter = hasattr(sock, "sendmsg")
+        self._send_calls = 0
+
+    @property
+    def send_calls(self) -> int:
+        return self._send_calls
+
+    def write(self, bodies: Iterable[bytes]):
+        buffers: List[Union[bytes, memoryview]] = []
+        for body in bodies:
+            buffers.append(len(body).to_bytes(self._prefix_bytes, self._endian))
+            buffers.append(body)
+        if not self._scatter:
+            self._sock.sendall(b"".join(buffers))
+            self._send_calls += 1
+            return
+        first = 0
+        while first < len(buffers):
+            sent = self._sock.sendmsg(buffers[first:first + _IOV_MAX])
+            self._send_calls += 1
+            # Drops what was sent, a partly sent buffer continues from a view
+            while sent > 0:
+                size = len(buffers[first])
+                if sent < size:
+                    buffers[first] = memoryview(buffers[first])[sent:]
+                    break
+                sent -= size
+                first += 1
+            while first < len(buffers) and len(buffers[first]) == 0:
+                first += 1
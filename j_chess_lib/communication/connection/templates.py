@@ -0,0 +1,54 @@
+from typing import Dict, Optional
+
+from .Connection import MessageCodec
+from .. import JchessMessage, JchessMessageType, MoveData
+from ..schema import MoveMessage
+
+# Field values the serializer writes as they are, anything else goes the slow way to get its escaping
+_SQUARES: Dict[str, bytes] = {f"{f}{r}": f"{f}{r}".encode("ascii") for f in "abcdefgh" for r in "12345678"}
+_PROMOTIONS: Dict[str, bytes] = {x: x.encode("ascii") for x in "nbrqNBRQ"}
+_MARKERS = ("{from}", "{to}", "{promotion}")
+
+
+class MessageTemplates:
+    # Frame bodies of the frequent outbound messages of one player id, filled into byte templates instead of running
+    # the serializer. The templates are cut from a message rendered once with markers in the variable fields, so the
+    # output is byte for byte what the codec writes for the same message
+
+    def __init__(self, player_id: str, codec: Optional[MessageCodec] = None):
+        self._player_id = player_id
+        self._codec = MessageCodec() if codec is None else codec
+        self._move = self._template(MoveData(from_value=_MARKERS[0], to=_MARKERS[1]))
+        self._move_promotion = self._template(MoveData(from_value=_MARKERS[0], to=_MARKERS[1],
+                                                       promotion_unit=_MARKERS[2]))
+
+    @property
+    def player_id(self) -> str:
+        return self._player_id
+
+    def move_msg(self, move_data: MoveData) -> JchessMessage:
+        return JchessMessage(player_id=self._player_id, message_type=JchessMessageType.MOVE,
+                             move=MoveMessage(move=move_data))
+
+    def move(self, move_data: MoveData) -> bytes:
+        from_value = _SQUARES.get(move_data.from_value)
+        to = _SQUARES.get(move_data.to)
+        if from_value is None or to is None:
+            return self._codec.encode(message=self.move_msg(move_data=move_data))
+        if move_data.promotion_unit is None:
+            return self._move % (from_value, to)
+        promotion = _PROMOTIONS.get(move_data.promotion_unit)
+        if promotion is None:
+            return self._codec.encode(message=self.move_msg(move_data=move_data))
+        return self._move_promotion % (from_value, to, promotion)
+
+    def _template(self, move_data: MoveData) -> bytes:
+        template = self._codec.encode(message=self.move_msg(move_data=move_data)).replace(b"%", b"%%")
+        # The fields come after the attributes, so the last occurrence of a marker is the field even if the player id
+        # happens to contain it
+        for marker in _MARKERS:
+            marker = marker.encode("ascii")
+            index = template.rfind(marker)
+            if index >= 0:
+                template = template[:index] + b"%s" + template[index + len(marker):]
+        return template
@@ -0,0 +1,84 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from typing import List, Optional
+
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def default_formatter() -> logging.Formatter:
+    return logging.Formatter('{asctime} - {levelname:^8s} - {message}', "%Y-%m-%d %H:%M:%S", "{")
+
+
+class JsonFormatter(logging.Formatter):
+    # One JSON object per line with time, level, logger, thread, message and the extras of the record (like the AI
+    # or Connection passed by the client) as strings
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                data[key] = value if isinstance(value, (bool, int, float, type(None))) else str(value)
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    # Puts the records on the queue as they are. The standard QueueHandler formats the message on the logging
+    # thread, this one leaves it to the listener, so arguments of the records must not be changed after logging
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_replaced: List[logging.Handler] = []
+_registered = [False]
+
+
+def start_queue_logging(handlers: Optional[List[logging.Handler]] = None, json_lines: bool = False,
+                        logger: Optional[logging.Logger] = None) -> logging.handlers.QueueListener:
+    # Replaces the handlers of logger (the root logger by default) by a queue. The handlers, or the current ones if
+    # none are given, write on a background thread, so slow streams or disks never hold up a move. json_lines
+    # switches the handlers to JsonFormatter
+    global _listener, _replaced
+    stop_queue_logging(logger=logger)
+    logger = logging.getLogger() if logger is None else logger
+    _replaced = list(logger.handlers)
+    if handlers is None:
+        handlers = _replaced if _replaced else [logging.StreamHandler(stream=sys.stderr)]
+        if not _replaced:
+            handlers[0].setFormatter(fmt=default_formatter())
+    if json_lines:
+        for handler in handlers:
+            handler.setFormatter(fmt=JsonFormatter())
+    record_queue = queue.Queue(-1)
+    logger.handlers = [LazyQueueHandler(record_queue)]
+    _listener = logging.handlers.QueueListener(record_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    if not _registered[0]:
+        atexit.register(stop_queue_logging)
+        _registered[0] = True
+    return _listener
+
+
+def stop_queue_logging(logger: Optional[logging.Logger] = None):
+    # Writes the queued records and puts the replaced handlers back
+    global _listener, _replaced
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+    logger = logging.getLogger() if logger is None else logger
+    logger.handlers = _replaced
+    _replaced = []
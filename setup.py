@@ -85,6 +85,7 @@ with open('HISTORY.rst') as history_file:
     history = history_file.read()
 
 requirements = ["xsdata[cli,lxml,soap]"]
+extras_requirements = {"numpy": ["numpy>=1.17"]}
 test_requirements = []
 
 setup(
@@ -103,6 +104,12 @@ setup(
     ],
     description="Python library for a j-chess bot. Beep Boop",
     install_requires=requirements,
+    extras_require=extras_requirements,
+    entry_points={"console_scripts": [
+        "j-chess-perft=j_chess_lib.ai.board.perft:main",
+        "j-chess-book=j_chess_lib.ai.book:main",
+        "j-chess-bitbase=j_chess_lib.ai.board.bitbase:main",
+    ]},
     license="GNU General Public License v3",
     long_description=str(readme + '\n\n' + history).strip(),
     include_package_data=True,
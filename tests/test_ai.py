@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+
+"""Tests for the AI base classes in `j_chess_lib.ai`."""
+
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+from uuid import uuid4
+
+from j_chess_lib.ai import RetentionPolicy, StoreAI, VerboseAI
+from j_chess_lib.ai import ai as ai_module
+from j_chess_lib.ai.Sample import SampleAI
+from j_chess_lib.ai.storage import BoundedStore, MatchRecord
+from j_chess_lib.communication import MatchFormatData, MatchStatusData
+from j_chess_lib.log import start_queue_logging, stop_queue_logging
+
+
+class _StoreAI(StoreAI):
+
+    def get_move(self, game_id, match_id, game_state):
+        pass
+
+
+class _Clock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestStorage(unittest.TestCase):
+
+    def test_000_lru(self):
+        store = BoundedStore(policy=RetentionPolicy(max_entries=2))
+        store.put("a", 1)
+        store.put("b", 2)
+        self.assertEqual(1, store.get("a"))
+        store.put("c", 3)
+        self.assertEqual(["a", "c"], store.keys())
+        self.assertIsNone(store.get("b"))
+
+    def test_001_ttl(self):
+        clock = _Clock()
+        evicted = []
+        store = BoundedStore(policy=RetentionPolicy(max_entries=None, ttl=10), on_evict=lambda k, v: evicted.append(k),
+                             clock=clock)
+        store.put("a", 1)
+        clock.now = 5
+        store.put("b", 2)
+        clock.now = 12
+        self.assertIsNone(store.get("a"))
+        self.assertEqual(2, store.get("b"))
+        clock.now = 30
+        store.put("c", 3)
+        self.assertEqual(["c"], store.keys())
+        self.assertEqual(["a", "b"], evicted)
+
+    def test_002_evict_finished(self):
+        ai = _StoreAI(retention=RetentionPolicy(evict_finished=True))
+        match_id, game_id = uuid4(), uuid4()
+        ai.new_match(match_id=match_id, enemy="you", match_format=MatchFormatData())
+        ai.new_game(game_id=game_id, match_id=match_id, white_player="me")
+        ai.finalize_game(game_id=game_id, match_id=match_id, winner="me", pgn="1. e4 *")
+        ai.finalize_match(match_id=match_id, status=MatchStatusData(), statistics="")
+        # Still readable until the next match or game starts
+        enemy, match_format = ai.get_match(match_id=match_id)
+        self.assertEqual("you", enemy)
+        self.assertEqual("me", ai.get_game(game_id=game_id, match_id=match_id))
+        ai.new_match(match_id=uuid4(), enemy="other", match_format=MatchFormatData())
+        ai.new_game(game_id=uuid4(), match_id=match_id, white_player="me")
+        self.assertIsNone(ai.get_match(match_id=match_id))
+        self.assertIsNone(ai.get_game(game_id=game_id, match_id=match_id))
+
+    def test_003_archive(self):
+        with tempfile.TemporaryDirectory() as directory:
+            ai = _StoreAI(retention=RetentionPolicy(max_entries=1), archive=os.path.join(directory, "games.jsonl"))
+            match_id, game_id = uuid4(), uuid4()
+            ai.new_match(match_id=match_id, enemy="you", match_format=MatchFormatData())
+            ai.new_game(game_id=game_id, match_id=match_id, white_player="me")
+            ai.finalize_game(game_id=game_id, match_id=match_id, winner=None, pgn="1. e4 *")
+            ai.new_game(game_id=uuid4(), match_id=match_id, white_player="you")
+            self.assertEqual([{"match_id": str(match_id), "game_id": str(game_id), "enemy": "you",
+                               "white_player": "me", "winner": None, "pgn": "1. e4 *"}], list(ai.archive))
+
+    def test_004_sample_ai(self):
+        # The default policy keeps the records the sample reads after finalizing
+        ai = SampleAI()
+        match_id, game_id = uuid4(), uuid4()
+        ai.new_match(match_id=match_id, enemy="you", match_format=MatchFormatData())
+        ai.new_game(game_id=game_id, match_id=match_id, white_player=ai.name)
+        ai.finalize_game(game_id=game_id, match_id=match_id, winner=ai.name, pgn="")
+        ai.finalize_match(match_id=match_id, status=MatchStatusData(name_player1=ai.name, name_player2="you"),
+                          statistics="")
+        self.assertEqual(("you", MatchFormatData()), tuple(ai.get_match(match_id=match_id)))
+
+    def test_005_verbose_evicted_match(self):
+        logger = logging.getLogger("j_chess_lib.test_evicted")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        handler = _ListHandler()
+        logger.addHandler(handler)
+        ai = _VerboseAI(name="me", logger=logger, retention=RetentionPolicy(max_entries=1))
+        match_id, game_id = uuid4(), uuid4()
+        ai.new_match(match_id=match_id, enemy="you", match_format=MatchFormatData())
+        ai.new_match(match_id=uuid4(), enemy="other", match_format=MatchFormatData())
+        ai.new_game(game_id=game_id, match_id=match_id, white_player="me")
+        ai.finalize_game(game_id=game_id, match_id=match_id, winner="me", pgn="1. e4 1-0")
+        logger.removeHandler(handler)
+        self.assertIn("against an unknown enemy as white", handler.lines[-2])
+        self.assertIn("against an unknown enemy as winner", handler.lines[-1])
+
+    def test_006_match_record(self):
+        record = MatchRecord(enemy="you", match_format=None)
+        self.assertEqual(record, ("you", None))
+        self.assertEqual(record, MatchRecord(enemy="you", match_format=None))
+        self.assertNotEqual(record, None)
+        self.assertNotEqual(record, ["you", None])
+        self.assertNotEqual(record, MatchRecord(enemy="other", match_format=None))
+        self.assertEqual(hash(("you", None)), hash(record))
+
+
+class _ListHandler(logging.Handler):
+
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+        self.threads = set()
+
+    def emit(self, record: logging.LogRecord):
+        self.threads.add(threading.current_thread().name)
+        self.lines.append(self.format(record))
+
+
+class _VerboseAI(VerboseAI):
+
+    def get_move(self, game_id, match_id, game_state):
+        pass
+
+
+class TestLogging(unittest.TestCase):
+
+    def test_000_queue(self):
+        logger = logging.getLogger("j_chess_lib.test_queue")
+        logger.propagate = False
+        handler = _ListHandler()
+        start_queue_logging(handlers=[handler], json_lines=True, logger=logger)
+        try:
+            logger.warning("%s moves %d", "me", 3, extra={"AI": "Bot"})
+        finally:
+            stop_queue_logging(logger=logger)
+        self.assertEqual([], logger.handlers)
+        self.assertNotIn(threading.current_thread().name, handler.threads)
+        data = json.loads(handler.lines[0])
+        self.assertEqual(("WARNING", "me moves 3", "Bot"), (data["level"], data["message"], data["AI"]))
+
+    def test_001_lazy(self):
+        logger = logging.getLogger("j_chess_lib.test_lazy")
+        logger.propagate = False
+        handler = _ListHandler()
+        logger.addHandler(handler)
+        ai = _VerboseAI(name="me", logger=logger, level=logging.DEBUG)
+        match_id, game_id = uuid4(), uuid4()
+        ai.new_match(match_id=match_id, enemy="you", match_format=MatchFormatData())
+        ai.new_game(game_id=game_id, match_id=match_id, white_player="me")
+        with patch.object(ai_module._PGNBox, "__str__", side_effect=AssertionError("formatted")) as box:
+            logger.setLevel(logging.INFO)
+            ai.finalize_game(game_id=game_id, match_id=match_id, winner="me", pgn="1. e4 1-0")
+            box.assert_not_called()
+        logger.setLevel(logging.DEBUG)
+        ai.finalize_game(game_id=game_id, match_id=match_id, winner="me", pgn="1. e4 1-0")
+        self.assertTrue(handler.lines[-1].endswith("┌───────────────\n│ 1. e4 1-0\n└───────────────"))
+        logger.removeHandler(handler)
@@ -0,0 +1,407 @@
+#!/usr/bin/env python
+
+"""Tests for the board utilities in `j_chess_lib.ai.board`."""
+
+
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from unittest.mock import patch
+
+from j_chess_lib.ai.board import BoardState, Position, TranspositionTable
+from j_chess_lib.ai.board.attacks import KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, rook_attacks, bishop_attacks
+from j_chess_lib.ai.board.transposition import EXACT, LOWER_BOUND
+from j_chess_lib.ai.board import bitbase, perft
+from j_chess_lib.ai.board.notation import parse_move, move_to_san
+from j_chess_lib.ai.board.moves import MoveList, CASTLING, EN_PASSANT, encode_move, move_flag, move_promotion
+from j_chess_lib.ai.board.bitboard import Bitboard, KNIGHT, QUEEN, WHITE_KING_SIDE, BLACK_KING_SIDE, BLACK_QUEEN_SIDE
+from j_chess_lib.ai.board.utilities import get_possible_moves, get_legal_moves, in_chess, kill_king_move, \
+    predict_board, board_to_fen, move_from_data, move_to_data
+from j_chess_lib.communication import MoveData
+
+try:
+    import numpy
+    from j_chess_lib.ai.board import batch
+except ImportError:
+    numpy = None
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+
+class TestBitboard(unittest.TestCase):
+
+    def test_000_start_position(self):
+        board = BoardState(fen=START_FEN)
+        self.assertEqual(len(get_possible_moves(board_state=board.get_board(), white=True)), 20)
+        self.assertEqual(len(get_possible_moves(board_state=board.get_board(), white=False)), 20)
+        self.assertFalse(in_chess(board_state=board.get_board(), white=True))
+
+    def test_001_dict_view(self):
+        board = BoardState(fen=START_FEN)
+        view = board.get_board()
+        self.assertEqual(view[("e", 1)], "K")
+        self.assertEqual(view[("d", 8)], "q")
+        self.assertEqual(len(view), 32)
+        self.assertEqual(Bitboard.from_dict(dict(view)).pieces, board.bitboard.pieces)
+
+    def test_002_view_edits(self):
+        view = BoardState(fen="4k3/8/8/8/8/8/8/4K3 w - - 0 1").get_board()
+        self.assertFalse(in_chess(board_state=view, white=False))
+        view[("e", 2)] = "Q"
+        self.assertTrue(in_chess(board_state=view, white=False))
+        self.assertTrue(kill_king_move(board_state=view, move=(("e", 2), ("e", 8))))
+        del view[("e", 2)]
+        self.assertFalse(in_chess(board_state=view, white=False))
+
+    def test_003_square_attacked(self):
+        board = Bitboard.from_fen("4k3/8/8/3p4/8/1n6/8/R3K2b w - - 0 1")
+        self.assertTrue(board.is_square_attacked(28, by_white=False))  # e4 by the d5 pawn
+        self.assertTrue(board.is_square_attacked(2, by_white=False))  # c1 by the b3 knight
+        self.assertFalse(board.is_square_attacked(29, by_white=False))
+        self.assertTrue(board.is_square_attacked(56, by_white=True))  # a8 by the a1 rook
+        self.assertFalse(board.is_square_attacked(6, by_white=True))  # g1, the rook is blocked by the king
+        self.assertTrue(board.is_square_attacked(14, by_white=False))  # g2 by the h1 bishop
+        self.assertFalse(board.king_attacked(white=True))
+
+    def test_004_plain_dict(self):
+        board = {("a", 1): "K", ("a", 8): "r", ("h", 8): "k"}
+        self.assertTrue(in_chess(board_state=board, white=True))
+        self.assertEqual(
+            sorted(get_possible_moves(board_state=board, white=True)),
+            [(("a", 1), ("a", 2)), (("a", 1), ("b", 1)), (("a", 1), ("b", 2))]
+        )
+
+
+class TestAttackTables(unittest.TestCase):
+
+    def test_000_leapers(self):
+        self.assertEqual(bin(KNIGHT_ATTACKS[0]).count("1"), 2)
+        self.assertEqual(bin(KNIGHT_ATTACKS[27]).count("1"), 8)
+        self.assertEqual(bin(KING_ATTACKS[63]).count("1"), 3)
+        self.assertEqual(PAWN_ATTACKS[1][8], 1 << 17)
+        self.assertEqual(PAWN_ATTACKS[0][15], 1 << 6)
+
+    def test_001_sliders(self):
+        self.assertEqual(bin(rook_attacks(0, 0)).count("1"), 14)
+        self.assertEqual(bin(bishop_attacks(27, 0)).count("1"), 13)
+        # a1 rook blocked on a3 and c1
+        self.assertEqual(rook_attacks(0, (1 << 16) | (1 << 2)), (1 << 8) | (1 << 16) | (1 << 1) | (1 << 2))
+
+
+class TestMakeUnmake(unittest.TestCase):
+
+    def _roundtrip(self, fen: str, from_square: int, to_square: int, promotion: int = -1) -> Bitboard:
+        board = Bitboard.from_fen(fen)
+        original = board.copy()
+        undo = board.make_move(from_square, to_square, promotion)
+        moved = board.copy()
+        board.unmake_move(undo)
+        self.assertEqual(board, original)
+        self.assertEqual(board.squares, original.squares)
+        self.assertEqual((board.white, board.black, board.occupied),
+                         (original.white, original.black, original.occupied))
+        self.assertEqual((board.halfmove, board.fullmove), (original.halfmove, original.fullmove))
+        self.assertEqual(board.key, original.key)
+        self.assertEqual(moved.key, Bitboard(pieces=moved.pieces, white_turn=moved.white_turn, castling=moved.castling,
+                                             ep_square=moved.ep_square).key)
+        return moved
+
+    def test_000_castling(self):
+        moved = self._roundtrip("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1", 4, 6)
+        self.assertEqual(moved.piece_at(6), "K")
+        self.assertEqual(moved.piece_at(5), "R")
+        self.assertIsNone(moved.piece_at(7))
+        self.assertEqual(moved.castling, BLACK_KING_SIDE | BLACK_QUEEN_SIDE)
+        self.assertFalse(moved.white_turn)
+
+    def test_001_en_passant(self):
+        moved = self._roundtrip("4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 2", 36, 43)
+        self.assertEqual(moved.piece_at(43), "P")
+        self.assertIsNone(moved.piece_at(35))
+        self.assertEqual(moved.ep_square, -1)
+
+    def test_002_double_push(self):
+        moved = self._roundtrip("4k3/8/8/8/8/8/4P3/4K3 w - - 3 1", 12, 28)
+        self.assertEqual(moved.ep_square, 20)
+        self.assertEqual(moved.halfmove, 0)
+
+    def test_003_promotion(self):
+        moved = self._roundtrip("1n2k3/P7/8/8/8/8/8/4K3 w - - 0 1", 48, 57, KNIGHT)
+        self.assertEqual(moved.piece_at(57), "N")
+        moved = self._roundtrip("1n2k3/P7/8/8/8/8/8/4K3 w - - 0 1", 48, 56)
+        self.assertEqual(moved.piece_at(56), "Q")
+
+    def test_004_rook_capture_rights(self):
+        moved = self._roundtrip("r3k2r/8/8/8/8/8/8/R3K2R b KQkq - 0 1", 56, 0)
+        self.assertEqual(moved.castling, WHITE_KING_SIDE | BLACK_KING_SIDE)
+        self.assertEqual(moved.fullmove, 2)
+
+    def test_005_invalid_castling(self):
+        # Two file king moves without the rook or away from the home square are rejected before touching the board
+        for fen, from_square, to_square in (("4k3/8/8/8/8/8/8/4K3 w - - 0 1", 4, 6),
+                                            ("4k3/8/8/8/3K4/8/8/8 w - - 0 1", 27, 29),
+                                            ("4k3/8/8/8/8/8/8/R3K1n1 w - - 0 1", 4, 6)):
+            board = Bitboard.from_fen(fen)
+            original = board.copy()
+            self.assertRaises(ValueError, board.make_move, from_square, to_square)
+            self.assertEqual(board, original)
+            self.assertEqual(board.key, original.key)
+
+
+class TestZobrist(unittest.TestCase):
+
+    def test_000_transposition(self):
+        board = Bitboard.from_fen(START_FEN)
+        start = board.key
+        # 1. Nf3 Nf6 2. Ng1 Ng8 returns to the start position
+        for f, t in ((6, 21), (62, 45), (21, 6), (45, 62)):
+            board.make_move(f, t)
+        self.assertEqual(board.key, start)
+        board.make_move(12, 28)
+        fen = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR {} KQkq e3 0 1"
+        self.assertNotEqual(board.key, Bitboard.from_fen(fen.format("w")).key)
+        self.assertEqual(board.key, BoardState(fen=fen.format("b")).key)
+
+    def test_001_table(self):
+        table = TranspositionTable(entries=16)
+        self.assertIsNone(table.probe(12345))
+        table.store(12345, depth=4, score=17, flag=EXACT, move=99)
+        self.assertEqual(table.probe(12345), (4, 17, EXACT, 99))
+        # Same bucket, shallower: goes to the always-replace slot and keeps the deep entry
+        other = 12345 + 8 * 1000
+        table.store(other, depth=1, score=-3, flag=LOWER_BOUND)
+        self.assertEqual(table.probe(12345).depth, 4)
+        self.assertEqual(table.probe(other).score, -3)
+        table.new_search()
+        table.store(other + 8, depth=1, score=5, flag=EXACT)
+        self.assertIsNone(table.probe(12345))
+        table.clear()
+        self.assertIsNone(table.probe(other + 8))
+
+
+class TestPosition(unittest.TestCase):
+
+    def test_000_parse(self):
+        position = Position.from_fen("r3k2r/8/8/3pP3/8/8/8/R3K2R w Kq d6 4 23")
+        self.assertTrue(position.white_turn)
+        self.assertEqual(position.castling, WHITE_KING_SIDE | BLACK_QUEEN_SIDE)
+        self.assertEqual(position.en_passant, "d6")
+        self.assertEqual((position.halfmove, position.fullmove), (4, 23))
+        self.assertEqual(position.piece_at(36), "P")
+        self.assertEqual(position.piece_at(35), "p")
+        self.assertIsNone(position.piece_at(20))
+        self.assertEqual(position.fen(), "r3k2r/8/8/3pP3/8/8/8/R3K2R w Kq d6 4 23")
+
+    def test_001_lazy(self):
+        board = BoardState(fen=START_FEN)
+        self.assertIsNone(board._position)
+        self.assertTrue(board.white_turn())
+        self.assertIsNotNone(board._position)
+        self.assertIsNone(board._bitboard)
+        self.assertEqual(board.bitboard.castling, 15)
+        self.assertEqual(board, BoardState(fen=START_FEN))
+
+    def test_002_predict_board(self):
+        board = BoardState(fen="r3k2r/8/8/3pP3/8/8/8/R3K2R w Kq d6 4 23")
+        self.assertRaises(ValueError, predict_board, board=board, move=MoveData(from_value="e4", to="e5"))
+        after = predict_board(board=board, move=MoveData(from_value="e5", to="d6"))
+        self.assertEqual(after.fen, "r3k2r/8/3P4/8/8/8/8/R3K2R b Kq - 0 23")
+        self.assertIs(after.position.ranks[0], board.position.ranks[0])
+        after = predict_board(board=after, move=MoveData(from_value="e8", to="c8"))
+        self.assertEqual(after.fen, "2kr3r/8/3P4/8/8/8/8/R3K2R w K - 1 24")
+        after = predict_board(board=after, move=MoveData(from_value="d6", to="d7"))
+        after = predict_board(board=after, move=MoveData(from_value="c8", to="b8"))
+        after = predict_board(board=after, move=MoveData(from_value="d7", to="d8", promotion_unit="n"))
+        self.assertEqual(after.fen, "1k1N3r/8/8/8/8/8/8/R3K2R b K - 0 25")
+        self.assertEqual(after, BoardState(fen=after.fen))
+
+    def test_003_board_to_fen(self):
+        board = BoardState(fen=START_FEN)
+        self.assertEqual(board_to_fen(board=board.get_board(), fen_tail=" w KQkq - 0 1 "), START_FEN)
+
+
+class TestLegalMoves(unittest.TestCase):
+
+    def _moves(self, fen: str):
+        return {(x.from_value, x.to, x.promotion_unit) for x in get_legal_moves(board=BoardState(fen=fen))}
+
+    def test_000_counts(self):
+        self.assertEqual(len(self._moves(START_FEN)), 20)
+        self.assertEqual(len(self._moves("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")), 48)
+        self.assertEqual(len(self._moves("r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1")), 6)
+
+    def test_001_special_moves(self):
+        moves = self._moves("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1")
+        self.assertIn(("e1", "g1", None), moves)
+        self.assertIn(("e1", "c1", None), moves)
+        self.assertNotIn(("e1", "g1", None), self._moves("r3k2r/8/8/8/8/8/6r1/R3K2R w KQkq - 0 1"))
+        self.assertIn(("e5", "d6", None), self._moves("4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 2"))
+        # Taking en passant would expose the king along the rank
+        self.assertNotIn(("e5", "d6", None), self._moves("8/8/8/K2pP2r/8/8/8/7k w - d6 0 2"))
+        promotions = {x[2] for x in self._moves("4k3/P7/8/8/8/8/8/4K3 w - - 0 1") if x[0] == "a7"}
+        self.assertEqual(promotions, {"Q", "R", "B", "N"})
+
+    def test_002_pins_and_checks(self):
+        # The e2 knight is pinned by the e8 rook
+        self.assertFalse(any(x[0] == "e2" for x in self._moves("4r2k/8/8/8/8/8/4N3/4K3 w - - 0 1")))
+        # In check by the a5 bishop: block with the knight or step away, no castling
+        moves = self._moves("7k/8/8/b7/8/5N2/8/4K2R w K - 0 1")
+        self.assertEqual(moves, {("f3", "d2", None), ("e1", "d1", None), ("e1", "f1", None), ("e1", "f2", None),
+                                 ("e1", "e2", None)})
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestBatch(unittest.TestCase):
+    FENS = [
+        START_FEN,
+        "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+        "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 b - - 0 1",
+        "7k/8/8/b7/8/5N2/8/4K2R w K - 0 1",
+    ]
+
+    def test_000_matches_bitboard(self):
+        result = batch.analyze(self.FENS, chunk_size=3)
+        for n, fen in enumerate(self.FENS):
+            board = Bitboard.from_fen(fen)
+            for color, white in ((0, True), (1, False)):
+                self.assertEqual(int(result.attacks[n, color]), board.attacks(white))
+                self.assertEqual(result.mobility[n, color], len(board.generate_moves(white)))
+                self.assertEqual(result.in_check[n, color], board.king_attacked(white))
+            moves = sorted((int(f), int(t)) for i, f, t in result.moves if i == n)
+            self.assertEqual(moves, sorted(board.generate_moves(board.white_turn)))
+
+    def test_001_array_input(self):
+        boards, white_turn = batch.encode_fens(self.FENS)
+        self.assertEqual(boards.shape, (4, 64))
+        self.assertEqual(list(white_turn), [True, True, False, True])
+        self.assertTrue(numpy.array_equal(batch.analyze(boards, white_turn).moves, batch.analyze(self.FENS).moves))
+        self.assertEqual(len(batch.analyze(boards[:0]).moves), 0)
+
+
+class TestMoveEncoding(unittest.TestCase):
+
+    def test_000_encode(self):
+        move = encode_move(52, 60, promotion=KNIGHT)
+        self.assertEqual((move & 0x3F, move >> 6 & 0x3F, move_promotion(move)), (52, 60, KNIGHT))
+        self.assertEqual(move_promotion(encode_move(12, 28)), -1)
+        self.assertLess(encode_move(63, 63, flag=CASTLING), 1 << 16)
+
+    def test_001_move_list(self):
+        moves = MoveList()
+        for move in (1, 2, 3):
+            moves.append(move)
+        self.assertEqual((len(moves), list(moves), moves[-1]), (3, [1, 2, 3], 3))
+        self.assertIn(2, moves)
+        self.assertEqual(list(MoveList.frombytes(moves.tobytes())), [1, 2, 3])
+        moves.clear()
+        self.assertEqual(len(moves), 0)
+        self.assertNotIn(2, moves)
+
+    def test_002_move_data(self):
+        for fen in ("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+                    "r3k2r/8/8/3pP3/8/8/1p6/R3K2R b KQkq - 0 1", "4k3/8/8/8/3pP3/8/8/4K3 b - e3 0 1"):
+            board = BoardState(fen=fen)
+            flags = set()
+            for move in board.bitboard.generate_move_list():
+                data = move_to_data(move=move, white=board.white_turn())
+                self.assertEqual(move_from_data(board=board, move=data), move)
+                flags.add(move_flag(move))
+            self.assertTrue(flags & {CASTLING, EN_PASSANT})
+        board = BoardState(fen="4k3/P7/8/8/8/8/8/4K3 w - - 0 1")
+        for promotion_unit in ("n", "Q"):
+            move = move_from_data(board=board, move=MoveData(from_value="a7", to="a8", promotion_unit=promotion_unit))
+            self.assertEqual(move_to_data(move=move, white=True).promotion_unit, promotion_unit.upper())
+        for promotion_unit in ("K", "p", "x", "Qn"):
+            with self.assertRaises(ValueError):
+                move_from_data(board=board, move=MoveData(from_value="a7", to="a8", promotion_unit=promotion_unit))
+
+
+class TestPerft(unittest.TestCase):
+
+    def test_000_suite(self):
+        for result in perft.run_suite(max_depth=2):
+            self.assertTrue(result.ok, result)
+
+    def test_001_divide(self):
+        fen = perft.SUITE[1][1]
+        counts = perft.divide(fen, 2, workers=2)
+        self.assertEqual(len(counts), 48)
+        self.assertEqual(sum(counts.values()), 2039)
+        self.assertEqual(counts, perft.divide(fen, 2))
+        self.assertIn("e1g1", counts)
+
+
+class TestNotation(unittest.TestCase):
+
+    def test_000_parse_move(self):
+        board = Bitboard.from_fen(START_FEN)
+        for text in ("e4", "e5", "Ng1-f3", "b8c6", "Bb5", "a6", "Bxc6", "dxc6", "O-O"):
+            board.make_encoded_move(parse_move(board, text))
+        expected = Bitboard.from_fen("r1bqkbnr/1pp2ppp/p1p5/4p3/4P3/5N2/PPPP1PPP/RNBQ1RK1 b kq - 1 5")
+        self.assertEqual(expected.key, board.key)
+        self.assertRaises(ValueError, parse_move, board, "Kf7")
+        self.assertRaises(ValueError, parse_move, board, "xyz")
+
+    def test_001_ambiguous(self):
+        board = Bitboard.from_fen("4k3/8/8/8/8/8/4K3/R6R w - - 0 1")
+        self.assertRaises(ValueError, parse_move, board, "Rd1")
+        move = parse_move(board, "Rad1")
+        self.assertEqual(0, move & 0x3F)
+        self.assertEqual("Rad1", move_to_san(board, move))
+        board = Bitboard.from_fen("4k3/P7/8/8/8/8/8/4K3 w - - 0 1")
+        self.assertEqual(QUEEN, move_promotion(parse_move(board, "a8")))
+        self.assertEqual("a8=N", move_to_san(board, parse_move(board, "a7a8n")))
+        self.assertEqual("a8=Q+", move_to_san(board, parse_move(board, "a8=Q")))
+
+
+class TestBitbase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        bitbase.generate(cls.directory.name, names=["KRK"], workers=2)
+        cls.bitbases = bitbase.Bitbases(cls.directory.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.bitbases.close()
+        cls.directory.cleanup()
+
+    def test_000_pack(self):
+        won = bytes([1, 0, 0, 1, 0, 0, 0, 1, 0, 1, 0, 0, 0, 0, 0, 0])
+        self.assertEqual(bytes([0b10001001, 0b10]), bitbase.pack(won))
+
+    def test_001_probe(self):
+        self.assertEqual(["KRK"], self.bitbases.names)
+        self.assertEqual(65536, os.path.getsize(os.path.join(self.directory.name, "KRK.bb")))
+        self.assertEqual(bitbase.WIN, self.bitbases.probe(Bitboard.from_fen("8/8/8/8/8/2k5/8/KR6 w - - 0 1")))
+        self.assertEqual(bitbase.LOSS, self.bitbases.probe(Bitboard.from_fen("8/8/8/8/8/2k5/8/KR6 b - - 0 1")))
+        # The rook hangs, the same with colors switched
+        self.assertEqual(bitbase.DRAW, self.bitbases.probe(Bitboard.from_fen("8/8/8/8/8/8/1k6/1R5K b - - 0 1")))
+        self.assertEqual(bitbase.DRAW, self.bitbases.probe(Bitboard.from_fen("1r5k/1K6/8/8/8/8/8/8 w - - 0 1")))
+        self.assertEqual(bitbase.WIN, self.bitbases.probe(Bitboard.from_fen("kr6/8/2K5/8/8/8/8/8 b - - 0 1")))
+        self.assertIsNone(self.bitbases.probe(Bitboard.from_fen("8/8/8/8/8/1k6/8/KQ6 w - - 0 1")))
+        self.assertIsNone(self.bitbases.probe(Bitboard.from_fen(START_FEN)))
+
+    def test_002_best_moves(self):
+        # Only moving the rook away keeps the win
+        board = Bitboard.from_fen("8/8/8/8/8/8/1k6/1R5K w - - 0 1")
+        moves = self.bitbases.best_moves(board)
+        self.assertTrue(len(moves) > 0)
+        self.assertTrue(all(move & 0x3F == 1 for move in moves))
+        self.assertNotIn(encode_move(1, 8), moves)
+        self.assertIsNone(self.bitbases.best_moves(Bitboard.from_fen(START_FEN)))
+
+    def test_003_main(self):
+        with tempfile.TemporaryDirectory() as directory, redirect_stdout(io.StringIO()):
+            self.assertEqual(0, bitbase.main([directory, "KRK", "-w", "2"]))
+            self.assertEqual(["KRK.bb"], os.listdir(directory))
+            # Without table names all are generated
+            with patch.object(bitbase, "generate", return_value={}) as generate:
+                self.assertEqual(0, bitbase.main([directory]))
+            self.assertEqual(list(bitbase.TABLES), generate.call_args.kwargs["names"])
+            with redirect_stderr(io.StringIO()), self.assertRaises(SystemExit) as raised:
+                bitbase.main([directory, "KXK"])
+            self.assertEqual(2, raised.exception.code)
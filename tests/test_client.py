@@ -0,0 +1,382 @@
+#!/usr/bin/env python
+
+"""Tests for the clients in `j_chess_lib.client` against a scripted server."""
+
+
+import asyncio
+import socket
+import threading
+import unittest
+from typing import List, Optional
+from uuid import uuid4
+
+from xsdata.formats.dataclass.parsers import XmlParser
+from xsdata.formats.dataclass.serializers import XmlSerializer
+from xsdata.formats.dataclass.serializers.config import SerializerConfig
+
+from j_chess_lib.ai import DumbAI
+from j_chess_lib.client import AsyncClient, Client, run_clients
+from j_chess_lib.communication import AsyncConnection, Connection, JchessMessage, JchessMessageType, MoveData
+from j_chess_lib.communication.connection.Connection import MessageCodec
+from j_chess_lib.communication.connection.decoder import HEART_BEAT, decode_await_move, peek_message_type
+from j_chess_lib.communication.connection.framing import FrameBuffer, FrameWriter
+from j_chess_lib.communication.connection.templates import MessageTemplates
+from j_chess_lib.communication.schema import (
+    AwaitMoveMessage, DisconnectMessage, ErrorType, GameOverMessage, GameStartMessage, HeartBeatMessage,
+    LoginReplyMessage, MatchFormatData, MatchFoundMessage, MatchOverMessage, MatchStatusData, MatchTypeValue,
+    MatchTypeWinX, MoveMessage, TimeControlData
+)
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+_SERIALIZER = XmlSerializer(config=SerializerConfig(pretty_print=False))
+_PARSER = XmlParser()
+
+
+def _send(conn: socket.socket, message_type: JchessMessageType, **kwargs):
+    data = _SERIALIZER.render(JchessMessage(message_type=message_type, player_id=str(uuid4()), **kwargs))
+    data = data.encode("utf-8")
+    conn.sendall(len(data).to_bytes(4, "big") + data)
+
+
+def _recv(conn: socket.socket) -> JchessMessage:
+    def exactly(size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            chunk = conn.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("closed")
+            data += chunk
+        return data
+
+    return _PARSER.from_bytes(exactly(int.from_bytes(exactly(4), "big")), JchessMessage)
+
+
+def _frame(data: bytes) -> bytes:
+    return len(data).to_bytes(4, "big") + data
+
+
+class _ChunkSocket:
+    # Hands out the data in the given chunks, one per recv_into
+
+    def __init__(self, *chunks: bytes):
+        self._chunks = list(chunks)
+
+    def recv_into(self, buffer: memoryview) -> int:
+        if not self._chunks:
+            return 0
+        chunk = self._chunks.pop(0)
+        size = min(len(chunk), len(buffer))
+        buffer[:size] = chunk[:size]
+        if size < len(chunk):
+            self._chunks.insert(0, chunk[size:])
+        return size
+
+
+class TestFrameBuffer(unittest.TestCase):
+
+    def test_000_partial_prefix(self):
+        data = _frame(b"<a/>") + _frame("<b>ä</b>".encode("utf-8"))
+        frames = FrameBuffer(sock=_ChunkSocket(*(data[i:i + 1] for i in range(len(data)))))
+        self.assertEqual(b"<a/>", frames.read_frame())
+        self.assertEqual("<b>ä</b>".encode("utf-8"), frames.read_frame())
+        self.assertRaises(ConnectionError, frames.read_frame)
+
+    def test_001_frames_per_syscall(self):
+        frames = FrameBuffer(sock=_ChunkSocket(b"".join(_frame(bytes([65 + i]) * i) for i in range(10))))
+        self.assertEqual([bytes([65 + i]) * i for i in range(10)], [frames.read_frame() for _ in range(10)])
+        self.assertEqual(1, frames.recv_calls)
+        self.assertEqual(0, frames.pending)
+
+    def test_002_grow_and_compact(self):
+        big = bytes(range(256)) * 40
+        chunks = _frame(b"x" * 10) + _frame(big) + _frame(b"y" * 20) + _frame(big)
+        frames = FrameBuffer(sock=_ChunkSocket(*(chunks[i:i + 7] for i in range(0, len(chunks), 7))), size=16)
+        self.assertEqual([b"x" * 10, big, b"y" * 20, big], [frames.read_frame() for _ in range(4)])
+
+    def test_003_socket(self):
+        left, right = socket.socketpair()
+        with left, right:
+            frames = FrameBuffer(sock=left)
+            right.sendall(_frame(b"one") + _frame(b"two")[:2])
+            self.assertEqual(b"one", frames.read_frame())
+            right.sendall(_frame(b"two")[2:])
+            self.assertEqual(b"two", frames.read_frame())
+
+
+class _TrickleSocket:
+    # Accepts at most size bytes per sendmsg
+
+    def __init__(self, size: int):
+        self._size = size
+        self.data = bytearray()
+        self.calls = 0
+
+    def sendmsg(self, buffers) -> int:
+        self.calls += 1
+        taken = b"".join(bytes(x) for x in buffers)[:self._size]
+        self.data += taken
+        return len(taken)
+
+
+class TestFrameWriter(unittest.TestCase):
+
+    def test_000_one_syscall(self):
+        left, right = socket.socketpair()
+        with left, right:
+            writer = FrameWriter(sock=left)
+            bodies = [MessageCodec().encode(message=f"<Login><name>Bot-{x}-äöü♞</name></Login>") for x in range(20)]
+            writer.write(bodies=bodies)
+            self.assertEqual(1, writer.send_calls)
+            frames = FrameBuffer(sock=right)
+            self.assertEqual(bodies, [frames.read_frame() for _ in bodies])
+
+    def test_001_partial_writes(self):
+        sock = _TrickleSocket(size=5)
+        bodies = [b"<a/>", b"", "<b>♞</b>".encode("utf-8")]
+        FrameWriter(sock=sock).write(bodies=bodies)
+        self.assertEqual(b"".join(_frame(x) for x in bodies), bytes(sock.data))
+        self.assertEqual(-(-len(sock.data) // 5), sock.calls)
+
+
+class TestMessageTemplates(unittest.TestCase):
+
+    @staticmethod
+    def _xsdata(player_id: str, move_data: MoveData) -> bytes:
+        message = JchessMessage(player_id=player_id, message_type=JchessMessageType.MOVE,
+                                move=MoveMessage(move=move_data))
+        return _SERIALIZER.render(message).encode("utf-8")
+
+    def test_000_moves(self):
+        player_id = str(uuid4())
+        templates = MessageTemplates(player_id=player_id)
+        squares = [f"{f}{r}" for f in "abcdefgh" for r in "12345678"]
+        for from_value in squares:
+            for to in squares:
+                move_data = MoveData(from_value=from_value, to=to)
+                self.assertEqual(self._xsdata(player_id, move_data), templates.move(move_data=move_data))
+        for promotion in "nbrqNBRQ":
+            move_data = MoveData(from_value="e7", to="d8", promotion_unit=promotion)
+            self.assertEqual(self._xsdata(player_id, move_data), templates.move(move_data=move_data))
+
+    def test_001_fallback(self):
+        player_id = "a%s{from}"
+        templates = MessageTemplates(player_id=player_id)
+        for move_data in (MoveData(from_value="e2", to="e4"), MoveData(from_value="<&", to="e4"),
+                          MoveData(from_value="e7", to="e8", promotion_unit=""),
+                          MoveData(from_value="e7", to="e8", promotion_unit="'")):
+            self.assertEqual(self._xsdata(player_id, move_data), templates.move(move_data=move_data))
+
+    def test_002_client_id(self):
+        client = AsyncClient(connection=None, ai=_RecordAI(name="Bot"))
+        self.assertIs(client.templates, client.templates)
+        client._logged_in(new_id=uuid4())
+        self.assertEqual(str(client.id), client.templates.player_id)
+        self.assertEqual(str(client.id), client.base_msg().player_id)
+
+
+class TestDecoder(unittest.TestCase):
+
+    @staticmethod
+    def _render(indent: bool = False, **kwargs) -> bytes:
+        serializer = XmlSerializer(config=SerializerConfig(indent="  ")) if indent else _SERIALIZER
+        return serializer.render(JchessMessage(player_id=str(uuid4()), **kwargs)).encode("utf-8")
+
+    def test_000_peek(self):
+        self.assertEqual(JchessMessageType.MATCH_OVER, peek_message_type(self._render(
+            message_type=JchessMessageType.MATCH_OVER, match_over=MatchOverMessage(statistics="messageType=\"Move\""))))
+        self.assertEqual(JchessMessageType.MOVE, peek_message_type(
+            b"<?xml version='1.0'?><JChessMessage playerId='x' messageType = 'Move'><Move/></JChessMessage>"))
+        self.assertIsNone(peek_message_type(b"<Other messageType=\"Move\"/>"))
+
+    def test_001_heart_beat(self):
+        frame = self._render(message_type=JchessMessageType.HEART_BEAT, heart_beat=HeartBeatMessage())
+        self.assertIs(HEART_BEAT, MessageCodec().decode(data=frame))
+
+    def test_002_await_move(self):
+        codec = MessageCodec()
+        time_control = TimeControlData(your_time_in_ms=1234, enemy_time_in_ms=0)
+        for last_move in (None, MoveData(from_value="e7", to="e5"), MoveData("b7", "a8", "n")):
+            for indent in (False, True):
+                frame = self._render(indent=indent, message_type=JchessMessageType.AWAIT_MOVE,
+                                     await_move=AwaitMoveMessage(position=START_FEN, last_move=last_move,
+                                                                 time_control=time_control))
+                self.assertIsNotNone(decode_await_move(data=frame))
+                self.assertEqual(_PARSER.from_bytes(frame, JchessMessage), codec.decode(data=frame))
+
+    def test_003_fallback(self):
+        # An entity in the position and an empty last move are left to xsdata
+        codec = MessageCodec()
+        for await_move in (b"<position>8/8/8/8/8/8/8/K1k5 w - - 0 1&#32;</position><lastMove><from>a1</from>"
+                           b"<to>a2</to></lastMove>",
+                           b"<position>8/8/8/8/8/8/8/K1k5 w - - 0 1</position><lastMove/>"):
+            frame = b"<JChessMessage messageType=\"AwaitMove\" playerId=\"x\" schemaVersion=\"0.2.0\"><AwaitMove>" + \
+                await_move + b"<timeControl><yourTimeInMs>1</yourTimeInMs><enemyTimeInMs>2</enemyTimeInMs>" \
+                b"</timeControl></AwaitMove></JChessMessage>"
+            self.assertIsNone(decode_await_move(data=frame))
+            self.assertEqual(_PARSER.from_bytes(frame, JchessMessage), codec.decode(data=frame))
+
+
+class _Server:
+    # Logs every client in, plays one game of one move with it and disconnects it. With hang_up it closes the
+    # connection right after the game started instead
+
+    def __init__(self, hang_up: bool = False):
+        self._hang_up = hang_up
+        self._socket = socket.create_server(("localhost", 0))
+        self.port = self._socket.getsockname()[1]
+        self.moves: List[JchessMessage] = []
+        self._lock = threading.Lock()
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self._socket.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._play, args=(conn,), daemon=True).start()
+
+    def _play(self, conn: socket.socket):
+        with conn:
+            login = _recv(conn)
+            name = login.login.name
+            match_format = MatchFormatData(match_type_value=MatchTypeValue.WIN_X,
+                                           match_type_data=MatchTypeWinX(amount_to_win=1), time_per_side=60000,
+                                           time_per_side_increment=0, time_per_side_per_move=0)
+            _send(conn, JchessMessageType.LOGIN_REPLY, login_reply=LoginReplyMessage(new_id=str(uuid4())))
+            _send(conn, JchessMessageType.MATCH_FOUND, match_found=MatchFoundMessage(
+                match_id=str(uuid4()), enemy_name="Server", match_format=match_format))
+            _send(conn, JchessMessageType.GAME_START, game_start=GameStartMessage(name_white=name))
+            if self._hang_up:
+                return
+            _send(conn, JchessMessageType.HEART_BEAT, heart_beat=HeartBeatMessage())
+            _send(conn, JchessMessageType.AWAIT_MOVE, await_move=AwaitMoveMessage(
+                position=START_FEN, time_control=TimeControlData(your_time_in_ms=60000, enemy_time_in_ms=60000)))
+            move = _recv(conn)
+            with self._lock:
+                self.moves.append(move)
+            _send(conn, JchessMessageType.GAME_OVER, game_over=GameOverMessage(
+                winner=name, is_draw=False, pgn="1. e4 1-0"))
+            _send(conn, JchessMessageType.MATCH_OVER, match_over=MatchOverMessage(
+                match_status=MatchStatusData(name_player1=name, name_player2="Server", score_player1=1,
+                                             score_player2=0), match_format=match_format, statistics=""))
+            _send(conn, JchessMessageType.DISCONNECT, disconnect=DisconnectMessage(error_type_code=ErrorType.NO_ERROR))
+
+    def close(self):
+        self._socket.close()
+
+
+class _RecordAI(DumbAI):
+
+    def __init__(self, name: str):
+        super().__init__(name=name)
+        self.calls: List[str] = []
+        self.move_thread: Optional[threading.Thread] = None
+
+    def new_match(self, match_id, enemy, match_format):
+        self.calls.append("new_match")
+
+    def finalize_match(self, match_id, status, statistics):
+        self.calls.append("finalize_match")
+
+    def new_game(self, game_id, match_id, white_player):
+        self.calls.append("new_game")
+
+    def finalize_game(self, game_id, match_id, winner, pgn):
+        self.calls.append(f"finalize_game {winner}")
+
+    def get_move(self, game_id, match_id, game_state):
+        self.calls.append(f"get_move {game_state.your_time}")
+        self.move_thread = threading.current_thread()
+        return MoveData(from_value="e2", to="e4")
+
+
+_CALLS = ["new_match", "new_game", "get_move 60000", "finalize_game {}", "finalize_match"]
+
+
+class TestClient(unittest.TestCase):
+
+    def setUp(self):
+        self.server = _Server()
+
+    def tearDown(self):
+        self.server.close()
+
+    def _check_moves(self, count: int):
+        self.assertEqual(count, len(self.server.moves))
+        for message in self.server.moves:
+            self.assertEqual(JchessMessageType.MOVE, message.message_type)
+            self.assertEqual(("e2", "e4"), (message.move.move.from_value, message.move.move.to))
+
+    def test_000_thread_client(self):
+        ai = _RecordAI(name="Threaded")
+        with Connection(port=self.server.port) as connection, self.assertLogs("j_chess_lib", "INFO") as logs:
+            client = Client(connection=connection, ai=ai)
+            original_id = client.id
+            client.start()
+            client.join(timeout=10)
+            self.assertFalse(client.is_alive())
+        self.assertIn(f"Login success id changed {original_id} -> {client.id}", "\n".join(logs.output))
+        self.assertEqual([x.format(ai.name) for x in _CALLS], ai.calls)
+        self._check_moves(count=1)
+
+    def test_001_server_hang_up(self):
+        self.server.close()
+        self.server = _Server(hang_up=True)
+        ai = _RecordAI(name="Threaded")
+        errors = []
+        hook = threading.excepthook
+        threading.excepthook = errors.append
+        try:
+            with Connection(port=self.server.port) as connection:
+                client = Client(connection=connection, ai=ai)
+                client.start()
+                client.join(timeout=10)
+                self.assertFalse(client.is_alive())
+        finally:
+            threading.excepthook = hook
+        self.assertEqual([], errors)
+        self.assertEqual(["new_match", "new_game"], ai.calls)
+
+    def test_002_async_clients(self):
+        ais = [_RecordAI(name=f"Async-{i}") for i in range(8)]
+
+        async def play():
+            connections = [await AsyncConnection.connect(port=self.server.port) for _ in ais]
+            clients = [AsyncClient(connection=connection, ai=ai) for connection, ai in zip(connections, ais)]
+            await asyncio.wait_for(run_clients(clients), timeout=10)
+            for connection in connections:
+                await connection.disconnect()
+            return threading.current_thread()
+
+        loop_thread = asyncio.run(play())
+        for ai in ais:
+            self.assertEqual([x.format(ai.name) for x in _CALLS], ai.calls)
+            self.assertIsNot(loop_thread, ai.move_thread)
+        self._check_moves(count=len(ais))
+
+    def test_003_async_server_hang_up(self):
+        hang_up = _Server(hang_up=True)
+        ais = [_RecordAI(name=f"Async-{i}") for i in range(4)]
+        ports = [self.server.port, hang_up.port] * 2
+
+        async def play():
+            connections = [await AsyncConnection.connect(port=port) for port in ports]
+            clients = [AsyncClient(connection=connection, ai=ai) for connection, ai in zip(connections, ais)]
+            results = await asyncio.wait_for(run_clients(clients), timeout=10)
+            for connection in connections:
+                await connection.disconnect()
+            return results
+
+        try:
+            self.assertEqual([None] * len(ais), asyncio.run(play()))
+        finally:
+            hang_up.close()
+        for ai, port in zip(ais, ports):
+            calls = _CALLS if port == self.server.port else _CALLS[:2]
+            self.assertEqual([x.format(ai.name) for x in calls], ai.calls)
+        self._check_moves(count=2)
+
+
+if __name__ == '__main__':
+    unittest.main()
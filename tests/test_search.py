@@ -0,0 +1,367 @@
+#!/usr/bin/env python
+
+"""Tests for the search in `j_chess_lib.ai`."""
+
+
+import asyncio
+import os
+import random
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from uuid import uuid4
+
+from j_chess_lib.ai import DumbAI
+from j_chess_lib.ai.board import BoardState
+from j_chess_lib.ai.board.bitboard import Bitboard, SQUARE_NAME_INDEX
+from j_chess_lib.ai.board.moves import encode_move
+from j_chess_lib.ai.board.utilities import predict_board
+from j_chess_lib.ai.book import OpeningBook, build_book, game_entries, write_book
+from j_chess_lib.ai.container import GameState
+from j_chess_lib.ai.evaluation import IncrementalEvaluator, FULL_PHASE, evaluate
+from j_chess_lib.ai.examples import SearchAI
+from j_chess_lib.ai.parallel import ParallelSearcher, merge
+from j_chess_lib.ai.pgn import bulk, read_file, read_games
+from j_chess_lib.ai.search import Searcher, SearchResult, MATE
+from j_chess_lib.client.match import AsyncGame, Game
+from j_chess_lib.communication import JchessMessage, JchessMessageType, MatchFormatData, MoveData
+from j_chess_lib.communication.connection.templates import MessageTemplates
+from j_chess_lib.communication.schema import AwaitMoveMessage, GameOverMessage, GameStartMessage, TimeControlData
+
+
+def _move(name: str) -> int:
+    return encode_move(SQUARE_NAME_INDEX[name[:2]], SQUARE_NAME_INDEX[name[2:4]])
+
+
+class TestSearcher(unittest.TestCase):
+
+    def test_000_mate_in_one(self):
+        result = Searcher().search(Bitboard.from_fen("6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1"), max_depth=3)
+        self.assertEqual(result.move, _move("a1a8"))
+        self.assertEqual(result.score, MATE - 1)
+
+    def test_001_win_material(self):
+        fen = "rnbqkbnr/pppp1ppp/8/4p3/3Q4/8/PPP1PPPP/RNB1KBNR b KQkq - 0 1"
+        result = Searcher().search(Bitboard.from_fen(fen), max_depth=3)
+        self.assertEqual(result.move, _move("e5d4"))
+        self.assertEqual(result.depth, 3)
+
+    def test_002_time_limit(self):
+        board = Bitboard.from_fen("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+        result = Searcher().search(board, time_limit=0.2)
+        self.assertLess(result.seconds, 0.5)
+        self.assertIn(result.move, board.generate_move_list())
+
+
+class TestEvaluation(unittest.TestCase):
+
+    def test_000_incremental(self):
+        # The incremental terms equal the terms from scratch after every move and every take back
+        rng = random.Random(17)
+        evaluator = IncrementalEvaluator()
+        for fen in ("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+                    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+                    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+                    "n1n5/PPPk4/8/8/8/8/4Kppp/5N1N b - - 0 1"):
+            for _ in range(10):
+                board = Bitboard.from_fen(fen)
+                evaluator.reset(board)
+                undos = []
+                for _ in range(40):
+                    moves = board.generate_move_list()
+                    if moves.size == 0:
+                        break
+                    undos.append(evaluator.make_move(board, moves[rng.randrange(moves.size)]))
+                    self.assertEqual(evaluator.terms(board), (evaluator.mg, evaluator.eg, evaluator.phase))
+                    self.assertEqual(evaluate(board), evaluator.evaluate(board))
+                while undos:
+                    evaluator.unmake_move(board, undos.pop())
+                    self.assertEqual(evaluator.terms(board), (evaluator.mg, evaluator.eg, evaluator.phase))
+                self.assertEqual(Bitboard.from_fen(fen).key, board.key)
+
+    def test_001_phase(self):
+        evaluator = IncrementalEvaluator()
+        evaluator.reset(Bitboard.from_fen("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"))
+        self.assertEqual((0, 0, FULL_PHASE), (evaluator.mg, evaluator.eg, evaluator.phase))
+        # Endgame tables only: a central king is worth more, an advanced pawn too
+        self.assertGreater(evaluate(Bitboard.from_fen("8/8/8/3K4/8/8/8/k7 w - - 0 1")), 0)
+        self.assertGreater(evaluate(Bitboard.from_fen("8/4P3/4p3/8/8/8/8/K6k w - - 0 1")), 0)
+        self.assertLess(evaluate(Bitboard.from_fen("8/4P3/4p3/8/8/8/8/K6k b - - 0 1")), 0)
+
+
+class TestParallelSearcher(unittest.TestCase):
+
+    def test_000_split(self):
+        board = Bitboard.from_fen("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
+        with ParallelSearcher(workers=3) as searcher:
+            shares = searcher.split(board)
+        self.assertEqual(len(shares), 3)
+        self.assertEqual(sorted(m for share in shares for m in share), sorted(board.generate_move_list()))
+
+    def test_001_merge(self):
+        a = [SearchResult(move=1, score=10, depth=1, nodes=5, seconds=0), SearchResult(2, 30, 2, 9, 0)]
+        b = [SearchResult(move=3, score=20, depth=1, nodes=4, seconds=0)]
+        self.assertEqual(merge([a, b]), SearchResult(move=3, score=20, depth=1, nodes=13, seconds=0.0))
+        b = [SearchResult(move=3, score=MATE - 1, depth=1, nodes=4, seconds=0)]
+        self.assertEqual(merge([a, b]).move, 3)
+
+    def test_002_search(self):
+        with ParallelSearcher(workers=2) as searcher:
+            for _ in range(2):
+                result = searcher.search("6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1", time_limit=2.0, max_depth=3)
+                self.assertEqual(result.move, _move("a1a8"))
+                self.assertEqual(result.score, MATE - 1)
+
+    def test_003_deadline(self):
+        with ParallelSearcher(workers=2) as searcher:
+            self.assertTrue(searcher.started)
+            fen = "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3"
+            board = Bitboard.from_fen(fen)
+            for _ in range(3):
+                start = time.perf_counter()
+                result = searcher.search(fen, time_limit=0.3, max_depth=64, soft_limit=1.0)
+                self.assertLess(time.perf_counter() - start, 0.3)
+                self.assertGreater(result.depth, 0)
+                self.assertIn(result.move, list(board.generate_move_list()))
+        self.assertFalse(searcher.started)
+
+
+class TestSearchAI(unittest.TestCase):
+
+    def test_000_time_budget(self):
+        ai = SearchAI()
+        board = BoardState(fen="rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
+        state = GameState(enemy_time=60_000, your_time=60_000, last_move=None, board_state=board)
+        self.assertEqual(ai.time_budget(game_state=state, match_format=None), (60_000 - 150) // 30)
+        match_format = MatchFormatData(time_per_side_increment=1000, time_per_side_per_move=500)
+        self.assertEqual(ai.time_budget(game_state=state, match_format=match_format), 350)
+        state = GameState(enemy_time=60_000, your_time=100, last_move=None, board_state=board)
+        self.assertEqual(ai.time_budget(game_state=state, match_format=None), 20)
+
+    def test_001_get_move(self):
+        ai = SearchAI(name="me")
+        match_id, game_id = uuid4(), uuid4()
+        ai.new_match(match_id=match_id, enemy="you", match_format=MatchFormatData())
+        ai.new_game(game_id=game_id, match_id=match_id, white_player="me")
+        state = GameState(enemy_time=10_000, your_time=10_000, last_move=None,
+                          board_state=BoardState(fen="6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1"))
+        move = ai.get_move(game_id=game_id, match_id=match_id, game_state=state)
+        self.assertEqual(move, MoveData(from_value="a1", to="a8"))
+
+
+class _PonderAI(DumbAI):
+
+    def __init__(self, moves, replies):
+        super().__init__(name="ponderer")
+        self.moves, self.replies = list(moves), list(replies)
+        self.pondered, self.hits = [], []
+        self.running = False
+        self.finalized_while_pondering = None
+
+    @property
+    def pondering(self) -> bool:
+        return True
+
+    def finalize_game(self, game_id, match_id, winner, pgn):
+        self.finalized_while_pondering = self.running
+
+    def get_move(self, game_id, match_id, game_state: GameState) -> MoveData:
+        self.hits.append(game_state.ponder_hit)
+        return self.moves.pop(0)
+
+    def predict_reply(self, game_id, match_id, board_state: BoardState):
+        return self.replies.pop(0)
+
+    def ponder(self, game_id, match_id, board_state: BoardState, stop: threading.Event):
+        self.pondered.append(board_state.fen)
+        self.running = True
+        stop.wait()
+        self.running = False
+
+
+class TestPondering(unittest.TestCase):
+
+    def test_000_game(self):
+        def await_move(fen: str, last_move: MoveData = None) -> JchessMessage:
+            return JchessMessage(message_type=JchessMessageType.AWAIT_MOVE, await_move=AwaitMoveMessage(
+                position=fen, last_move=last_move, time_control=TimeControlData(your_time_in_ms=1, enemy_time_in_ms=1)
+            ))
+
+        messages = [
+            await_move("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"),
+            await_move("rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq e6 0 2", MoveData("e7", "e5")),
+            await_move("rnbqkbnr/ppp2ppp/3p4/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 0 3", MoveData("d7", "d6")),
+            JchessMessage(message_type=JchessMessageType.GAME_OVER, game_over=GameOverMessage(is_draw=True, pgn="")),
+        ]
+        ai = _PonderAI(moves=[MoveData("e2", "e4"), MoveData("g1", "f3"), MoveData("f1", "c4")],
+                       replies=[MoveData("e7", "e5"), MoveData("b8", "c6"), None])
+        match = SimpleNamespace(id=uuid4(), client=SimpleNamespace(templates=MessageTemplates(player_id=str(uuid4()))))
+        sent = []
+        game = Game(data=GameStartMessage(name_white="ponderer"), recv=lambda: messages.pop(0), send=sent.append,
+                    ai=ai, match=match)
+        game.play()
+        self.assertEqual(ai.hits, [None, True, False])
+        self.assertEqual(ai.pondered, ["rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq e6 0 2",
+                                       "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3"])
+        self.assertEqual(len(sent), 3)
+
+    def test_001_search_ai(self):
+        ai = SearchAI(ponder=True)
+        board = BoardState(fen="rnbqkbnr/pppp1ppp/8/4p3/3Q4/8/PPP1PPPP/RNB1KBNR b KQkq - 0 1")
+        ai.searcher.search(board.bitboard, max_depth=3)
+        after = predict_board(board=board, move=MoveData(from_value="e5", to="d4"))
+        self.assertIsNotNone(ai.predict_reply(game_id=uuid4(), match_id=uuid4(), board_state=after))
+        stop = threading.Event()
+        thread = threading.Thread(target=ai.ponder, args=(uuid4(), uuid4(), after, stop))
+        thread.start()
+        stop.set()
+        thread.join(timeout=5)
+        self.assertFalse(thread.is_alive())
+
+    def test_002_no_pondering_with_workers(self):
+        ai = SearchAI(workers=2, ponder=True)
+        try:
+            self.assertFalse(ai.pondering)
+        finally:
+            ai.close()
+        self.assertTrue(SearchAI(ponder=True).pondering)
+
+    @staticmethod
+    def _game_over_while_pondering():
+        messages = [
+            JchessMessage(message_type=JchessMessageType.AWAIT_MOVE, await_move=AwaitMoveMessage(
+                position="rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+                time_control=TimeControlData(your_time_in_ms=1, enemy_time_in_ms=1)
+            )),
+            JchessMessage(message_type=JchessMessageType.GAME_OVER, game_over=GameOverMessage(is_draw=True, pgn="")),
+        ]
+        ai = _PonderAI(moves=[MoveData("e2", "e4")], replies=[MoveData("e7", "e5")])
+        client = SimpleNamespace(templates=MessageTemplates(player_id=str(uuid4())), executor=None)
+        return messages, ai, SimpleNamespace(id=uuid4(), client=client)
+
+    def test_003_stop_before_finalize(self):
+        messages, ai, match = self._game_over_while_pondering()
+        sent = []
+        Game(data=GameStartMessage(name_white="ponderer"), recv=lambda: messages.pop(0), send=sent.append, ai=ai,
+             match=match).play()
+        self.assertEqual(1, len(ai.pondered))
+        self.assertIs(False, ai.finalized_while_pondering)
+
+    def test_004_async_stop_before_finalize(self):
+        messages, ai, match = self._game_over_while_pondering()
+        sent = []
+
+        async def recv():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(AsyncGame(data=GameStartMessage(name_white="ponderer"), recv=recv, send=send, ai=ai,
+                              match=match).play())
+        self.assertEqual(1, len(ai.pondered))
+        self.assertIs(False, ai.finalized_while_pondering)
+
+
+_PGN = """[Event "Test"]
+[Result "1-0"]
+
+1. e4 {King pawn} e5 2. Nf3 (2. f4 exf4) Nc6 $1 3. Bb5 a6 1-0
+
+[Event "Test"]
+[Result "1/2-1/2"]
+
+1. e4 c5 ; Sicilian
+2. Nf3 d6 1/2-1/2
+
+[Event "Test"]
+[Result "0-1"]
+
+1. d4 d5 0-1
+"""
+
+
+class TestOpeningBook(unittest.TestCase):
+
+    def test_000_read_games(self):
+        games = list(read_games(_PGN.splitlines()))
+        self.assertEqual(3, len(games))
+        self.assertEqual("1-0", games[0].result)
+        self.assertEqual(["e4", "e5", "Nf3", "Nc6", "Bb5", "a6"], games[0].moves)
+        self.assertEqual({1: ["King pawn"]}, games[0].comments)
+        self.assertEqual({2: [["f4", "exf4"]]}, games[0].variations)
+        self.assertEqual({3: [1]}, games[0].nags)
+        self.assertEqual(["e4", "c5", "Nf3", "d6"], games[1].moves)
+        self.assertEqual({2: ["Sicilian"]}, games[1].comments)
+
+    def test_001_build_and_probe(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "test.book")
+            count = build_book(read_games(_PGN.splitlines()), path, max_ply=4)
+            self.assertEqual(9, count)
+            self.assertEqual(9 * 16, os.path.getsize(path))
+            with OpeningBook(path) as book:
+                self.assertEqual(9, len(book))
+                start = BoardState(fen="rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
+                entries = book.entries(start.bitboard.key)
+                # e4 won once and drew once, d4 lost
+                self.assertEqual([(_move("e2e4"), 3, 2), (_move("d2d4"), 0, 1)],
+                                 [(e.move, e.weight, e.learn) for e in entries])
+                move = book.get_move(start, rng=random.Random(0))
+                self.assertEqual(("e2", "e4"), (move.from_value, move.to))
+                after = predict_board(board=start, move=move)
+                self.assertIn(book.get_move(after).to, ("e5", "c5"))
+                self.assertIsNone(book.get_move(predict_board(board=after, move=MoveData(from_value="a7", to="a6"))))
+
+    def test_002_search_ai(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "test.book")
+            build_book(read_games(_PGN.splitlines()), path)
+            ai = SearchAI(book=path)
+            ai.verbose = False
+            start = BoardState(fen="rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
+            game_state = GameState(enemy_time=1000, your_time=1000, last_move=None, board_state=start)
+            move = ai.get_move(game_id=uuid4(), match_id=uuid4(), game_state=game_state)
+            self.assertEqual(("e2", "e4"), (move.from_value, move.to))
+            ai.close()
+
+
+_ANNOTATED = """% escaped line
+[Event "Annotated \\"game\\""]
+[FEN "4k3/P7/8/8/8/8/8/4K3 w - - 0 1"]
+
+{A comment
+[Tag "inside"] over lines} 1.a8=Q+!? (1. a8=R+ Kd7 (1... Ke7) 2. Ra7+) 1...Kd7 $14 2. Qb7+ ?? Kd6 *
+
+[Event "Next"]
+
+1. e2-e4 e7-e5 2. Ng1-f3 1-0
+"""
+
+
+class TestPGN(unittest.TestCase):
+
+    def test_000_annotations(self):
+        game, lan = read_games(_ANNOTATED.splitlines())
+        self.assertEqual('Annotated "game"', game.headers["Event"])
+        self.assertEqual(["a8=Q+", "Kd7", "Qb7+", "Kd6"], game.moves)
+        self.assertEqual("*", game.result)
+        self.assertEqual({0: ['A comment\n[Tag "inside"] over lines']}, game.comments)
+        self.assertEqual({0: [5], 1: [14], 2: [4]}, game.nags)
+        self.assertEqual({0: [["a8=R+", "Kd7", "Ra7+"]]}, game.variations)
+        self.assertEqual(4, len(game.encoded_moves()))
+        self.assertEqual(["e2-e4", "e7-e5", "Ng1-f3"], lan.moves)
+        self.assertEqual(3, len(lan.encoded_moves()))
+
+    def test_001_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "games.pgn")
+            with open(path, "w") as f_out:
+                f_out.write((_PGN + "\n") * 50)
+            self.assertEqual(150, sum(1 for _ in read_file(path)))
+            self.assertEqual([g.moves for g in read_file(path)], [g.moves for g in read_file(path, use_mmap=True)])
+            entries = list(bulk([path], game_entries, workers=2, use_mmap=True, batch_size=16))
+            self.assertEqual([game_entries(g) for g in read_file(path)], entries)
+            self.assertEqual(11, write_book(entries, os.path.join(directory, "test.book")))